@@ -1,15 +1,34 @@
-from .agent import agent_builder  # noqa: F401
-from .agent import agent_executor_builder  # noqa: F401
-from .agent import chat  # noqa: F401
-from .agent import direct_answer  # noqa: F401
-from .agent import prompt_selector  # noqa: F401
-from .agent import tools  # noqa: F401
-from .agent import (  # noqa: F401
-    extract_financial_data,
-    perform_math_calculus,
-    strip_code_fence,
-)
-from .metrics import measure_accuracy  # noqa: F401
-from .utils import extract_selected_threads_processed  # noqa: F401
-from .utils import extract_thread_details  # noqa: F401
-from .utils import open_json_file  # noqa: F401
+# The public helpers are imported on first access (PEP 562): importing `src` alone, e.g. by
+# `python -m src.main` acting as a thin client of the daemon, must not pay the langchain and
+# provider SDK import cost.
+import importlib
+
+_EXPORTS = {
+    "agent_builder": "src.agent",
+    "agent_executor_builder": "src.agent",
+    "chat": "src.agent",
+    "direct_answer": "src.agent",
+    "prompt_selector": "src.agent",
+    "tools": "src.agent",
+    "extract_financial_data": "src.agent",
+    "perform_math_calculus": "src.agent",
+    "strip_code_fence": "src.agent",
+    "measure_accuracy": "src.metrics",
+    "extract_selected_threads_processed": "src.utils",
+    "extract_thread_details": "src.utils",
+    "open_json_file": "src.utils",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
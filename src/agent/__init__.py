@@ -1,10 +1,33 @@
 from .agent_builder import agent_builder, agent_executor_builder  # noqa: F401
+from .agent_pool import AgentPool  # noqa: F401
 from .agent_tools import extract_financial_data  # noqa: F401
 from .agent_tools import perform_math_calculus  # noqa: F401
 from .agent_tools import strip_code_fence  # noqa: F401
 from .agent_tools import (  # noqa: F401
+    tool_calling_tools,
     tools,
 )
+from .batch import batch_answer, run_batch  # noqa: F401
 from .chat import chat  # noqa: F401
-from .instant_answer import direct_answer  # noqa: F401
-from .prompt_templates import prompt_selector, system_prompt  # noqa: F401
+from .deadline import (  # noqa: F401
+    Deadline,
+    TimeoutException,
+    ainvoke_with_deadline,
+    invoke_with_deadline,
+)
+from .decomposition import answer_decomposed, split_questions  # noqa: F401
+from .instant_answer import answer_with_executor, direct_answer  # noqa: F401
+from .instrumentation import AgentMetricsCallbackHandler  # noqa: F401
+from .prompt_templates import (  # noqa: F401
+    build_task_input,
+    enable_prompt_caching,
+    prompt_selector,
+    system_prompt,
+)
+from .routing import (  # noqa: F401
+    consistency_failures,
+    question_features,
+    route_question,
+)
+from .template_solver import solve_question, solve_thread  # noqa: F401
+from .tool_memo import MemoizingAgentExecutor, normalize_tool_input  # noqa: F401
@@ -9,7 +9,6 @@ from langchain_core._api.deprecation import LangChainDeprecationWarning
 
 warnings.filterwarnings("ignore", category=LangChainDeprecationWarning)
 # from .. import warnings_config # noqa: F401
-import signal
 
 from langchain.memory import ConversationBufferMemory
 from langchain_anthropic import ChatAnthropic
@@ -18,86 +17,254 @@ from langchain_google_vertexai import ChatVertexAI
 from langchain_openai import ChatOpenAI
 
 from src.utils import extract_selected_threads_processed, get_exact_answers
+from src.utils.tokenizers import get_token_counter
 
-from .agent_tools import tools
-from .prompt_templates import prompt_selector, system_prompt  # noqa: F401
-
-
-class TimeoutException(Exception):
-    pass
-
-
-def timeout_handler(signum, frame):
-    raise TimeoutException("Agent execution took too long!")
-
+from .agent_tools import (
+    TOOL_DESCRIPTION_MODES,
+    compact_tools,
+    render_compact_tools,
+    tool_calling_tools,
+    tools,
+)
+from .deadline import TimeoutException  # noqa: F401
+from .hedging import HedgedChatModel
+from .output_repair import with_output_repair
+from .prompt_templates import (  # noqa: F401
+    TOOL_DESCRIPTIONS,
+    enable_prompt_caching,
+    prompt_selector,
+    system_prompt,
+)
+from .scratchpad import (
+    DEFAULT_OBSERVATION_TOKENS,
+    DEFAULT_SCRATCHPAD_TOKENS,
+    with_compact_scratchpad,
+)
+from .stub_llm import StubChatModel
+from .tool_memo import DEFAULT_LOOP_LIMIT, MemoizingAgentExecutor
 
 # load environment variables from .env file
 load_dotenv()
 
 
-def agent_builder(model, provider, temperature, tools, prompt_style):
+def llm_builder(
+    model,
+    provider,
+    temperature,
+    request_timeout=None,
+    max_retries=None,
+    hedge_delay=None,
+    hedge_model=None,
+    hedge_provider=None,
+):
     """
-    Constructs and returns a LangChain AgentExecutor configured with the specified LLM model, provider,
-    toolset, and prompt style.
-
-    This function:
-        - Instantiates the appropriate LLM wrapper (OpenAI, Anthropic, or Google Vertex) based on the
-          model and provider.
-        - Selects the appropriate prompt template and agent creation function via the `prompt_selector`.
-        - Builds a custom agent using the provided tools and the selected prompt.
-        - Wraps the agent in an AgentExecutor to handle execution, error handling, and step tracking.
+    Instantiates the chat model wrapper (OpenAI, Anthropic, or Google Vertex) for the given
+    model and provider.
 
     Parameters:
         model (str): The name of the model to use (e.g., "gpt-4", "claude-3-sonnet", "gemini-pro").
-        provider (str): The LLM provider ("openai", "anthropic", "google").
+        provider (str): The LLM provider ("openai", "anthropic", "google", or "stub" for the
+                        offline `StubChatModel`).
         temperature (float): Sampling temperature for the model output.
-        tools (list): A list of tools (e.g., functions or plugins) the agent can use during execution.
-        prompt_style (str): The prompt configuration style, passed to `prompt_selector`
-                            (e.g., "react", "json-chat", etc.).
+        request_timeout (float): Optional timeout, in seconds, applied to every single provider
+                                 call. Unlike `signal.alarm` it is enforced by the HTTP client,
+                                 so it works from worker threads and asyncio tasks.
+        max_retries (int): Optional number of retries of a failed or timed out provider call.
+        hedge_delay (float): Opt-in hedging (see `HedgedChatModel`). If set, a call that has
+                             not answered after `hedge_delay` seconds, or that failed, is
+                             duplicated to the hedge model and the first answer wins.
+        hedge_model (str): Model of the hedge request. Default is `model`.
+        hedge_provider (str): Provider of the hedge request. Default is `provider`.
 
     Returns:
-        AgentExecutor: A fully configured agent executor ready for task execution.
+        BaseChatModel: The chat model.
 
     Raises:
         ValueError: If the provider is not recognized.
     """
+    # Only forward the client options that were explicitly set.
+    client_kwargs = {}
+    if request_timeout is not None:
+        client_kwargs["timeout"] = request_timeout
+    if max_retries is not None:
+        client_kwargs["max_retries"] = max_retries
 
     # Initialize the LLM based on the provider.
     if provider == "openai" and model.startswith("gp"):
         llm = ChatOpenAI(
             model=model,
             temperature=temperature,
+            # The agent executor streams the LLM, so ask for usage in the stream too.
+            stream_usage=True,
+            **client_kwargs,
         )
     elif provider == "openai" and model.startswith("o"):
         llm = ChatOpenAI(
             model=model,
+            stream_usage=True,
+            **client_kwargs,
         )
     elif provider == "anthropic":
         llm = ChatAnthropic(
             model=model,
             temperature=temperature,
+            **client_kwargs,
             # temperature=1,
             # max_tokens=6000,
             # thinking={"type": "enabled", "budget_tokens": 5000}
         )
 
     elif provider == "google":
+        # ChatVertexAI has no client-level timeout; the per-invocation deadline
+        # (see `invoke_with_deadline`) bounds these calls instead.
         llm = ChatVertexAI(
             model=model,
             temperature=temperature,
+            **({"max_retries": max_retries} if max_retries is not None else {}),
         )
+    elif provider == "stub":
+        # Offline model for load tests: "stub-<seconds>" sets the simulated latency.
+        latency = model.split("-", 1)[1] if "-" in model else None
+        llm = StubChatModel(**({"latency": float(latency)} if latency else {}))
     else:
         raise ValueError("Invalid provider selected.")
 
+    if hedge_delay is not None:
+        hedge_model = hedge_model or model
+        llm = HedgedChatModel(
+            primary=llm,
+            hedge=llm_builder(
+                model=hedge_model,
+                provider=hedge_provider or provider,
+                temperature=temperature,
+                request_timeout=request_timeout,
+                max_retries=max_retries,
+            ),
+            hedge_delay=hedge_delay,
+            primary_model=model,
+            hedge_model=hedge_model,
+        )
+
+    return llm
+
+
+def agent_builder(
+    model,
+    provider,
+    temperature,
+    tools,
+    prompt_style,
+    request_timeout=None,
+    max_retries=None,
+    repair_output=True,
+    hedge_delay=None,
+    hedge_model=None,
+    hedge_provider=None,
+    compact_scratchpad=True,
+    observation_tokens=DEFAULT_OBSERVATION_TOKENS,
+    scratchpad_tokens=DEFAULT_SCRATCHPAD_TOKENS,
+    tool_descriptions=None,
+):
+    """
+    Constructs and returns a LangChain AgentExecutor configured with the specified LLM model, provider,
+    toolset, and prompt style.
+
+    This function:
+        - Instantiates the appropriate LLM wrapper (OpenAI, Anthropic, or Google Vertex) based on the
+          model and provider.
+        - Selects the appropriate prompt template and agent creation function via the `prompt_selector`.
+        - Builds a custom agent using the provided tools and the selected prompt.
+        - Wraps the agent in an AgentExecutor to handle execution, error handling, and step tracking.
+
+    Parameters:
+        model (str): The name of the model to use (e.g., "gpt-4", "claude-3-sonnet", "gemini-pro").
+        provider (str): The LLM provider ("openai", "anthropic", "google").
+        temperature (float): Sampling temperature for the model output.
+        tools (list): A list of tools (e.g., functions or plugins) the agent can use during execution.
+        prompt_style (str): The prompt configuration style, passed to `prompt_selector`
+                            (e.g., "react", "json-chat", etc.). With "tools-agent" the tools
+                            are bound to the model as JSON-schema function definitions and
+                            the model may request several tool calls in one turn.
+        request_timeout (float): Optional per-LLM-call timeout in seconds (see `llm_builder`).
+        max_retries (int): Optional number of retries of a failed provider call.
+        repair_output (bool): If True (default), malformed outputs of the text-parsed agents
+                              are repaired locally when possible instead of costing a
+                              parse-error retry (see `with_output_repair`).
+        hedge_delay (float): Optional hedging delay in seconds for the LLM calls; slow or
+                             failed calls are duplicated to the hedge model (see `llm_builder`).
+        hedge_model (str): Model of the hedge requests. Default is `model`.
+        hedge_provider (str): Provider of the hedge requests. Default is `provider`.
+        compact_scratchpad (bool): If True (default), the scratchpad of the react and
+                                   few-shot-CoT agents summarizes large past observations
+                                   and is capped in tokens (see `format_compact_scratchpad`)
+                                   instead of re-sending every observation in full.
+        observation_tokens (int): Token budget of each past observation in the scratchpad.
+        scratchpad_tokens (int): Token cap of the scratchpad of one iteration.
+        tool_descriptions (str): How the tools are described in the prompt of the text
+                                 styles: "verbose" (full descriptions with format rules and
+                                 examples) or "compact" (one line per tool and a short
+                                 block of examples, see `compact_tools`). Default is the
+                                 mode of the prompt style in TOOL_DESCRIPTIONS.
+
+    Returns:
+        AgentExecutor: A fully configured agent executor ready for task execution.
+
+    Raises:
+        ValueError: If the provider or the tool-description mode is not recognized.
+    """
+
+    # Initialize the LLM based on the provider.
+    llm = llm_builder(
+        model=model,
+        provider=provider,
+        temperature=temperature,
+        request_timeout=request_timeout,
+        max_retries=max_retries,
+        hedge_delay=hedge_delay,
+        hedge_model=hedge_model,
+        hedge_provider=hedge_provider,
+    )
+
     # Select the prompt based on the provided style.
     prompt, agent_func = prompt_selector(prompt_style)
 
+    # Anthropic only caches explicitly marked prefixes; OpenAI caches them automatically.
+    if provider == "anthropic":
+        prompt = enable_prompt_caching(prompt)
+
+    # The native tool-calling agent binds JSON-schema tool definitions to the model.
+    if prompt_style == "tools-agent":
+        tools = tool_calling_tools(tools)
+
+    # The text styles can describe the tools in a few lines instead of the full descriptions.
+    tool_descriptions = tool_descriptions or TOOL_DESCRIPTIONS.get(
+        prompt_style, "verbose"
+    )
+    if tool_descriptions not in TOOL_DESCRIPTION_MODES:
+        raise ValueError(
+            f"Invalid tool description mode {tool_descriptions!r}, expected one of {TOOL_DESCRIPTION_MODES}."
+        )
+    options = {}
+    if tool_descriptions == "compact" and prompt_style in TOOL_DESCRIPTIONS:
+        tools = compact_tools(tools)
+        options["tools_renderer"] = render_compact_tools
+
     # Create the agent using the mapped function.
     agent = agent_func(
         llm=llm,
         tools=tools,
         prompt=prompt,
+        **options,
     )
+    if compact_scratchpad and prompt_style in ("react", "few-shot-CoT"):
+        agent = with_compact_scratchpad(
+            agent,
+            observation_tokens=observation_tokens,
+            max_tokens=scratchpad_tokens,
+            count_tokens=get_token_counter(provider, model),
+        )
+    if repair_output:
+        agent = with_output_repair(agent, tools)
 
     return agent
 
@@ -111,16 +278,143 @@ def agent_executor_builder(
     memory_flag=False,
     handle_parsing_errors=True,
     verbose=True,
+    max_iterations=10,
+    max_execution_time=None,
+    request_timeout=None,
+    max_retries=None,
+    callbacks=None,
+    agent=None,
+    repair_output=True,
+    hedge_delay=None,
+    hedge_model=None,
+    hedge_provider=None,
+    memoize_tools=True,
+    loop_limit=DEFAULT_LOOP_LIMIT,
+    compact_scratchpad=True,
+    observation_tokens=DEFAULT_OBSERVATION_TOKENS,
+    scratchpad_tokens=DEFAULT_SCRATCHPAD_TOKENS,
+    tool_descriptions=None,
 ):
+    """
+    Builds the agent and wraps it in an AgentExecutor, optionally with conversation memory.
+
+    Parameters:
+        model (str): The name of the model to use.
+        provider (str): The LLM provider ("openai", "anthropic", "google").
+        temperature (float): Sampling temperature for the model output.
+        tools (list): The tools the agent can use.
+        prompt_style (str): The prompt configuration style, passed to `prompt_selector`.
+                            With "program" the returned executor is a `ProgramOfThoughtChain`
+                            (one LLM call, local execution) that falls back to a react agent.
+        memory_flag (bool): If True, a ConversationBufferMemory is attached and returned.
+        handle_parsing_errors (bool): Whether the executor retries on malformed agent output.
+        verbose (bool): Whether the executor prints its reasoning steps.
+        max_iterations (int): Upper bound on Thought/Action iterations. Default is 10.
+        max_execution_time (float): Optional wall-clock budget in seconds; the executor stops
+                                    iterating once it is spent. Pair it with
+                                    `invoke_with_deadline` for a hard deadline and a
+                                    best-partial answer.
+        request_timeout (float): Optional per-LLM-call timeout in seconds.
+        max_retries (int): Optional number of retries of a failed provider call.
+        callbacks (list): Optional callback handlers (e.g. `AgentMetricsCallbackHandler`)
+                          attached to every invocation of the executor, including its LLM
+                          and tool calls.
+        agent: Optional agent runnable returned by `agent_builder`. The agent is stateless, so
+               long-running processes build it once and wrap it in a new executor (e.g. one
+               per chat session, each with its own memory) without rebuilding the LLM client
+               and the prompt.
+        repair_output (bool): Whether malformed agent outputs are repaired locally before
+                              falling back to a parse-error retry. Default is True.
+        hedge_delay (float): Optional hedging delay in seconds for the LLM calls; slow or
+                             failed calls are duplicated to the hedge model (see `llm_builder`).
+        hedge_model (str): Model of the hedge requests. Default is `model`.
+        hedge_provider (str): Provider of the hedge requests. Default is `provider`.
+        memoize_tools (bool): If True (default), a tool requested again with the same input
+                              in a run returns its first observation instead of running
+                              again, and a run that keeps repeating it is stopped with the
+                              best partial answer (see `MemoizingAgentExecutor`).
+        loop_limit (int): Number of requests of the same (tool, input) pair allowed in a
+                          run before it is stopped.
+        compact_scratchpad (bool): Whether the react and few-shot-CoT scratchpads are
+                                   compacted (see `agent_builder`). Default is True.
+        observation_tokens (int): Token budget of each past observation in the scratchpad.
+        scratchpad_tokens (int): Token cap of the scratchpad of one iteration.
+        tool_descriptions (str): "verbose" or "compact" tool descriptions in the prompt of
+                                 the text styles (see `agent_builder`).
+
+    Returns:
+        tuple: (agent_executor, memory) where memory is None if `memory_flag` is False.
+    """
 
     # Initilize the Agent
-    agent = agent_builder(
-        model=model,
-        provider=provider,
-        temperature=temperature,
-        tools=tools,
-        prompt_style=prompt_style,
-    )
+    if agent is None:
+        agent = agent_builder(
+            model=model,
+            provider=provider,
+            temperature=temperature,
+            tools=tools,
+            prompt_style=prompt_style,
+            request_timeout=request_timeout,
+            max_retries=max_retries,
+            repair_output=repair_output,
+            hedge_delay=hedge_delay,
+            hedge_model=hedge_model,
+            hedge_provider=hedge_provider,
+            compact_scratchpad=compact_scratchpad,
+            observation_tokens=observation_tokens,
+            scratchpad_tokens=scratchpad_tokens,
+            tool_descriptions=tool_descriptions,
+        )
+
+    if prompt_style == "program":
+        # The program chain answers in a single LLM call; the react agent is only invoked
+        # when the generated program cannot be executed.
+        agent.fallback, _ = agent_executor_builder(
+            model=model,
+            provider=provider,
+            temperature=temperature,
+            tools=tools,
+            prompt_style="react",
+            handle_parsing_errors=handle_parsing_errors,
+            verbose=verbose,
+            max_iterations=max_iterations,
+            max_execution_time=max_execution_time,
+            request_timeout=request_timeout,
+            max_retries=max_retries,
+            repair_output=repair_output,
+            hedge_delay=hedge_delay,
+            hedge_model=hedge_model,
+            hedge_provider=hedge_provider,
+            memoize_tools=memoize_tools,
+            loop_limit=loop_limit,
+            compact_scratchpad=compact_scratchpad,
+            observation_tokens=observation_tokens,
+            scratchpad_tokens=scratchpad_tokens,
+            tool_descriptions=tool_descriptions,
+        )
+        agent.verbose = verbose
+        memory = None
+        if memory_flag:
+            memory = ConversationBufferMemory(
+                memory_key="chat_history",
+                output_key="output",
+                return_messages=True,
+            )
+            agent.memory = memory
+        if callbacks:
+            agent = agent.with_config(callbacks=callbacks)
+        return agent, memory
+
+    # The executor must run the same structured tools the tool-calling agent was bound to.
+    if prompt_style == "tools-agent":
+        tools = tool_calling_tools(tools)
+
+    # Tool calls are memoized per run and repeated calls stop the run early.
+    executor_options = {}
+    executor_class = AgentExecutor
+    if memoize_tools:
+        executor_class = MemoizingAgentExecutor
+        executor_options = {"loop_limit": loop_limit}
 
     # create an agent executor with the agent and tools
     if memory_flag:
@@ -133,30 +427,36 @@ def agent_executor_builder(
 
         # add system prompt to memory
         # memory.chat_memory.add_message(SystemMessage(content=system_prompt))
-        # Register the handler
-        # signal.signal(signal.SIGALRM, timeout_handler)
-        # signal.alarm(45)  # set timeout (e.g. 30 seconds)
 
         # create an agent executor with the agent and tools
-        agent_executor = AgentExecutor(
+        agent_executor = executor_class(
             agent=agent,
             tools=tools,
             verbose=verbose,
-            max_iterations=10,
+            max_iterations=max_iterations,
+            max_execution_time=max_execution_time,
             return_intermediate_steps=True,
             handle_parsing_errors=handle_parsing_errors,
             memory=memory,
+            **executor_options,
         )
+        if callbacks:
+            # Runtime callbacks are inherited by the LLM and tool runs, constructor ones are not.
+            agent_executor = agent_executor.with_config(callbacks=callbacks)
         return agent_executor, memory
 
     else:
-        agent_executor = AgentExecutor(
+        agent_executor = executor_class(
             agent=agent,
             tools=tools,
             verbose=verbose,
-            max_iterations=10,
+            max_iterations=max_iterations,
+            max_execution_time=max_execution_time,
             return_intermediate_steps=True,
             handle_parsing_errors=handle_parsing_errors,
+            **executor_options,
         )
+        if callbacks:
+            agent_executor = agent_executor.with_config(callbacks=callbacks)
 
         return agent_executor, None
@@ -0,0 +1,105 @@
+import queue
+import threading
+from contextlib import contextmanager
+
+from .agent_builder import agent_executor_builder
+
+
+class AgentPool:
+    """
+    Pool of warm agent executors sharing one configuration.
+
+    Building an executor (LLM client, prompt, agent runnable) is the expensive part of a
+    request, so executors are built once, lazily, up to `size`, and reused. Each executor
+    is used by one caller at a time, which keeps concurrent requests isolated.
+
+    Parameters:
+        size (int): Maximum number of executors in the pool.
+        **executor_kwargs: Arguments forwarded to `agent_executor_builder` (model, provider,
+                           temperature, tools, prompt_style, ...). `memory_flag` is forced
+                           to False: pooled executors must not share conversation memory.
+    """
+
+    def __init__(self, size=4, **executor_kwargs):
+        if size < 1:
+            raise ValueError("The pool size must be at least 1.")
+        self.size = size
+        self.executor_kwargs = {**executor_kwargs, "memory_flag": False}
+        self._idle = queue.LifoQueue()
+        self._built = 0
+        self._lock = threading.Lock()
+
+    def _build(self):
+        agent_executor, _ = agent_executor_builder(**self.executor_kwargs)
+        return agent_executor
+
+    def warm_up(self, count=None):
+        """
+        Builds executors ahead of the first request.
+
+        Parameters:
+            count (int): Number of executors to build. Default is the pool size.
+        """
+        count = self.size if count is None else min(count, self.size)
+        while True:
+            with self._lock:
+                if self._built >= count:
+                    return
+                self._built += 1
+            self._idle.put(self._build())
+
+    def acquire(self, timeout=None):
+        """
+        Takes an executor from the pool, building one if the pool is not full yet.
+
+        Parameters:
+            timeout (float): Seconds to wait for a free executor. Default is to wait forever.
+
+        Returns:
+            AgentExecutor: An executor reserved for the caller.
+
+        Raises:
+            queue.Empty: If no executor became free within `timeout`.
+        """
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            build = self._built < self.size
+            if build:
+                self._built += 1
+        if build:
+            try:
+                return self._build()
+            except Exception:
+                with self._lock:
+                    self._built -= 1
+                raise
+        return self._idle.get(timeout=timeout)
+
+    def release(self, agent_executor):
+        """
+        Returns an executor to the pool.
+        """
+        self._idle.put(agent_executor)
+
+    def stats(self):
+        """
+        Returns the pool occupancy: {"size", "built", "idle", "busy"}.
+        """
+        with self._lock:
+            built = self._built
+        idle = self._idle.qsize()
+        return {"size": self.size, "built": built, "idle": idle, "busy": built - idle}
+
+    @contextmanager
+    def executor(self, timeout=None):
+        """
+        Context manager that acquires an executor and releases it on exit.
+        """
+        agent_executor = self.acquire(timeout=timeout)
+        try:
+            yield agent_executor
+        finally:
+            self.release(agent_executor)
@@ -1,12 +1,18 @@
 import ast
 import json
+import operator
 import os
 import re
-from typing import Union
+from typing import List, Union
 
-from langchain_core.tools import Tool
+from langchain_core.tools import StructuredTool, Tool
+from pydantic import BaseModel, Field
 
-from src.utils import open_json_file
+from src.utils import open_json_file_cached
+from src.utils.prompt_budget import paginate_threads
+
+# Token budget of one `extract_financial_data` observation; larger selections are paginated.
+MAX_EXTRACTION_TOKENS = 12000
 
 
 def strip_code_fence(input_str: str) -> str:
@@ -101,6 +107,55 @@ def extract_selected_threads(data, indexes=None):
         raise TypeError("indexes must be None, an int, a list, or a tuple.")
 
 
+def _selected_indexes(data, indexes):
+    # Dataset index of each thread returned by `extract_selected_threads`.
+    if indexes is None:
+        return list(range(len(data)))
+    if isinstance(indexes, int):
+        return [indexes] if indexes < len(data) else []
+    if isinstance(indexes, tuple):
+        return list(range(*indexes))
+    return [i for i in indexes if i < len(data)]
+
+
+def fit_extraction_to_budget(
+    financial_data, indexes=None, budget=MAX_EXTRACTION_TOKENS
+):
+    """
+    Paginates extracted threads whose observation would not fit a token budget.
+
+    The threads that fit (at least one) are returned, followed by a dict with a "note" and,
+    when the dataset indexes of the threads are known, the "remaining_indexes" to request
+    next. Selections within the budget are returned unchanged.
+
+    Parameters:
+        financial_data (list): The extracted threads.
+        indexes (list): Optional dataset index of each thread.
+        budget (int): Token budget of the observation.
+
+    Returns:
+        list: The threads of the first page, and the note if some were left out.
+    """
+    if not isinstance(financial_data, list) or len(financial_data) < 2:
+        return financial_data
+    pages = paginate_threads(financial_data, budget, context_format="repr")
+    if len(pages) == 1:
+        return financial_data
+    page = pages[0]
+    rest = [position for later in pages[1:] for position in later]
+    note = {
+        "note": f"Only {len(page)} of {len(financial_data)} threads fit in the context window. "
+        + (
+            "Request the remaining indexes in another call if they are needed."
+            if indexes is not None
+            else f"{len(rest)} threads were left out."
+        )
+    }
+    if indexes is not None:
+        note["remaining_indexes"] = [indexes[position] for position in rest]
+    return [financial_data[position] for position in page] + [note]
+
+
 def extract_financial_data(input_data):
     """
     Extract financial data from the input.
@@ -123,7 +178,9 @@ def extract_financial_data(input_data):
        containing the data directly.
 
     Returns:
-      A list of dictionaries representing the extracted financial information. On error, returns a dictionary
+      A list of dictionaries representing the extracted financial information. Selections larger than
+      MAX_EXTRACTION_TOKENS are paginated: the last dictionary then has a "note" and the
+      "remaining_indexes" to request next (see `fit_extraction_to_budget`). On error, returns a dictionary
       with an "error" key. As a backup, if no proper extraction is possible but date patterns (YYYY-MM-DD) are found,
       they are returned in an "extracted_dates" field.
     """
@@ -150,6 +207,7 @@ def extract_financial_data(input_data):
         else:
             parsed = input_data
 
+        from_file = False
         if isinstance(parsed, dict) and "tool_input" in parsed:
             tool_input = parsed["tool_input"]
             file_path = tool_input.get("file_path")
@@ -162,7 +220,8 @@ def extract_financial_data(input_data):
             # If file_path ends with '.json', treat it as a file path.
             if file_path.strip().endswith(".json"):
                 if os.path.exists(file_path):
-                    data = open_json_file(file_path)
+                    data = open_json_file_cached(file_path)
+                    from_file = True
                 else:
                     raise ValueError(f"File not found: {file_path}")
             else:
@@ -179,7 +238,9 @@ def extract_financial_data(input_data):
             indexes = None
 
         financial_data = extract_selected_threads(data, indexes)
-        return financial_data
+        # Only the threads of a file can be requested again by index.
+        selected = _selected_indexes(data, indexes) if from_file else None
+        return fit_extraction_to_budget(financial_data, selected)
 
     except Exception as e:
         # Backup: attempt to extract any date patterns (YYYY-MM-DD) from the input.
@@ -192,6 +253,113 @@ def extract_financial_data(input_data):
         return {"error": f"Failed to extract financial data: {str(e)}"}
 
 
+_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+_UNARY_OPERATORS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+_COMPARISON_OPERATORS = {
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+}
+_SAFE_FUNCTIONS = {"abs": abs, "min": min, "max": max, "round": round}
+# Larger exponents are never needed for financial arithmetic and could exhaust memory.
+_MAX_EXPONENT = 100
+# Larger integers neither; the exponent limit alone lets nested powers grow without bound.
+_MAX_INT_BITS = 4096
+
+
+def _number(value):
+    # Arithmetic is restricted to numbers: "x" * 10**9 or a repeated tuple could exhaust
+    # memory. Strings are only meant for comparisons.
+    if not isinstance(value, (int, float)):
+        raise ValueError(f"Arithmetic on a non-number: {type(value).__name__}")
+    return value
+
+
+def _eval_node(node, names):
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, str)):
+        return node.value
+    if isinstance(node, ast.Name):
+        if node.id not in names:
+            raise NameError(f"Unknown name: {node.id}")
+        return names[node.id]
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPERATORS:
+        return _UNARY_OPERATORS[type(node.op)](_number(_eval_node(node.operand, names)))
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+        left = _number(_eval_node(node.left, names))
+        right = _number(_eval_node(node.right, names))
+        if isinstance(node.op, ast.Pow):
+            if abs(right) > _MAX_EXPONENT:
+                raise ValueError(f"Exponent too large: {right}")
+            # Bound the size of the result before computing it.
+            if (
+                isinstance(left, int)
+                and isinstance(right, int)
+                and abs(left).bit_length() * right > _MAX_INT_BITS
+            ):
+                raise ValueError("Result too large.")
+        result = _BINARY_OPERATORS[type(node.op)](left, right)
+        if isinstance(result, int) and result.bit_length() > _MAX_INT_BITS:
+            raise ValueError("Result too large.")
+        return result
+    if isinstance(node, ast.Compare):
+        left = _eval_node(node.left, names)
+        for op, comparator in zip(node.ops, node.comparators):
+            if type(op) not in _COMPARISON_OPERATORS:
+                raise ValueError(f"Unsupported comparison: {type(op).__name__}")
+            right = _eval_node(comparator, names)
+            if not _COMPARISON_OPERATORS[type(op)](left, right):
+                return False
+            left = right
+        return True
+    if (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Name)
+        and node.func.id in _SAFE_FUNCTIONS
+        and not node.keywords
+    ):
+        args = [_eval_node(arg, names) for arg in node.args]
+        return _SAFE_FUNCTIONS[node.func.id](*args)
+    if isinstance(node, ast.Tuple):
+        return tuple(_eval_node(element, names) for element in node.elts)
+    raise ValueError(f"Unsupported expression: {type(node).__name__}")
+
+
+def safe_eval(expression: str, names: dict = None):
+    """
+    Evaluates an arithmetic expression without `eval`.
+
+    Only numbers, string literals, tuples, the given names, the operators + - * / // % **,
+    unary + and -, comparisons and calls to abs, min, max and round are accepted. The
+    arithmetic operators only take numbers.
+
+    Args:
+        expression (str): The expression to evaluate.
+        names (dict): Values of the names the expression may reference.
+
+    Returns:
+        The value of the expression.
+
+    Raises:
+        SyntaxError: If the expression cannot be parsed.
+        ValueError: If the expression uses an unsupported construct.
+        NameError: If the expression references an unknown name.
+        ArithmeticError: On division by zero or overflow.
+    """
+    tree = ast.parse(expression.strip(), mode="eval")
+    return _eval_node(tree.body, names or {})
+
+
 def perform_math_calculus(expression: str) -> Union[float, str]:
     """
     Perform basic arithmetic operations based on the provided expression.
@@ -205,7 +373,7 @@ def perform_math_calculus(expression: str) -> Union[float, str]:
     try:
         # Remove quotes if present
         cleaned_expr = expression.strip().strip('"').strip("'")
-        result = eval(cleaned_expr)
+        result = safe_eval(cleaned_expr)
         return str(round(result, 4))
     except Exception as e:
         return f"Error in calculation: {e}"
@@ -269,3 +437,135 @@ tools = [
         func=extract_financial_data,
     ),
 ]
+
+
+# Compact tool-description mode: one or two lines per tool instead of the format rules and
+# examples above, which are rendered into the prompt of every LLM call. The examples move to
+# TOOL_EXAMPLES, a fixed few-shot block rendered after the tool list, so it stays in the
+# static (cacheable) prefix of the prompt.
+TOOL_DESCRIPTION_MODES = ("verbose", "compact")
+
+COMPACT_TOOL_DESCRIPTIONS = {
+    "arithmetic_calculator": "Evaluates one arithmetic expression (+ - * / ** and parentheses), given as a quoted string without any other text, and returns the result rounded to 4 decimals.",
+    "extract_financial_informations": 'Loads the pre_text, post_text, table and qa of threads of a .json dataset. Input: a JSON string {"tool_input": {"file_path": "<path>.json", "indexes": <int or list of int>}}. Only use it when the input names a .json file and indexes.',
+}
+
+TOOL_EXAMPLES = {
+    "arithmetic_calculator": [
+        ('"22.35 / 100"', "0.2235"),
+        ('"(10 / 4) + 2.5"', "5.0"),
+    ],
+    "extract_financial_informations": [
+        (
+            '{"tool_input": {"file_path": "/data/financial_threads.json", "indexes": [3, 7]}}',
+            "the pre_text, post_text, table and qa of threads 3 and 7",
+        ),
+    ],
+}
+
+
+def compact_tools(tools):
+    """
+    Returns copies of the text tools with their compact descriptions (see
+    COMPACT_TOOL_DESCRIPTIONS). Other tools are returned as is.
+
+    Parameters:
+        tools (list): The agent tools (e.g. `tools`).
+
+    Returns:
+        list: The tools, with the same names and functions.
+    """
+    return [
+        (
+            tool.model_copy(
+                update={"description": COMPACT_TOOL_DESCRIPTIONS[tool.name]}
+            )
+            if isinstance(tool, Tool) and tool.name in COMPACT_TOOL_DESCRIPTIONS
+            else tool
+        )
+        for tool in tools
+    ]
+
+
+def render_compact_tools(tools):
+    """
+    Renders the tools for the `{tools}` prompt variable in the compact mode: one line per
+    tool followed by the few-shot examples of the tools (see TOOL_EXAMPLES).
+    """
+    lines = [f"{tool.name}: {tool.description}" for tool in tools]
+    examples = [
+        f"- {tool.name} input: {tool_input} -> {output}"
+        for tool in tools
+        for tool_input, output in TOOL_EXAMPLES.get(tool.name, [])
+    ]
+    if examples:
+        lines += ["", "Tool examples:"] + examples
+    return "\n".join(lines)
+
+
+# JSON-schema versions of the tools for the native tool-calling agent ("tools-agent").
+# The provider receives the argument schema instead of the Action/Action Input format
+# instructions of the text descriptions above, and validates the arguments itself.
+
+
+class ArithmeticCalculatorInput(BaseModel):
+    expression: str = Field(
+        description='Arithmetic expression, e.g. "(10 / 4) + 2.5" or "22.35 / 100".'
+    )
+
+
+class FinancialInformationsInput(BaseModel):
+    file_path: str = Field(description="Path of the JSON dataset, ending with .json.")
+    indexes: Union[int, List[int], None] = Field(
+        default=None, description="Index or list of indexes of the threads to extract."
+    )
+
+
+def _extract_financial_informations(file_path, indexes=None):
+    return extract_financial_data(
+        {"tool_input": {"file_path": file_path, "indexes": indexes}}
+    )
+
+
+_TOOL_SCHEMAS = {
+    "arithmetic_calculator": (
+        ArithmeticCalculatorInput,
+        "Evaluates an arithmetic expression (+ - * / ** and parentheses) and returns the "
+        "result rounded to 4 decimal places. Use it for every computation; independent "
+        "computations can be requested in parallel.",
+        perform_math_calculus,
+    ),
+    "extract_financial_informations": (
+        FinancialInformationsInput,
+        "Loads the pre_text, post_text, table and qa fields of the given threads of a JSON "
+        "dataset file. Only use it when the input points to a .json file and indexes.",
+        _extract_financial_informations,
+    ),
+}
+
+
+def tool_calling_tools(tools):
+    """
+    Converts the text tools to structured tools with a JSON-schema argument definition, for
+    the providers' native tool calling (OpenAI, Anthropic and Vertex).
+
+    Tools without a known schema, and tools that are already structured, are returned as is.
+
+    Parameters:
+        tools (list): The agent tools (e.g. `tools`).
+
+    Returns:
+        list: The tools, with the same names, to bind to the model and to the executor.
+    """
+    converted = []
+    for tool in tools:
+        if isinstance(tool, Tool) and tool.name in _TOOL_SCHEMAS:
+            args_schema, description, func = _TOOL_SCHEMAS[tool.name]
+            tool = StructuredTool.from_function(
+                func=func,
+                name=tool.name,
+                description=description,
+                args_schema=args_schema,
+            )
+        converted.append(tool)
+    return converted
@@ -0,0 +1,342 @@
+import heapq
+import json
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+
+from src.utils import (
+    extract_thread_details,
+    get_exact_answers,
+    group_threads_by_context,
+    open_json_file_cached,
+    split_group_answers,
+)
+
+from .instant_answer import answer_with_executor
+
+
+def resolve_batch_input(record):
+    """
+    Resolves one batch record into the input passed to the agent.
+
+    Accepted records:
+        - {"input": "<question or prompt>"}: free text, used as-is.
+        - {"file_path": "data/train.json", "index": 12}: a reference to a dataset thread.
+        - a thread object (with pre_text/post_text/table/qa fields).
+    Any record may carry an "id", which is copied to the output.
+
+    Ground-truth answers (`exe_ans`) of referenced or inline threads are removed.
+
+    Parameters:
+        record (dict): The parsed JSON line.
+
+    Returns:
+        str or dict: The agent input.
+
+    Raises:
+        ValueError: If the record has none of the accepted shapes.
+    """
+    if "input" in record:
+        return record["input"]
+    if "file_path" in record:
+        data = open_json_file_cached(record["file_path"])
+        thread = data[int(record.get("index", 0))]
+        return get_exact_answers(extract_thread_details(thread))[1]
+    if any(key in record for key in ("pre_text", "post_text", "table")):
+        return get_exact_answers(extract_thread_details(record))[1]
+    raise ValueError(
+        "A batch record needs an 'input', a 'file_path'/'index' reference or thread fields."
+    )
+
+
+def read_jsonl(stream):
+    """
+    Yields (line_number, record) pairs from a JSON lines stream, skipping blank lines.
+
+    Lines that are not valid JSON are yielded as {"_error": message} so that they still
+    produce an output line.
+    """
+    for line_number, line in enumerate(stream):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                record = {"input": record}
+        except json.JSONDecodeError as e:
+            record = {"_error": f"Invalid JSON: {e}"}
+        yield line_number, record
+
+
+def _answer_record(pool, line_number, record, context_format, timeout, budget):
+    started = time.perf_counter()
+    result = {"line": line_number, "id": record.get("id"), "answers": None}
+    try:
+        if "_error" in record:
+            raise ValueError(record["_error"])
+        model_input = resolve_batch_input(record)
+        with pool.executor() as agent_executor:
+            answers = answer_with_executor(
+                agent_executor,
+                model_input,
+                context_format=context_format,
+                timeout=timeout,
+                **budget,
+            )
+        result["answers"] = [answer.strip() for answer in answers]
+        result["error"] = None
+    except Exception as e:
+        result["error"] = str(e)
+    result["latency"] = time.perf_counter() - started
+    return result
+
+
+def _answer_job(pool, job, context_format, timeout, budget):
+    # A job is one record, or the records of a context group answered in one agent call.
+    # `budget` holds the `answer_with_executor` token budget arguments. Returns
+    # (position, result) pairs.
+    if "group" not in job:
+        position, line_number, record = job["members"][0]
+        return [
+            (
+                position,
+                _answer_record(
+                    pool, line_number, record, context_format, timeout, budget
+                ),
+            )
+        ]
+
+    started = time.perf_counter()
+    results = [
+        {"line": line_number, "id": record.get("id"), "answers": None}
+        for _, line_number, record in job["members"]
+    ]
+    try:
+        with pool.executor() as agent_executor:
+            answers = answer_with_executor(
+                agent_executor,
+                job["group"]["sample"],
+                context_format=context_format,
+                timeout=timeout,
+                **budget,
+            )
+        answers = [answer.strip() for answer in answers]
+        for result, member_answers in zip(
+            results, split_group_answers(job["group"], answers)
+        ):
+            result["answers"] = member_answers
+            result["error"] = None
+    except Exception as e:
+        for result in results:
+            result["error"] = str(e)
+    latency = time.perf_counter() - started
+    for result in results:
+        result["latency"] = latency
+        result["group_size"] = len(results)
+    return [(member[0], result) for member, result in zip(job["members"], results)]
+
+
+def _group_jobs(records):
+    # Reads all the records and groups the threads about the same document; free text and
+    # invalid records stay jobs of their own. Jobs are in order of their first record.
+    jobs = []
+    threads = []
+    thread_members = []
+    for position, (line_number, record) in enumerate(records):
+        member = (position, line_number, record)
+        try:
+            model_input = None if "_error" in record else resolve_batch_input(record)
+        except Exception:
+            model_input = None
+        if isinstance(model_input, dict):
+            threads.append(model_input)
+            thread_members.append(member)
+        else:
+            jobs.append({"members": [member]})
+
+    for group in group_threads_by_context(threads):
+        members = [thread_members[i] for i in group["indices"]]
+        if len(members) == 1:
+            jobs.append({"members": members})
+        else:
+            jobs.append({"members": members, "group": group})
+    jobs.sort(key=lambda job: job["members"][0][0])
+    return jobs
+
+
+def batch_answer(
+    records,
+    pool,
+    concurrency=4,
+    ordered=True,
+    context_format="pipe",
+    timeout=None,
+    group_contexts=False,
+    max_input_tokens=None,
+    provider="openai",
+    model="gpt-4o",
+):
+    """
+    Answers a stream of batch records concurrently with a pool of warm agent executors.
+
+    At most `2 * concurrency` records are in flight, including the results waiting for a
+    slower record before them in ordered mode, so arbitrarily long inputs (e.g. stdin) are
+    processed with bounded memory.
+
+    With `group_contexts`, the whole input is read first and thread records about the same
+    document (see `group_threads_by_context`) are answered in one agent call, so the shared
+    context is sent once. Their results share the latency of that call and carry a
+    "group_size".
+
+    Parameters:
+        records (iterable): (line_number, record) pairs, as yielded by `read_jsonl`.
+        pool (AgentPool): The executor pool.
+        concurrency (int): Number of questions answered at the same time.
+        ordered (bool): If True (default), results are yielded in input order; otherwise
+                        as soon as they complete.
+        context_format (str): The format threads are rendered in.
+        timeout (float): Optional deadline in seconds for each question.
+        group_contexts (bool): Answer the threads about the same document in one agent call.
+        max_input_tokens (int): Optional token budget of each rendered input (see
+                                `prompt_budget`); longer inputs are trimmed before they are
+                                sent (see `answer_with_executor`).
+        provider (str): The provider of the pool model, whose tokenizer counts the inputs.
+        model (str): The model of the pool.
+
+    Yields:
+        dict: One result per record with "line", "id", "answers", "error" and "latency".
+    """
+    if group_contexts:
+        jobs = iter(_group_jobs(records))
+    else:
+        jobs = (
+            {"members": [(position, line_number, record)]}
+            for position, (line_number, record) in enumerate(records)
+        )
+    budget = {
+        "max_input_tokens": max_input_tokens,
+        "provider": provider,
+        "model": model,
+    }
+    max_in_flight = 2 * concurrency
+    pending = set()
+    ready = []  # min-heap of (position, result) waiting for their turn when ordered
+    next_position = 0
+    exhausted = False
+
+    with ThreadPoolExecutor(max_workers=concurrency) as workers:
+        while pending or not exhausted:
+            # Results waiting in `ready` count as in flight, so a slow head record does not
+            # let the reorder buffer grow without bound.
+            while not exhausted and (
+                not pending or len(pending) + len(ready) < max_in_flight
+            ):
+                try:
+                    job = next(jobs)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending.add(
+                    workers.submit(
+                        _answer_job, pool, job, context_format, timeout, budget
+                    )
+                )
+
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                for position, result in future.result():
+                    if not ordered:
+                        yield result
+                    else:
+                        heapq.heappush(ready, (position, result))
+            while ready and ready[0][0] == next_position:
+                yield heapq.heappop(ready)[1]
+                next_position += 1
+
+
+def _print_progress(done, errors, elapsed, stream):
+    rate = done / elapsed if elapsed > 0 else 0.0
+    stream.write(f"\r[batch] {done} answered, {errors} errors, {rate:.2f} q/s")
+    stream.flush()
+
+
+def run_batch(
+    input_stream,
+    output_stream,
+    pool,
+    concurrency=4,
+    ordered=True,
+    context_format="pipe",
+    timeout=None,
+    progress=True,
+    progress_stream=sys.stderr,
+    group_contexts=False,
+    max_input_tokens=None,
+    provider="openai",
+    model="gpt-4o",
+):
+    """
+    Reads questions as JSON lines, answers them concurrently and writes the answers as JSON lines.
+
+    Parameters:
+        input_stream: Text stream of JSON lines (a file or stdin).
+        output_stream: Text stream the answers are written to (a file or stdout).
+        pool (AgentPool): The executor pool.
+        concurrency (int): Number of questions answered at the same time.
+        ordered (bool): Write answers in input order (default) or as they complete.
+        context_format (str): The format threads are rendered in.
+        timeout (float): Optional deadline in seconds for each question.
+        progress (bool): Whether to show a progress line on `progress_stream`.
+        progress_stream: Stream for the progress line. Default is stderr.
+        group_contexts (bool): Answer the threads about the same document in one agent call
+                               (see `batch_answer`).
+        max_input_tokens (int): Optional token budget of each input (see `batch_answer`).
+        provider (str): The provider of the pool model.
+        model (str): The model of the pool.
+
+    Returns:
+        dict: Throughput summary with "answered", "errors", "elapsed_seconds",
+              "questions_per_second", "latency_p50" and "latency_p95".
+    """
+    started = time.perf_counter()
+    latencies = []
+    errors = 0
+
+    for result in batch_answer(
+        read_jsonl(input_stream),
+        pool,
+        concurrency=concurrency,
+        ordered=ordered,
+        context_format=context_format,
+        timeout=timeout,
+        group_contexts=group_contexts,
+        max_input_tokens=max_input_tokens,
+        provider=provider,
+        model=model,
+    ):
+        output_stream.write(json.dumps(result) + "\n")
+        output_stream.flush()
+        latencies.append(result["latency"])
+        errors += result["error"] is not None
+        if progress:
+            _print_progress(
+                len(latencies), errors, time.perf_counter() - started, progress_stream
+            )
+
+    if progress:
+        progress_stream.write("\n")
+
+    elapsed = time.perf_counter() - started
+    return {
+        "answered": len(latencies),
+        "errors": errors,
+        "elapsed_seconds": elapsed,
+        "questions_per_second": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "latency_p50": float(np.percentile(latencies, 50)) if latencies else None,
+        "latency_p95": float(np.percentile(latencies, 95)) if latencies else None,
+    }
@@ -12,12 +12,100 @@ warnings.filterwarnings(
 from dotenv import load_dotenv
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage  # noqa: F401
 
+from src.utils.prompt_budget import prompt_budget, trim_to_budget
+
 from .agent_tools import tools
 
 # load environment variables from .env file
 load_dotenv()
 
 
+# The system prompt that opens every chat session.
+chat_system_prompt = (
+    "You are a helpful financial assistant. Your task is to answer the user's questions "
+    "based on the provided context analyzing carefully the information. If something is not clear, "
+    "ask the user for more information. You are not allowed to make up information. If you don't know the answer, "
+    "say 'I don't know' and ask the user for more data or details."
+)
+
+
+def start_chat_session(
+    model="gpt-4o",
+    provider="openai",
+    temperature=0,
+    tools=tools,
+    prompt_style="structured-chat-agent",
+    memory_flag=True,
+    handle_parsing_errors=True,
+    verbose=False,
+    agent=None,
+):
+    """
+    Creates the agent executor and the conversation memory of a new chat session.
+
+    Parameters:
+        model (str): The model to use. Default is "gpt-4o".
+        provider (str): The provider of the model. Default is "openai".
+        temperature (float): The temperature setting for the model. Default is 0.
+        tools (list): List of tools to use with the agent.
+        prompt_style (str): The style of the prompt. Default is "structured-chat-agent".
+        memory_flag (bool): Flag for using memory. Default is True.
+        handle_parsing_errors (bool): Flag for handling parsing errors. Default is True.
+        verbose (bool): Flag for verbose output. Default is False.
+        agent: Optional agent runnable shared across sessions (see `agent_executor_builder`).
+
+    Returns:
+        tuple: (agent_executor, memory) of the session, with the system prompt in the memory.
+    """
+    agent_executor, memory = agent_executor_builder(
+        model=model,
+        provider=provider,
+        temperature=temperature,
+        tools=tools,
+        prompt_style=prompt_style,
+        memory_flag=memory_flag,
+        handle_parsing_errors=handle_parsing_errors,
+        verbose=verbose,
+        agent=agent,
+    )
+
+    # Add the system prompt to the memory.
+    memory.chat_memory.add_message(SystemMessage(content=chat_system_prompt))
+    return agent_executor, memory
+
+
+def chat_turn(
+    agent_executor,
+    memory,
+    user_input,
+    max_input_tokens=None,
+    provider="openai",
+    model="gpt-4o",
+):
+    """
+    Sends one user message to a chat session and returns the reply of the agent.
+
+    Parameters:
+        agent_executor: The executor of the session.
+        memory: The conversation memory of the session.
+        user_input (str): The user message.
+        max_input_tokens (int): Optional token budget of the message (see `prompt_budget`);
+                                a longer message, e.g. a pasted document, is trimmed in the
+                                middle before it is sent (see `trim_to_budget`).
+        provider (str): The provider of the session model, whose tokenizer counts the message.
+        model (str): The model of the session.
+
+    Returns:
+        str: The reply of the agent.
+    """
+    if max_input_tokens is not None:
+        user_input, _ = trim_to_budget(user_input, max_input_tokens, provider, model)
+    memory.chat_memory.add_message(HumanMessage(content=user_input))
+    response = agent_executor.invoke({"input": user_input})
+    memory.chat_memory.add_message(AIMessage(content=response["output"]))
+    return response["output"]
+
+
 def chat(
     initial_input,
     model="gpt-4o",
@@ -43,16 +131,8 @@ def chat(
         handle_parsing_errors (bool): Flag for handling parsing errors. Default is True.
         verbose (bool): Flag for verbose output. Default is False.
     """
-    # Define the system prompt.
-    system_prompt = (
-        "You are a helpful financial assistant. Your task is to answer the user's questions "
-        "based on the provided context analyzing carefully the information. If something is not clear, "
-        "ask the user for more information. You are not allowed to make up information. If you don't know the answer, "
-        "say 'I don't know' and ask the user for more data or details."
-    )
-
-    # Create an agent executor with the specified parameters.
-    agent_executor, memory = agent_executor_builder(
+    # Create the agent executor and the memory of the session.
+    agent_executor, memory = start_chat_session(
         model=model,
         provider=provider,
         temperature=temperature,
@@ -63,17 +143,18 @@ def chat(
         verbose=verbose,
     )
 
-    print("Hi Welcome to the chat! Type 'exit' to end the conversation.")
+    max_input_tokens = prompt_budget(model)
 
-    # Add the system prompt to the memory.
-    memory.chat_memory.add_message(SystemMessage(content=system_prompt))
+    print("Hi Welcome to the chat! Type 'exit' to end the conversation.")
 
     # Process initial input if provided
     if initial_input and initial_input.strip():
-        memory.chat_memory.add_message(HumanMessage(content=initial_input))
-        response = agent_executor.invoke({"input": initial_input})
-        print("AI agent:", response["output"])
-        memory.chat_memory.add_message(AIMessage(content=response["output"]))
+        print(
+            "AI agent:",
+            chat_turn(
+                agent_executor, memory, initial_input, max_input_tokens, provider, model
+            ),
+        )
 
     # Enter the interactive chat loop.
     while True:
@@ -82,9 +163,11 @@ def chat(
             print("Exiting the program.")
             break
 
-        memory.chat_memory.add_message(HumanMessage(content=user_input))
-        response = agent_executor.invoke({"input": user_input})
-        print("AI agent:", response["output"])
-        memory.chat_memory.add_message(AIMessage(content=response["output"]))
+        print(
+            "AI agent:",
+            chat_turn(
+                agent_executor, memory, user_input, max_input_tokens, provider, model
+            ),
+        )
 
     print("Thank you for using the chat! Goodbye!")
@@ -0,0 +1,272 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+class TimeoutException(Exception):
+    """Raised when an agent invocation runs past its wall-clock deadline."""
+
+    pass
+
+
+class Deadline:
+    """
+    Wall-clock deadline measured on the monotonic clock.
+
+    Unlike `signal.alarm`, a Deadline can be checked from any thread or asyncio task,
+    so it is safe to use inside evaluation workers.
+
+    Parameters:
+        seconds (float): Time budget, in seconds, starting from construction.
+    """
+
+    def __init__(self, seconds):
+        self.seconds = float(seconds)
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + self.seconds
+
+    def elapsed(self):
+        return time.monotonic() - self.started_at
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+
+class DeadlineCallbackHandler(BaseCallbackHandler):
+    """
+    Callback handler that cooperatively cancels an agent run once its deadline is reached.
+
+    The handler is checked at every LLM call, tool call and agent step. It raises
+    `TimeoutException` (the handler sets `raise_error`, so LangChain propagates it) when:
+        - the deadline has expired or the run was cancelled from outside, or
+        - the remaining time is shorter than the average duration of the previous
+          iterations, so another Thought/Action round would not fit in the budget.
+
+    It also records the (action, observation) pairs seen so far, which are used to build
+    a best-partial answer when the run is stopped early.
+    """
+
+    raise_error = True
+
+    def __init__(self, deadline):
+        self.deadline = deadline
+        self.cancelled = threading.Event()
+        self.intermediate_steps = []
+        self.iterations = 0
+        self._pending_action = None
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def _check(self, where):
+        if self.cancelled.is_set():
+            raise TimeoutException(f"Agent execution cancelled before {where}.")
+        if self.deadline.expired():
+            raise TimeoutException(
+                f"Agent execution exceeded its {self.deadline.seconds}s deadline before {where}."
+            )
+
+    def iteration_budget_exhausted(self):
+        """
+        Returns True if the remaining time is shorter than the average iteration so far.
+        """
+        if self.iterations == 0:
+            return False
+        average_iteration = self.deadline.elapsed() / self.iterations
+        return self.deadline.remaining() < average_iteration
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self._check("an LLM call")
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self._check("an LLM call")
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        self._check("a tool call")
+
+    def on_agent_action(self, action, **kwargs):
+        self.iterations += 1
+        self._pending_action = action
+        self._check("a tool call")
+
+    def on_tool_end(self, output, **kwargs):
+        if self._pending_action is not None:
+            self.intermediate_steps.append((self._pending_action, str(output)))
+            self._pending_action = None
+        if self.iteration_budget_exhausted():
+            raise TimeoutException(
+                "Not enough time left in the deadline for another agent iteration."
+            )
+
+
+def best_partial_answer(intermediate_steps):
+    """
+    Builds the best available answer from the steps completed before the deadline.
+
+    The last numeric tool observation (usually an `arithmetic_calculator` result) is the
+    most likely candidate, so it is preferred; otherwise the last non-error observation
+    is returned. An empty string is returned if nothing usable was produced.
+
+    Parameters:
+        intermediate_steps (list): (AgentAction, observation) pairs.
+
+    Returns:
+        str: The partial answer.
+    """
+    fallback = ""
+    for action, observation in reversed(intermediate_steps):
+        observation = str(observation).strip().strip('"')
+        if not observation or observation.lower().startswith("error"):
+            continue
+        try:
+            return str(round(float(observation), 4))
+        except ValueError:
+            if not fallback and getattr(action, "tool", "") != "_Exception":
+                fallback = observation
+    return fallback
+
+
+def _partial_response(handler, reason):
+    return {
+        "output": best_partial_answer(handler.intermediate_steps),
+        "intermediate_steps": list(handler.intermediate_steps),
+        "timed_out": True,
+        "timeout_reason": reason,
+    }
+
+
+# Output of an AgentExecutor stopped by its own `max_iterations` or `max_execution_time`.
+EXECUTOR_STOPPED_OUTPUT = "Agent stopped due to iteration limit or time limit."
+
+
+def _with_partial_answer(response, handler=None):
+    # The executor budget usually runs out just before the deadline: answer from its steps.
+    if (
+        not isinstance(response, dict)
+        or response.get("output") != EXECUTOR_STOPPED_OUTPUT
+    ):
+        return response
+    steps = response.get("intermediate_steps")
+    if steps is None:
+        steps = handler.intermediate_steps if handler is not None else []
+    return {
+        **response,
+        "output": best_partial_answer(steps),
+        "timed_out": True,
+        "timeout_reason": "the agent executor reached its iteration or time limit",
+    }
+
+
+def _merge_callbacks(config, handler):
+    config = dict(config or {})
+    callbacks = config.get("callbacks") or []
+    if isinstance(callbacks, list):
+        config["callbacks"] = callbacks + [handler]
+    else:
+        # A callback manager was passed; register the handler on it.
+        callbacks.add_handler(handler, inherit=True)
+        config["callbacks"] = callbacks
+    return config
+
+
+def invoke_with_deadline(agent_executor, inputs, timeout=None, config=None):
+    """
+    Invokes an agent executor with a per-invocation wall-clock deadline.
+
+    The executor runs in a daemon thread while the caller waits at most `timeout`
+    seconds. On expiry the run is cancelled cooperatively (it stops at its next LLM or
+    tool call) and a best-partial answer is returned instead of raising. Works from
+    worker threads, where `signal.alarm` is not available.
+
+    Parameters:
+        agent_executor: The AgentExecutor to invoke.
+        inputs (dict): The executor inputs (e.g. {"input": ...}).
+        timeout (float): Deadline in seconds. If None, the executor is invoked directly.
+        config (dict): Optional runnable config (callbacks, tags, ...).
+
+    Returns:
+        dict: The executor response. On expiry, or when the executor stopped at its own
+              `max_execution_time` or `max_iterations` first (the same timeout is often
+              passed to both), it contains the partial "output", the completed
+              "intermediate_steps" and "timed_out": True.
+    """
+    if timeout is None:
+        return (
+            agent_executor.invoke(inputs, config)
+            if config
+            else agent_executor.invoke(inputs)
+        )
+
+    deadline = Deadline(timeout)
+    handler = DeadlineCallbackHandler(deadline)
+    run_config = _merge_callbacks(config, handler)
+    future = Future()
+
+    def _run():
+        try:
+            future.set_result(agent_executor.invoke(inputs, run_config))
+        except BaseException as e:
+            # Forward any failure (including the deadline) to the waiting caller.
+            future.set_exception(e)
+
+    threading.Thread(target=_run, daemon=True, name="agent-deadline").start()
+
+    try:
+        return _with_partial_answer(
+            future.result(timeout=deadline.remaining()), handler
+        )
+    except FutureTimeoutError:
+        handler.cancel()
+        return _partial_response(
+            handler, "deadline expired while waiting for the agent"
+        )
+    except TimeoutException as e:
+        return _partial_response(handler, str(e))
+
+
+async def ainvoke_with_deadline(agent_executor, inputs, timeout=None, config=None):
+    """
+    Async counterpart of `invoke_with_deadline`.
+
+    The run is wrapped in `asyncio.wait_for`, so on expiry the agent task is cancelled
+    (including any in-flight provider request) and a best-partial answer is returned.
+
+    Parameters:
+        agent_executor: The AgentExecutor to invoke.
+        inputs (dict): The executor inputs.
+        timeout (float): Deadline in seconds. If None, the executor is awaited directly.
+        config (dict): Optional runnable config.
+
+    Returns:
+        dict: The executor response, or a partial response with "timed_out": True (also
+              when the executor stopped at its own limits first).
+    """
+    if timeout is None:
+        return await agent_executor.ainvoke(inputs, config)
+
+    deadline = Deadline(timeout)
+    handler = DeadlineCallbackHandler(deadline)
+    run_config = _merge_callbacks(config, handler)
+
+    try:
+        return _with_partial_answer(
+            await asyncio.wait_for(
+                agent_executor.ainvoke(inputs, run_config),
+                timeout=deadline.remaining(),
+            ),
+            handler,
+        )
+    except asyncio.TimeoutError:
+        handler.cancel()
+        return _partial_response(
+            handler, "deadline expired while waiting for the agent"
+        )
+    except TimeoutException as e:
+        return _partial_response(handler, str(e))
@@ -0,0 +1,55 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from src.utils import thread_questions
+
+
+def split_questions(sample):
+    """
+    Splits a thread into one single-question thread per question, in QA-field order.
+
+    The sub-threads share the document of `sample` (the same pre_text, post_text and table
+    objects, not copies), so the context is parsed once.
+
+    Parameters:
+        sample (dict): The thread (raw or processed layout, without the exact answers).
+
+    Returns:
+        list: The single-question threads; `[sample]` if it has at most one question.
+    """
+    questions = thread_questions(sample)
+    if len(questions) <= 1:
+        return [sample]
+    document = {
+        key: sample[key]
+        for key in ("pre_text", "post_text", "table", "table_ori", "id")
+        if key in sample
+    }
+    return [
+        {**document, "qa": [{"qa_field": f"qa_{i}", "question": question}]}
+        for i, question in enumerate(questions)
+    ]
+
+
+def answer_decomposed(sample, answer_question, max_workers=None):
+    """
+    Answers a multi-question thread with one focused sub-agent per question, run concurrently.
+
+    Parameters:
+        sample (dict): The thread.
+        answer_question (callable): Called with each single-question thread (see
+                                    `split_questions`); returns the list of parsed answers of
+                                    its sub-agent. Called from worker threads, so it must build
+                                    or borrow its own agent executor.
+        max_workers (int): Maximum number of concurrent sub-agents. Default is one per question.
+
+    Returns:
+        list: One answer per question, in QA-field order: the first answer of each sub-agent,
+              or None if it gave none. A thread with a single question is answered by one
+              call and its answers are returned unchanged.
+    """
+    sub_samples = split_questions(sample)
+    if len(sub_samples) == 1:
+        return list(answer_question(sub_samples[0]))
+    with ThreadPoolExecutor(max_workers=max_workers or len(sub_samples)) as workers:
+        results = list(workers.map(answer_question, sub_samples))
+    return [answers[0] if answers else None for answers in results]
@@ -0,0 +1,238 @@
+import asyncio
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+
+from src.utils.tokenizers import approximate_token_count
+
+from .instrumentation import estimate_cost
+
+# Key of the per-call hedging record in the response metadata of the returned message; the
+# `AgentMetricsCallbackHandler` aggregates it into "hedges_fired", "hedge_wins", ...
+HEDGE_METADATA_KEY = "hedge"
+
+# Shared by all hedged models: every hedged call holds at most two workers.
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _hedge_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=64, thread_name_prefix="hedge")
+        return _executor
+
+
+def _usage(message):
+    usage = getattr(message, "usage_metadata", None) or {}
+    return usage.get("input_tokens", 0) or 0, usage.get("output_tokens", 0) or 0
+
+
+class HedgedChatModel(BaseChatModel):
+    """
+    Chat model that hedges slow or failed provider calls.
+
+    Each call goes to `primary`. If it has not answered after `hedge_delay` seconds, or as
+    soon as it fails, the same messages are sent to `hedge` (the same or another
+    model/provider). The first successful answer is returned and the other call is cancelled:
+    async calls are cancelled for real, a sync call that already started is abandoned and its
+    result discarded. An error is only raised when both calls fail.
+
+    Every returned message carries a record of the call under
+    `response_metadata["hedge"]`: "fired", "reason" ("delay" or "error"), "winner"
+    ("primary" or "hedge") and the tokens and cost of the losing call ("extra_prompt_tokens",
+    "extra_completion_tokens", "extra_cost_usd"). A loser that did not finish is counted with
+    its approximate prompt tokens, since providers bill the prompt of a cancelled request.
+    `stats()` returns the totals since the model was built.
+
+    Built by `llm_builder` when `hedge_delay` is set.
+    """
+
+    primary: Any
+    hedge: Any
+    hedge_delay: float = 2.0
+    primary_model: Optional[str] = None
+    hedge_model: Optional[str] = None
+
+    _stats: dict = PrivateAttr(default_factory=dict)
+    _stats_lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self):
+        return "hedged"
+
+    def bind_tools(self, tools, **kwargs):
+        # Both calls must see the same tools; the bound runnables are invoked as they are.
+        return HedgedChatModel(
+            primary=self.primary.bind_tools(tools, **kwargs),
+            hedge=self.hedge.bind_tools(tools, **kwargs),
+            hedge_delay=self.hedge_delay,
+            primary_model=self.primary_model,
+            hedge_model=self.hedge_model,
+        )
+
+    def stats(self):
+        """
+        Returns the hedging totals of this model.
+
+        Returns:
+            dict: "calls", "hedges_fired", "hedge_wins" (hedges that answered first),
+                  "failovers" (hedges fired because the primary failed), "hedge_win_rate"
+                  (hedge wins over fired hedges), "extra_prompt_tokens",
+                  "extra_completion_tokens" and "extra_cost_usd" (None if a price is unknown).
+        """
+        with self._stats_lock:
+            stats = {
+                "calls": 0,
+                "hedges_fired": 0,
+                "hedge_wins": 0,
+                "failovers": 0,
+                "extra_prompt_tokens": 0,
+                "extra_completion_tokens": 0,
+                "extra_cost_usd": 0.0,
+                **self._stats,
+            }
+        stats["hedge_win_rate"] = (
+            stats["hedge_wins"] / stats["hedges_fired"]
+            if stats["hedges_fired"]
+            else None
+        )
+        return stats
+
+    def _record(self, messages, message, winner, reason=None, loser=None, call=None):
+        # Builds the per-call record, adds it to the totals and returns the ChatResult.
+        # `loser` is the name of the other call and `call` its future or task.
+        extra_prompt_tokens = extra_completion_tokens = 0
+        extra_cost = 0.0
+        if call is not None and not call.done():
+            # Still running: its prompt is billed, its completion is unknown.
+            extra_prompt_tokens = approximate_token_count(
+                "\n".join(str(m.content) for m in messages)
+            )
+        elif call is not None and not call.cancelled() and call.exception() is None:
+            extra_prompt_tokens, extra_completion_tokens = _usage(call.result())
+        if extra_prompt_tokens or extra_completion_tokens:
+            loser_model = self.hedge_model if loser == "hedge" else self.primary_model
+            extra_cost = estimate_cost(
+                loser_model, extra_prompt_tokens, extra_completion_tokens
+            )
+
+        record = {
+            "fired": reason is not None,
+            "reason": reason,
+            "winner": winner,
+            "extra_prompt_tokens": extra_prompt_tokens,
+            "extra_completion_tokens": extra_completion_tokens,
+            "extra_cost_usd": extra_cost,
+        }
+        with self._stats_lock:
+            stats = self._stats
+            stats["calls"] = stats.get("calls", 0) + 1
+            stats["hedges_fired"] = stats.get("hedges_fired", 0) + (reason is not None)
+            stats["hedge_wins"] = stats.get("hedge_wins", 0) + (winner == "hedge")
+            stats["failovers"] = stats.get("failovers", 0) + (reason == "error")
+            for key in ("extra_prompt_tokens", "extra_completion_tokens"):
+                stats[key] = stats.get(key, 0) + record[key]
+            if stats.get("extra_cost_usd", 0.0) is not None:
+                stats["extra_cost_usd"] = (
+                    None
+                    if extra_cost is None
+                    else stats.get("extra_cost_usd", 0.0) + extra_cost
+                )
+
+        message = message.model_copy(
+            update={
+                "response_metadata": {
+                    **message.response_metadata,
+                    HEDGE_METADATA_KEY: record,
+                }
+            }
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        executor = _hedge_executor()
+        calls = {
+            executor.submit(
+                self.primary.invoke, messages, stop=stop, **kwargs
+            ): "primary"
+        }
+        done, _ = wait(calls, timeout=self.hedge_delay)
+        reason = None
+        if not done:
+            reason = "delay"
+        elif next(iter(done)).exception() is not None:
+            reason = "error"
+        else:
+            return self._record(messages, next(iter(done)).result(), "primary")
+        calls[executor.submit(self.hedge.invoke, messages, stop=stop, **kwargs)] = (
+            "hedge"
+        )
+
+        errors = []
+        pending = set(calls)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    errors.append(future.exception())
+                    continue
+                loser = next(f for f in calls if f is not future)
+                loser.cancel()
+                return self._record(
+                    messages,
+                    future.result(),
+                    calls[future],
+                    reason,
+                    calls[loser],
+                    loser,
+                )
+        raise errors[0]
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        calls = {
+            asyncio.ensure_future(
+                self.primary.ainvoke(messages, stop=stop, **kwargs)
+            ): "primary"
+        }
+        done, _ = await asyncio.wait(calls, timeout=self.hedge_delay)
+        reason = None
+        if not done:
+            reason = "delay"
+        elif next(iter(done)).exception() is not None:
+            reason = "error"
+        else:
+            return self._record(messages, next(iter(done)).result(), "primary")
+        calls[
+            asyncio.ensure_future(self.hedge.ainvoke(messages, stop=stop, **kwargs))
+        ] = "hedge"
+
+        errors = []
+        pending = set(calls)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is not None:
+                        errors.append(task.exception())
+                        continue
+                    loser = next(t for t in calls if t is not task)
+                    return self._record(
+                        messages,
+                        task.result(),
+                        calls[task],
+                        reason,
+                        calls[loser],
+                        loser,
+                    )
+        finally:
+            for task in calls:
+                task.cancel()
+        raise errors[0]
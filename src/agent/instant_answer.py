@@ -10,8 +10,14 @@ warnings.filterwarnings(
 )
 from dotenv import load_dotenv
 
+from src.utils import format_model_input
+from src.utils.prompt_budget import prompt_budget, trim_to_budget
+
 from .agent_tools import tools
-from .prompt_templates import system_prompt  # noqa: F401
+from .deadline import invoke_with_deadline
+from .program_solver import format_answer
+from .prompt_templates import build_task_input, system_prompt  # noqa: F401
+from .template_solver import DEFAULT_MIN_CONFIDENCE, as_thread, solve_thread
 
 # load environment variables from .env file
 load_dotenv()
@@ -27,6 +33,15 @@ def direct_answer(
     memory_flag=False,
     handle_parsing_errors=True,
     verbose=True,
+    timeout=None,
+    request_timeout=None,
+    callbacks=None,
+    context_format="pipe",
+    hedge_delay=None,
+    hedge_model=None,
+    hedge_provider=None,
+    fast_path=False,
+    min_confidence=DEFAULT_MIN_CONFIDENCE,
 ):
     """
     Function to get a direct answer from the model using the specified parameters.
@@ -41,10 +56,31 @@ def direct_answer(
         memory_flag (bool): Flag to indicate if memory should be used. Default is False.
         handle_parsing_errors (bool): Flag to indicate if parsing errors should be handled. Default is True.
         verbose (bool): Flag to indicate if verbose output is desired. Default is True.
+        timeout (float): Optional wall-clock deadline in seconds for the whole invocation. On expiry
+                         the best partial answer found so far is returned. Default is None.
+        request_timeout (float): Optional timeout in seconds for each single LLM call. Default is None.
+        callbacks (list): Optional callback handlers attached to the agent run, e.g. an
+                          `AgentMetricsCallbackHandler` to record step latency and tokens.
+        context_format (str): If the input is a thread (or JSON text of one), the format it is
+                              rendered in: "pipe" (default), "csv", "json" or the legacy "repr".
+        hedge_delay (float): Optional delay in seconds after which a slow (or failed) LLM call
+                             is duplicated to the hedge model; the first answer wins.
+        hedge_model (str): Model of the hedge requests. Default is `model`.
+        hedge_provider (str): Provider of the hedge requests. Default is `provider`.
+        fast_path (bool): If True and the input is a thread, its templated questions are first
+                          answered from the table by `solve_thread`, without building the agent.
+                          Default is False.
+        min_confidence (float): Minimum confidence of a fast-path answer.
 
     Returns:
         str: The response from the model.
     """
+    if fast_path:
+        thread = as_thread(input)
+        solution = solve_thread(thread, min_confidence) if thread else None
+        if solution is not None:
+            return [format_answer(answer) for answer in solution["answers"]]
+
     # Create an agent executor with the specified parameters
     agent_executor, memory = agent_executor_builder(
         model=model,
@@ -55,15 +91,63 @@ def direct_answer(
         memory_flag=memory_flag,
         handle_parsing_errors=handle_parsing_errors,
         verbose=verbose,
+        max_execution_time=timeout,
+        request_timeout=request_timeout,
+        callbacks=callbacks,
+        hedge_delay=hedge_delay,
+        hedge_model=hedge_model,
+        hedge_provider=hedge_provider,
+    )
+
+    return answer_with_executor(
+        agent_executor,
+        input,
+        context_format=context_format,
+        timeout=timeout,
+        max_input_tokens=prompt_budget(model),
+        provider=provider,
+        model=model,
     )
 
+
+def answer_with_executor(
+    agent_executor,
+    input,
+    context_format="pipe",
+    timeout=None,
+    max_input_tokens=None,
+    provider="openai",
+    model="gpt-4o",
+):
+    """
+    Answers an input with an already built agent executor.
+
+    Used by `direct_answer` and by the long-running modes (batch, daemon, HTTP server), which
+    keep warm executors instead of building one per question.
+
+    Parameters:
+        agent_executor: The agent executor to invoke.
+        input (str, dict or list): The input question, prompt or thread(s).
+        context_format (str): The format threads are rendered in (see `format_model_input`).
+        timeout (float): Optional wall-clock deadline in seconds for the invocation.
+        max_input_tokens (int): Optional token budget of the rendered input (see
+                                `prompt_budget`); a longer input keeps its beginning and its
+                                questions at the end (see `trim_to_budget`).
+        provider (str): The provider of the executor model, whose tokenizer counts the input.
+        model (str): The model of the executor.
+
+    Returns:
+        list: The comma-separated answers of the model.
+    """
+    model_input = format_model_input(input, context_format)
+    if max_input_tokens is not None:
+        model_input, _ = trim_to_budget(model_input, max_input_tokens, provider, model)
+
     # Get the response from the agent executor
-    response = agent_executor.invoke(
-        {
-            # "input": f"""Given the following input extract the informations at the index 2702 and then answer the corresponding questions in the input. {model_input}"""
-            "input": f"""{system_prompt}. Pay attention to the format it must respect the guidelines. Task: Given the following input extract the informations and then answer the corresponding questions in the input. Do not output 
-            any explanantion in the output only the answer {input}"""
-        }
+    response = invoke_with_deadline(
+        agent_executor,
+        {"input": build_task_input(model_input)},
+        timeout=timeout,
     )
 
     answers = response["output"].split(",")
@@ -0,0 +1,567 @@
+import json
+import threading
+import time
+
+import numpy as np
+from langchain_core.callbacks import BaseCallbackHandler
+
+from .output_repair import OUTPUT_REPAIRED_EVENT
+
+# Indicative list prices in USD per 1M tokens: (prompt, completion).
+# Model names are matched by longest prefix, so dated snapshots share the base price.
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "o1": (15.00, 60.00),
+    "o3-mini": (1.10, 4.40),
+    "claude-3-5-haiku": (0.80, 4.00),
+    "claude-3-5-sonnet": (3.00, 15.00),
+    "claude-3-7-sonnet": (3.00, 15.00),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-1.5-pro": (1.25, 5.00),
+}
+
+
+# Price multipliers of cached prompt tokens, by model family: (cache read, cache write).
+# OpenAI caches automatically at half price; Anthropic charges extra to write the cache.
+CACHE_PRICE_FACTORS = {
+    "gpt": (0.5, 1.0),
+    "o1": (0.5, 1.0),
+    "o3": (0.5, 1.0),
+    "claude": (0.1, 1.25),
+    "gemini": (0.25, 1.0),
+}
+
+
+def estimate_cost(
+    model,
+    prompt_tokens,
+    completion_tokens,
+    cache_read_tokens=0,
+    cache_creation_tokens=0,
+):
+    """
+    Estimates the USD cost of a number of prompt and completion tokens for a model.
+
+    Parameters:
+        model (str): The model name (e.g., "gpt-4o", "claude-3-5-sonnet-20241022").
+        prompt_tokens (int): Number of prompt (input) tokens, including cached ones.
+        completion_tokens (int): Number of completion (output) tokens.
+        cache_read_tokens (int): Prompt tokens served from the provider prompt cache.
+        cache_creation_tokens (int): Prompt tokens written to the provider prompt cache.
+
+    Returns:
+        float: The estimated cost, or None if the model has no known price.
+    """
+    if not model:
+        return None
+    matches = [name for name in MODEL_PRICES if model.startswith(name)]
+    if not matches:
+        return None
+    prompt_price, completion_price = MODEL_PRICES[max(matches, key=len)]
+    read_factor, write_factor = next(
+        (
+            factors
+            for family, factors in CACHE_PRICE_FACTORS.items()
+            if model.startswith(family)
+        ),
+        (1.0, 1.0),
+    )
+    uncached_tokens = prompt_tokens - cache_read_tokens - cache_creation_tokens
+    prompt_cost = prompt_price * (
+        uncached_tokens
+        + cache_read_tokens * read_factor
+        + cache_creation_tokens * write_factor
+    )
+    return (prompt_cost + completion_tokens * completion_price) / 1e6
+
+
+def extract_token_usage(response):
+    """
+    Extracts the token usage of an LLMResult.
+
+    The standard `usage_metadata` of chat messages is preferred; the provider-specific
+    `llm_output` payloads (OpenAI "token_usage", Anthropic "usage") are used as a fallback.
+
+    Returns:
+        dict: "prompt_tokens", "completion_tokens", and the prompt tokens read from
+              ("cache_read") and written to ("cache_creation") the provider prompt cache.
+    """
+    usage_totals = {
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "cache_read": 0,
+        "cache_creation": 0,
+    }
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(
+                getattr(generation, "message", None), "usage_metadata", None
+            )
+            if usage:
+                details = usage.get("input_token_details") or {}
+                usage_totals["prompt_tokens"] += usage.get("input_tokens", 0) or 0
+                usage_totals["completion_tokens"] += usage.get("output_tokens", 0) or 0
+                usage_totals["cache_read"] += details.get("cache_read", 0) or 0
+                usage_totals["cache_creation"] += details.get("cache_creation", 0) or 0
+    if usage_totals["prompt_tokens"] or usage_totals["completion_tokens"]:
+        return usage_totals
+
+    llm_output = response.llm_output or {}
+    usage = llm_output.get("token_usage") or llm_output.get("usage") or {}
+    if not isinstance(usage, dict):
+        usage = getattr(usage, "__dict__", {})
+    details = usage.get("prompt_tokens_details") or {}
+    usage_totals["prompt_tokens"] = (
+        usage.get("prompt_tokens", usage.get("input_tokens", 0)) or 0
+    )
+    usage_totals["completion_tokens"] = (
+        usage.get("completion_tokens", usage.get("output_tokens", 0)) or 0
+    )
+    usage_totals["cache_read"] = (
+        details.get("cached_tokens", usage.get("cache_read_input_tokens", 0)) or 0
+    )
+    usage_totals["cache_creation"] = usage.get("cache_creation_input_tokens", 0) or 0
+    return usage_totals
+
+
+def _new_step(iteration):
+    return {
+        "iteration": iteration,
+        "wall_time": 0.0,
+        "llm_time": 0.0,
+        "tool_time": 0.0,
+        "tools": [],
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "cache_read_tokens": 0,
+        "cache_creation_tokens": 0,
+        "llm_calls": [],
+        "parse_error": False,
+        "output_repairs": 0,
+        "hedges_fired": 0,
+        "hedge_wins": 0,
+        "hedge_extra_cost_usd": 0.0,
+    }
+
+
+class AgentMetricsCallbackHandler(BaseCallbackHandler):
+    """
+    Callback handler that records per-step latency and token usage of agent runs.
+
+    Every top-level run of the executor (one `invoke`) is recorded as a sample. Within a
+    sample, a step is one agent iteration: the LLM call that produces the next action
+    plus the tool call(s) that execute it. For each step it records wall time, LLM time,
+    tool time, prompt/completion tokens, whether the LLM output failed to parse (a
+    parse-error retry) and how many outputs were repaired locally instead. Samples also
+    keep the tool time split by tool name, so file loading in
+    `extract_financial_informations` can be told apart from arithmetic.
+
+    The handler is thread-safe and can be shared by several executors, e.g. across all
+    samples of a `measure_accuracy` run.
+
+    Parameters:
+        model (str): Optional model name, used to estimate the cost of the recorded tokens.
+    """
+
+    def __init__(self, model=None):
+        self.model = model
+        self.samples = []
+        self._lock = threading.Lock()
+        self._root_of = {}
+        self._active = {}
+        self._starts = {}
+
+    # --- run bookkeeping -------------------------------------------------
+
+    def _register(self, run_id, parent_run_id):
+        root = self._root_of.get(parent_run_id)
+        if root is not None:
+            self._root_of[run_id] = root
+        return root
+
+    def _sample_for(self, run_id):
+        root = self._root_of.get(run_id)
+        return self._active.get(root) if root is not None else None
+
+    def _close_step(self, sample, now):
+        step = sample["current_step"]
+        if (
+            step["llm_time"]
+            or step["tools"]
+            or step["parse_error"]
+            or step["output_repairs"]
+        ):
+            step["wall_time"] = now - sample["step_started"]
+            sample["steps"].append(step)
+        sample["current_step"] = _new_step(len(sample["steps"]) + 1)
+        sample["step_started"] = now
+
+    def on_chain_start(
+        self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs
+    ):
+        with self._lock:
+            if self._register(run_id, parent_run_id) is not None:
+                return
+            # A run whose parent we have not seen is the top-level executor run.
+            now = time.perf_counter()
+            self._root_of[run_id] = run_id
+            self._active[run_id] = {
+                "started": now,
+                "step_started": now,
+                "steps": [],
+                "current_step": _new_step(1),
+                "tool_time_by_tool": {},
+            }
+
+    def _finish_sample(self, run_id, error=None):
+        with self._lock:
+            sample = self._active.pop(run_id, None)
+            if sample is None:
+                return
+            now = time.perf_counter()
+            self._close_step(sample, now)
+            steps = sample["steps"]
+            record = {
+                "sample": len(self.samples),
+                "wall_time": now - sample["started"],
+                "llm_time": sum(step["llm_time"] for step in steps),
+                "tool_time": sum(step["tool_time"] for step in steps),
+                "tool_time_by_tool": sample["tool_time_by_tool"],
+                "prompt_tokens": sum(step["prompt_tokens"] for step in steps),
+                "completion_tokens": sum(step["completion_tokens"] for step in steps),
+                "cache_read_tokens": sum(step["cache_read_tokens"] for step in steps),
+                "cache_creation_tokens": sum(
+                    step["cache_creation_tokens"] for step in steps
+                ),
+                "parse_retries": sum(1 for step in steps if step["parse_error"]),
+                "output_repairs": sum(step["output_repairs"] for step in steps),
+                "hedges_fired": sum(step["hedges_fired"] for step in steps),
+                "hedge_wins": sum(step["hedge_wins"] for step in steps),
+                "hedge_extra_cost_usd": sum(
+                    step["hedge_extra_cost_usd"] for step in steps
+                ),
+                "iterations": len(steps),
+                "error": str(error) if error is not None else None,
+                "steps": steps,
+            }
+            record["cost_usd"] = estimate_cost(
+                self.model,
+                record["prompt_tokens"],
+                record["completion_tokens"],
+                record["cache_read_tokens"],
+                record["cache_creation_tokens"],
+            )
+            self.samples.append(record)
+            self._root_of = {
+                child: root for child, root in self._root_of.items() if root != run_id
+            }
+
+    def on_chain_end(self, outputs, *, run_id, parent_run_id=None, **kwargs):
+        if self._root_of.get(run_id) == run_id:
+            self._finish_sample(run_id)
+
+    def on_chain_error(self, error, *, run_id, parent_run_id=None, **kwargs):
+        if self._root_of.get(run_id) == run_id:
+            self._finish_sample(run_id, error=error)
+
+    # --- LLM calls -------------------------------------------------------
+
+    def _llm_start(self, run_id, parent_run_id):
+        with self._lock:
+            self._register(run_id, parent_run_id)
+            sample = self._sample_for(run_id)
+            if sample is None:
+                return
+            now = time.perf_counter()
+            # A new LLM call after the previous step's LLM call opens the next iteration.
+            if sample["current_step"]["llm_time"]:
+                self._close_step(sample, now)
+            self._starts[run_id] = now
+
+    def on_llm_start(
+        self, serialized, prompts, *, run_id, parent_run_id=None, **kwargs
+    ):
+        self._llm_start(run_id, parent_run_id)
+
+    def on_chat_model_start(
+        self, serialized, messages, *, run_id, parent_run_id=None, **kwargs
+    ):
+        self._llm_start(run_id, parent_run_id)
+
+    def on_llm_end(self, response, *, run_id, parent_run_id=None, **kwargs):
+        with self._lock:
+            sample = self._sample_for(run_id)
+            started = self._starts.pop(run_id, None)
+            if sample is None or started is None:
+                return
+            step = sample["current_step"]
+            duration = time.perf_counter() - started
+            usage = extract_token_usage(response)
+            step["llm_time"] += duration
+            step["prompt_tokens"] += usage["prompt_tokens"]
+            step["completion_tokens"] += usage["completion_tokens"]
+            step["cache_read_tokens"] += usage["cache_read"]
+            step["cache_creation_tokens"] += usage["cache_creation"]
+            # Per-call record, to verify the latency and cost effect of prompt caching.
+            step["llm_calls"].append({"llm_time": duration, **usage})
+            # Set by `HedgedChatModel` on the returned message.
+            for generations in response.generations:
+                for generation in generations:
+                    hedge = getattr(
+                        getattr(generation, "message", None), "response_metadata", {}
+                    ).get("hedge")
+                    if hedge and hedge["fired"]:
+                        step["hedges_fired"] += 1
+                        step["hedge_wins"] += hedge["winner"] == "hedge"
+                        step["hedge_extra_cost_usd"] += hedge["extra_cost_usd"] or 0.0
+
+    def on_llm_error(self, error, *, run_id, parent_run_id=None, **kwargs):
+        with self._lock:
+            sample = self._sample_for(run_id)
+            started = self._starts.pop(run_id, None)
+            if sample is not None and started is not None:
+                sample["current_step"]["llm_time"] += time.perf_counter() - started
+
+    # --- agent actions and tools ------------------------------------------
+
+    def on_agent_action(self, action, *, run_id, parent_run_id=None, **kwargs):
+        with self._lock:
+            sample = self._sample_for(run_id)
+            if sample is not None and action.tool == "_Exception":
+                sample["current_step"]["parse_error"] = True
+
+    def on_custom_event(self, name, data, *, run_id, **kwargs):
+        if name != OUTPUT_REPAIRED_EVENT:
+            return
+        with self._lock:
+            sample = self._sample_for(run_id)
+            if sample is not None:
+                sample["current_step"]["output_repairs"] += 1
+
+    def on_tool_start(
+        self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs
+    ):
+        with self._lock:
+            self._register(run_id, parent_run_id)
+            if self._sample_for(run_id) is not None:
+                name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+                self._starts[run_id] = (time.perf_counter(), name)
+
+    def _tool_end(self, run_id):
+        with self._lock:
+            sample = self._sample_for(run_id)
+            started = self._starts.pop(run_id, None)
+            if sample is None or started is None:
+                return
+            started, name = started
+            duration = time.perf_counter() - started
+            step = sample["current_step"]
+            step["tool_time"] += duration
+            step["tools"].append(name)
+            by_tool = sample["tool_time_by_tool"]
+            by_tool[name] = by_tool.get(name, 0.0) + duration
+
+    def on_tool_end(self, output, *, run_id, parent_run_id=None, **kwargs):
+        self._tool_end(run_id)
+
+    def on_tool_error(self, error, *, run_id, parent_run_id=None, **kwargs):
+        self._tool_end(run_id)
+
+    # --- exports -----------------------------------------------------------
+
+    def summary(self):
+        """
+        Aggregates the recorded samples.
+
+        Returns:
+            dict: A dictionary containing:
+                  - "samples": number of recorded agent runs.
+                  - "latency_p50" / "latency_p95": percentiles of the per-sample wall time (s).
+                  - "llm_time_mean" / "tool_time_mean": mean LLM and tool time per sample (s).
+                  - "tool_time_by_tool": total tool time per tool name (s).
+                  - "iterations_per_sample": mean number of agent iterations.
+                  - "parse_retries": total number of parse-error retries.
+                  - "output_repairs": total number of malformed outputs repaired locally.
+                  - "hedges_fired" / "hedge_wins": hedged LLM calls, and how many of them
+                    were answered first by the hedge request.
+                  - "hedge_extra_cost_usd": estimated cost of the losing requests.
+                  - "prompt_tokens" / "completion_tokens": token totals.
+                  - "cache_read_tokens" / "cache_creation_tokens": prompt tokens read from and
+                    written to the provider prompt cache.
+                  - "cache_hit_rate": share of the prompt tokens served from the cache.
+                  - "tokens_per_sample": mean prompt + completion tokens per sample.
+                  - "cost_usd": estimated total cost (None if the model price is unknown).
+              Latency and mean values are None when no sample was recorded.
+        """
+        with self._lock:
+            samples = list(self.samples)
+
+        if not samples:
+            return {
+                "samples": 0,
+                "latency_p50": None,
+                "latency_p95": None,
+                "llm_time_mean": None,
+                "tool_time_mean": None,
+                "tool_time_by_tool": {},
+                "iterations_per_sample": None,
+                "parse_retries": 0,
+                "output_repairs": 0,
+                "hedges_fired": 0,
+                "hedge_wins": 0,
+                "hedge_extra_cost_usd": 0.0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "cache_read_tokens": 0,
+                "cache_creation_tokens": 0,
+                "cache_hit_rate": None,
+                "tokens_per_sample": None,
+                "cost_usd": None,
+            }
+
+        wall_times = np.array([sample["wall_time"] for sample in samples])
+        prompt_tokens = sum(sample["prompt_tokens"] for sample in samples)
+        completion_tokens = sum(sample["completion_tokens"] for sample in samples)
+        cache_read_tokens = sum(sample["cache_read_tokens"] for sample in samples)
+        cache_creation_tokens = sum(
+            sample["cache_creation_tokens"] for sample in samples
+        )
+        tool_time_by_tool = {}
+        for sample in samples:
+            for name, duration in sample["tool_time_by_tool"].items():
+                tool_time_by_tool[name] = tool_time_by_tool.get(name, 0.0) + duration
+
+        return {
+            "samples": len(samples),
+            "latency_p50": float(np.percentile(wall_times, 50)),
+            "latency_p95": float(np.percentile(wall_times, 95)),
+            "llm_time_mean": float(np.mean([s["llm_time"] for s in samples])),
+            "tool_time_mean": float(np.mean([s["tool_time"] for s in samples])),
+            "tool_time_by_tool": tool_time_by_tool,
+            "iterations_per_sample": float(np.mean([s["iterations"] for s in samples])),
+            "parse_retries": sum(sample["parse_retries"] for sample in samples),
+            "output_repairs": sum(sample["output_repairs"] for sample in samples),
+            "hedges_fired": sum(sample["hedges_fired"] for sample in samples),
+            "hedge_wins": sum(sample["hedge_wins"] for sample in samples),
+            "hedge_extra_cost_usd": sum(
+                sample["hedge_extra_cost_usd"] for sample in samples
+            ),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cache_read_tokens": cache_read_tokens,
+            "cache_creation_tokens": cache_creation_tokens,
+            "cache_hit_rate": (
+                cache_read_tokens / prompt_tokens if prompt_tokens else None
+            ),
+            "tokens_per_sample": (prompt_tokens + completion_tokens) / len(samples),
+            "cost_usd": estimate_cost(
+                self.model,
+                prompt_tokens,
+                completion_tokens,
+                cache_read_tokens,
+                cache_creation_tokens,
+            ),
+        }
+
+    def to_jsonl(self, path=None):
+        """
+        Exports one JSON line per agent step (with its sample index).
+
+        Parameters:
+            path (str): Optional file path. If given, the lines are appended to the file.
+
+        Returns:
+            str: The JSON lines.
+        """
+        with self._lock:
+            samples = list(self.samples)
+        lines = []
+        for sample in samples:
+            for step in sample["steps"]:
+                lines.append(json.dumps({"sample": sample["sample"], **step}))
+        text = "\n".join(lines) + ("\n" if lines else "")
+        if path is not None:
+            with open(path, "a") as f:
+                f.write(text)
+        return text
+
+    def to_prometheus(self, prefix="agent"):
+        """
+        Exports the aggregates in the Prometheus text exposition format.
+
+        Parameters:
+            prefix (str): Metric name prefix. Default is "agent".
+
+        Returns:
+            str: The metrics text.
+        """
+        summary = self.summary()
+        with self._lock:
+            wall_time_sum = sum(sample["wall_time"] for sample in self.samples)
+            llm_time_sum = sum(sample["llm_time"] for sample in self.samples)
+            iterations = sum(sample["iterations"] for sample in self.samples)
+
+        lines = [
+            f"# HELP {prefix}_sample_latency_seconds Wall time of one agent invocation.",
+            f"# TYPE {prefix}_sample_latency_seconds summary",
+        ]
+        if summary["samples"]:
+            lines.append(
+                f'{prefix}_sample_latency_seconds{{quantile="0.5"}} {summary["latency_p50"]}'
+            )
+            lines.append(
+                f'{prefix}_sample_latency_seconds{{quantile="0.95"}} {summary["latency_p95"]}'
+            )
+        lines.append(f"{prefix}_sample_latency_seconds_sum {wall_time_sum}")
+        lines.append(f"{prefix}_sample_latency_seconds_count {summary['samples']}")
+
+        counters = [
+            ("llm_seconds_total", "Time spent in LLM calls.", llm_time_sum),
+            ("iterations_total", "Agent iterations.", iterations),
+            ("parse_retries_total", "Parse-error retries.", summary["parse_retries"]),
+            (
+                "output_repairs_total",
+                "Malformed outputs repaired without a retry.",
+                summary["output_repairs"],
+            ),
+            ("hedges_fired_total", "Hedged LLM calls.", summary["hedges_fired"]),
+            (
+                "hedge_wins_total",
+                "Hedged LLM calls answered first by the hedge request.",
+                summary["hedge_wins"],
+            ),
+            (
+                "hedge_extra_cost_usd_total",
+                "Estimated cost of the losing hedged requests in USD.",
+                summary["hedge_extra_cost_usd"],
+            ),
+            ("prompt_tokens_total", "Prompt tokens.", summary["prompt_tokens"]),
+            (
+                "cache_read_tokens_total",
+                "Prompt tokens served from the provider prompt cache.",
+                summary["cache_read_tokens"],
+            ),
+            (
+                "completion_tokens_total",
+                "Completion tokens.",
+                summary["completion_tokens"],
+            ),
+        ]
+        for name, description, value in counters:
+            lines.append(f"# HELP {prefix}_{name} {description}")
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            lines.append(f"{prefix}_{name} {value}")
+
+        lines.append(f"# HELP {prefix}_tool_seconds_total Time spent in tool calls.")
+        lines.append(f"# TYPE {prefix}_tool_seconds_total counter")
+        for name, duration in sorted(summary["tool_time_by_tool"].items()):
+            lines.append(f'{prefix}_tool_seconds_total{{tool="{name}"}} {duration}')
+
+        if summary["cost_usd"] is not None:
+            lines.append(f"# HELP {prefix}_cost_usd_total Estimated cost in USD.")
+            lines.append(f"# TYPE {prefix}_cost_usd_total counter")
+            lines.append(f"{prefix}_cost_usd_total {summary['cost_usd']}")
+        return "\n".join(lines) + "\n"
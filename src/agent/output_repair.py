@@ -0,0 +1,298 @@
+import ast
+import json
+import re
+
+from langchain.agents.agent import AgentOutputParser
+from langchain.agents.output_parsers import (
+    JSONAgentOutputParser,
+    ReActSingleInputOutputParser,
+)
+from langchain_core.agents import AgentAction, AgentFinish
+from langchain_core.callbacks import dispatch_custom_event
+from langchain_core.exceptions import OutputParserException
+from langchain_core.runnables import RunnableSequence
+
+from .agent_tools import strip_code_fence
+
+# Name of the custom callback event dispatched for every repaired output; counted by
+# `AgentMetricsCallbackHandler` as "output_repairs", next to the real "parse_retries".
+OUTPUT_REPAIRED_EVENT = "agent_output_repaired"
+
+_LABELS = {
+    "thought": "Thought",
+    "action input": "Action Input",
+    "action": "Action",
+    "final answer": "Final Answer",
+}
+# "**Final Answer:**", "**Action**:", "final answer:" ... at the start of a line.
+_LABEL = re.compile(
+    r"^[ \t]*\**[ \t]*(thought|action input|action|final answer)[ \t]*\**[ \t]*:[ \t]*\**[ \t]*",
+    re.IGNORECASE | re.MULTILINE,
+)
+_FINAL_ANSWER = re.compile(r"^Final Answer:", re.MULTILINE)
+_ACTION = re.compile(r"^Action\s*\d*\s*:", re.MULTILINE)
+_ACTION_INPUT = re.compile(r"^Action\s*\d*\s*Input\s*\d*\s*:", re.MULTILINE)
+_ACTION_CALL = re.compile(r"^Action:\s*(\w+)\s*\((.*)\)\s*$", re.MULTILINE | re.DOTALL)
+# A final answer in the repo format: numbers or yes/no, comma separated, optionally in a tuple.
+_ANSWER_ITEM = r'"?(?:-?\d+(?:\.\d+)?%?|yes|no)"?'
+ANSWER_TUPLE = re.compile(
+    rf"\(?\s*{_ANSWER_ITEM}(?:\s*,\s*{_ANSWER_ITEM})*\s*\)?", re.IGNORECASE
+)
+
+
+def _normalize_labels(text):
+    return _LABEL.sub(lambda match: _LABELS[match.group(1).lower()] + ": ", text)
+
+
+def repair_react_output(text, tool_names=()):
+    """
+    Rewrites a malformed ReAct output into one the ReAct parser accepts, if the intent is clear.
+
+    Handled cases:
+        - Markdown or lowercase labels ("**Final Answer:**", "action input:").
+        - Both an action and a final answer: the part written first is kept (the other is
+          a hallucinated continuation).
+        - An action written as a call ("Action: arithmetic_calculator(2 + 2)").
+        - An "Action Input:" without its "Action:" line, when exactly one tool is named.
+        - An answer in the final-answer format on the last line after "I now know the final
+          answer", without the "Final Answer:" label.
+
+    Parameters:
+        text (str): The LLM output.
+        tool_names (list): The names of the agent tools.
+
+    Returns:
+        str: The repaired output, or None if it cannot be repaired safely.
+    """
+    fixed = _normalize_labels(text)
+    call = _ACTION_CALL.search(fixed)
+    if call and call.group(1) in tool_names and not _ACTION_INPUT.search(fixed):
+        fixed = (
+            fixed[: call.start()]
+            + f"Action: {call.group(1)}\nAction Input: {call.group(2).strip()}"
+        )
+    final = _FINAL_ANSWER.search(fixed)
+    action = _ACTION.search(fixed)
+
+    if final and action:
+        if action.start() < final.start():
+            fixed = fixed[: final.start()].rstrip()
+        else:
+            fixed = fixed[: action.start()].rstrip()
+    elif not final and not action:
+        action_input = _ACTION_INPUT.search(fixed)
+        mentioned = [name for name in tool_names if name in fixed]
+        lines = [line.strip() for line in fixed.strip().splitlines() if line.strip()]
+        if action_input and len(mentioned) == 1:
+            fixed = (
+                fixed[: action_input.start()]
+                + f"Action: {mentioned[0]}\n"
+                + fixed[action_input.start() :]
+            )
+        elif (
+            lines
+            and ANSWER_TUPLE.fullmatch(lines[-1])
+            and re.search(r"final answer", fixed, re.IGNORECASE)
+        ):
+            fixed = f"{fixed.rstrip()[: -len(lines[-1])]}Final Answer: {lines[-1]}"
+        else:
+            return None
+    return fixed if fixed != text else None
+
+
+def trim_final_answer(output):
+    """
+    Drops an explanation written after a final answer in the answer format
+    (e.g. "0.1234\\n\\nThe revenue grew ..." -> "0.1234"). Other outputs are returned unchanged.
+    """
+    lines = output.strip().splitlines()
+    if len(lines) > 1 and ANSWER_TUPLE.fullmatch(lines[0].strip()):
+        return lines[0].strip()
+    return output
+
+
+def _first_json_object(text):
+    # The first balanced {...} span, ignoring braces inside strings.
+    start = text.find("{")
+    while start != -1:
+        depth, in_string, escaped = 0, False, False
+        for position in range(start, len(text)):
+            char = text[position]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif char == "\\":
+                    escaped = True
+                elif char == '"':
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char == "{":
+                depth += 1
+            elif char == "}":
+                depth -= 1
+                if depth == 0:
+                    return text[start : position + 1]
+        start = text.find("{", start + 1)
+    return None
+
+
+def _loads_tolerant(candidate):
+    candidate = candidate.strip()
+    for attempt in (
+        candidate,
+        # Trailing commas before a closing brace or bracket.
+        re.sub(r",\s*([}\]])", r"\1", candidate),
+    ):
+        try:
+            return json.loads(attempt)
+        except (json.JSONDecodeError, ValueError):
+            pass
+    try:
+        # Python-style dictionaries (single quotes, True/None).
+        return ast.literal_eval(candidate)
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        return None
+
+
+def repair_json_output(text, tool_names=()):
+    """
+    Rewrites a malformed JSON-agent output into a fenced JSON action blob, if possible.
+
+    Handled cases:
+        - The blob inside the wrong fence (```python, ``` without language, triple quotes)
+          or surrounded by explanations.
+        - Trailing commas and Python-style dictionaries.
+        - A missing "action_input" or a misspelled "Final Answer" action.
+        - A bare answer in plain text (numbers or yes/no, see `ANSWER_TUPLE`), which is
+          taken as the final answer.
+
+    Parameters:
+        text (str): The LLM output.
+        tool_names (list): The names of the agent tools.
+
+    Returns:
+        str: The repaired output, or None if it cannot be repaired safely.
+    """
+    candidates = [strip_code_fence(text)]
+    candidates += re.findall(r"```[^\n]*\n(.*?)```", text, re.DOTALL)
+    json_object = _first_json_object(text)
+    if json_object:
+        candidates.append(json_object)
+
+    for candidate in candidates:
+        value = _loads_tolerant(candidate)
+        if isinstance(value, list) and value and isinstance(value[0], dict):
+            value = value[0]
+        if isinstance(value, dict) and "action" in value:
+            if str(value["action"]).replace("_", " ").lower() == "final answer":
+                value["action"] = "Final Answer"
+            value.setdefault("action_input", "")
+            return "```json\n" + json.dumps(value) + "\n```"
+
+    # Only a bare answer is taken as final: other plain text (thoughts, refusals) is left to
+    # the parse-error retry.
+    if ANSWER_TUPLE.fullmatch(text.strip()):
+        blob = {"action": "Final Answer", "action_input": text.strip()}
+        return "```json\n" + json.dumps(blob) + "\n```"
+    return None
+
+
+class RepairingOutputParser(AgentOutputParser):
+    """
+    Wraps the output parser of a text-parsed agent and repairs recoverable outputs locally.
+
+    With `handle_parsing_errors=True` every malformed output costs a whole extra LLM
+    iteration. This parser first tries the wrapped parser; on failure it tries the repair
+    grammar ("react" or "json") and parses the repaired text. Only outputs that cannot be
+    repaired raise, and become real retries. Every repair dispatches OUTPUT_REPAIRED_EVENT.
+    """
+
+    parser: AgentOutputParser
+    grammar: str
+    tool_names: list = []
+
+    def _report(self, kind):
+        try:
+            dispatch_custom_event(
+                OUTPUT_REPAIRED_EVENT, {"grammar": self.grammar, "kind": kind}
+            )
+        except RuntimeError:
+            # Called outside of a run (e.g. `parse` used directly): nothing to report to.
+            pass
+
+    def parse(self, text):
+        try:
+            result = self.parser.parse(text)
+        except OutputParserException as error:
+            repair = (
+                repair_react_output if self.grammar == "react" else repair_json_output
+            )
+            repaired = repair(text, self.tool_names)
+            if repaired is None:
+                raise
+            try:
+                result = self.parser.parse(repaired)
+            except OutputParserException:
+                raise error
+            self._report("parse_error")
+            return result
+
+        if (
+            self.grammar == "react"
+            and isinstance(result, AgentAction)
+            and self.tool_names
+            and result.tool not in self.tool_names
+        ):
+            # Markdown labels parse, but leave the asterisks in the tool name.
+            repaired = repair_react_output(text, self.tool_names)
+            try:
+                repaired_result = self.parser.parse(repaired) if repaired else None
+            except OutputParserException:
+                repaired_result = None
+            if (
+                isinstance(repaired_result, AgentAction)
+                and repaired_result.tool in self.tool_names
+            ):
+                self._report("invalid_tool")
+                return repaired_result
+
+        if self.grammar == "react" and isinstance(result, AgentFinish):
+            output = result.return_values.get("output")
+            if isinstance(output, str) and trim_final_answer(output) != output:
+                self._report("trailing_explanation")
+                return AgentFinish({"output": trim_final_answer(output)}, result.log)
+        return result
+
+    @property
+    def _type(self):
+        return f"repairing-{self.grammar}"
+
+
+def with_output_repair(agent, tools):
+    """
+    Puts a `RepairingOutputParser` in front of the output parser of a text-parsed agent
+    (react, few-shot-CoT, json-chat, structured-chat). Other agents are returned unchanged.
+
+    Parameters:
+        agent: The agent runnable returned by a LangChain agent constructor.
+        tools (list): The agent tools.
+
+    Returns:
+        The agent with the repairing parser.
+    """
+    if not isinstance(agent, RunnableSequence):
+        return agent
+    parser = agent.last
+    if isinstance(parser, ReActSingleInputOutputParser):
+        grammar = "react"
+    elif isinstance(parser, JSONAgentOutputParser):
+        grammar = "json"
+    else:
+        return agent
+    repairing_parser = RepairingOutputParser(
+        parser=parser,
+        grammar=grammar,
+        tool_names=[tool.name for tool in tools],
+    )
+    return RunnableSequence(*agent.steps[:-1], repairing_parser)
@@ -0,0 +1,162 @@
+import re
+from typing import Any, Optional
+
+from langchain.chains.base import Chain
+
+from .agent_tools import safe_eval
+
+# Assignments of the generated program: "<name> = <expression>  # optional comment".
+_ASSIGNMENT = re.compile(r"^\s*([A-Za-z_][A-Za-z0-9_]*)\s*=\s*(.+?)\s*$")
+_ANSWER_NAME = re.compile(r"^answer_(\d+)$")
+_CODE_BLOCK = re.compile(r"```(?:python|py)?\s*\n(.*?)```", re.DOTALL)
+
+
+class ProgramError(Exception):
+    """Raised when a generated program cannot be parsed or executed."""
+
+    pass
+
+
+def _message_text(message):
+    content = getattr(message, "content", message)
+    if isinstance(content, list):
+        # Anthropic messages are lists of content blocks.
+        return "".join(
+            block.get("text", "") if isinstance(block, dict) else str(block)
+            for block in content
+        )
+    return str(content)
+
+
+def extract_program(text):
+    """
+    Extracts the program from the model output: the content of the first code block, or the
+    whole output if there is none.
+    """
+    match = _CODE_BLOCK.search(text)
+    return (match.group(1) if match else text).strip()
+
+
+def run_program(program):
+    """
+    Executes a generated program line by line with `safe_eval`.
+
+    Each non-empty line must be an assignment; comments are ignored. The answers are the
+    values of `answer_1`, `answer_2`, ... in numeric order.
+
+    Parameters:
+        program (str): The program text.
+
+    Returns:
+        list: The answer values.
+
+    Raises:
+        ProgramError: If a line is not an assignment, an expression fails or no answer is set.
+    """
+    names = {}
+    for line_number, line in enumerate(program.splitlines(), start=1):
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        match = _ASSIGNMENT.match(line)
+        if match is None:
+            raise ProgramError(f"Line {line_number} is not an assignment: {line}")
+        name, expression = match.groups()
+        try:
+            names[name] = safe_eval(expression, names)
+        except (SyntaxError, ValueError, NameError, ArithmeticError, TypeError) as e:
+            raise ProgramError(f"Line {line_number} ({line}) failed: {e}")
+
+    answers = sorted(
+        (int(match.group(1)), value)
+        for name, value in names.items()
+        if (match := _ANSWER_NAME.match(name))
+    )
+    if not answers:
+        raise ProgramError("The program does not assign any answer_<n> variable.")
+    return [value for _, value in answers]
+
+
+def format_answer(value):
+    """
+    Formats one answer like the ground truth of `get_exact_answers`: numbers rounded to
+    4 decimals, booleans and strings as lowercase "yes"/"no" style strings.
+    """
+    if isinstance(value, bool):
+        return "yes" if value else "no"
+    if isinstance(value, (int, float)):
+        return str(round(value, 4))
+    if isinstance(value, str):
+        return value.lower().replace(" ", "")
+    raise ProgramError(f"Unsupported answer value: {value!r}")
+
+
+class ProgramOfThoughtChain(Chain):
+    """
+    Answers in a single LLM call: the model writes a small arithmetic program over values
+    taken from the context, which is executed locally with `safe_eval`.
+
+    The output follows the final-answer format of the other prompt styles (comma-separated
+    answers, e.g. "0.1234, yes"), so it can be used anywhere an AgentExecutor is. When the
+    program cannot be parsed or executed, the question is answered by `fallback` (a
+    tool-calling agent executor) instead, and the reason is returned in "fallback_reason".
+
+    Built with `prompt_style="program"` (see `agent_executor_builder`).
+    """
+
+    llm: Any
+    prompt: Any
+    fallback: Optional[Any] = None
+    input_key: str = "input"
+    output_key: str = "output"
+
+    @property
+    def input_keys(self):
+        return [self.input_key]
+
+    @property
+    def output_keys(self):
+        return [self.output_key, "program", "fallback_reason", "intermediate_steps"]
+
+    def _call(self, inputs, run_manager=None):
+        callbacks = run_manager.get_child() if run_manager else None
+        messages = self.prompt.format_messages(input=inputs[self.input_key])
+        message = self.llm.invoke(messages, config={"callbacks": callbacks})
+        program = extract_program(_message_text(message))
+
+        try:
+            answers = [format_answer(value) for value in run_program(program)]
+            return {
+                self.output_key: ", ".join(answers),
+                "program": program,
+                "fallback_reason": None,
+                "intermediate_steps": [],
+            }
+        except ProgramError as e:
+            if self.fallback is None:
+                raise
+            if run_manager:
+                run_manager.on_text(f"Program failed, falling back to the agent: {e}\n")
+            response = self.fallback.invoke(
+                {self.input_key: inputs[self.input_key]},
+                config={"callbacks": callbacks},
+            )
+            return {
+                self.output_key: response["output"],
+                "program": program,
+                "fallback_reason": str(e),
+                "intermediate_steps": response.get("intermediate_steps", []),
+            }
+
+    @property
+    def _chain_type(self):
+        return "program_of_thought"
+
+
+def create_program_chain(llm, tools, prompt):
+    """
+    Same signature as the LangChain agent constructors (`create_react_agent`, ...) so that the
+    "program" prompt style plugs into `prompt_selector`. The tools are not exposed to the
+    model; they are used by the fallback agent attached in `agent_executor_builder`.
+    """
+    return ProgramOfThoughtChain(llm=llm, prompt=prompt)
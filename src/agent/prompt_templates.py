@@ -6,8 +6,11 @@ from langchain.agents import (
     create_tool_calling_agent,
 )
 from langchain.prompts import PromptTemplate
+from langchain_core.messages import AIMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
+from .program_solver import create_program_chain
+
 system_prompt = """You are a specialized financial assistant tasked with extracting information from an input thread and ALWAYS PROVIDING PRECISE ANSWERS.
 
 INSTRUCTIONS for specific task:
@@ -33,6 +36,118 @@ EXAMPLES OF THE FINAL ANSWER FORMAT:
 """
 
 
+# Task instructions shared by every DirectAnswer and evaluation request. Only the context
+# placed after CONTEXT_DELIMITER changes between requests, so everything rendered before it
+# (prompt template, tool descriptions, few-shot examples, system prompt and these
+# instructions) is a byte-identical prefix that providers can cache.
+task_instruction = (
+    "Pay attention to the format, it must respect the guidelines. "
+    "Task: Given the following input, extract the information (using the tools if the input "
+    "points to a file) and answer the questions in its qa, qa_0, qa_1 fields using the "
+    "provided context. Do not output any explanation in the output, only the answer."
+)
+
+CONTEXT_DELIMITER = "\n\nINPUT:\n"
+
+
+def build_task_input(context):
+    """
+    Builds the agent input for a question-answering request.
+
+    The static instructions come first and the per-request context last, separated by
+    CONTEXT_DELIMITER, so that consecutive requests share the longest possible prefix.
+
+    Parameters:
+        context (str): The rendered thread(s) or the user input.
+
+    Returns:
+        str: The agent input.
+    """
+    return f"{system_prompt}{task_instruction}{CONTEXT_DELIMITER}{context}"
+
+
+def add_cache_breakpoint(messages):
+    """
+    Marks the end of the static prompt prefix with an Anthropic `cache_control` breakpoint.
+
+    The first message containing CONTEXT_DELIMITER is split into two text blocks: the
+    static part (flagged as cacheable) and the per-request part. If no message contains
+    the delimiter (e.g. free chat input), the leading system message is flagged instead.
+
+    Parameters:
+        messages (list): The formatted prompt messages.
+
+    Returns:
+        list: The messages with the cache breakpoint.
+    """
+    cache_control = {"type": "ephemeral"}
+    for i, message in enumerate(messages):
+        if isinstance(message, AIMessage) or not isinstance(message.content, str):
+            continue
+        head, delimiter, tail = message.content.partition(CONTEXT_DELIMITER)
+        if delimiter and head.strip():
+            blocks = [
+                {"type": "text", "text": head, "cache_control": cache_control},
+                {"type": "text", "text": delimiter.lstrip() + tail},
+            ]
+            return (
+                messages[:i]
+                + [message.model_copy(update={"content": blocks})]
+                + messages[i + 1 :]
+            )
+
+    if (
+        messages
+        and messages[0].type == "system"
+        and isinstance(messages[0].content, str)
+    ):
+        block = {
+            "type": "text",
+            "text": messages[0].content,
+            "cache_control": cache_control,
+        }
+        return [messages[0].model_copy(update={"content": [block]})] + messages[1:]
+    return messages
+
+
+class CachedPrefixChatPromptTemplate(ChatPromptTemplate):
+    """
+    ChatPromptTemplate that adds an Anthropic prompt-caching breakpoint at the end of the
+    static prefix of every formatted prompt (see `add_cache_breakpoint`).
+    """
+
+    def format_messages(self, **kwargs):
+        return add_cache_breakpoint(super().format_messages(**kwargs))
+
+    async def aformat_messages(self, **kwargs):
+        return add_cache_breakpoint(await super().aformat_messages(**kwargs))
+
+
+def enable_prompt_caching(prompt):
+    """
+    Returns a copy of a chat prompt that marks its static prefix as cacheable.
+
+    Only needed for Anthropic, which caches explicitly marked prefixes. OpenAI caches
+    repeated prefixes automatically, and rejects the `cache_control` field.
+
+    Parameters:
+        prompt: The prompt returned by `prompt_selector`.
+
+    Returns:
+        The cache-enabled prompt, or the prompt unchanged if it is not a ChatPromptTemplate.
+    """
+    if not isinstance(prompt, ChatPromptTemplate) or isinstance(
+        prompt, CachedPrefixChatPromptTemplate
+    ):
+        return prompt
+    return CachedPrefixChatPromptTemplate(
+        messages=prompt.messages,
+        partial_variables=prompt.partial_variables,
+        input_types=prompt.input_types,
+        metadata=prompt.metadata,
+    )
+
+
 json_chat = """TOOLS ------
 Assistant can ask the user to use tools to look up information that may be helpful in answering the user's original question. The tools the human can use are: {tools}
 
@@ -180,6 +295,49 @@ Thought: {agent_scratchpad}
 """
 
 
+program_of_thought = """
+You are a specialized financial assistant. Instead of calling tools step by step, you answer ALL the questions at once by writing a short arithmetic program. The program is executed for you with an exact calculator, so never compute results yourself.
+The task instructions in the input mention tools and a final answer format: in this mode both are handled for you, the tools are replaced by the program and the final answer is formatted from answer_1, answer_2, ...
+
+Write the program in a single ```python code block, with one assignment per line:
+1. First, one line per value needed from the context: a descriptive name and the number exactly as written in the context, without thousands separators, units, currency or % signs. Add a comment saying where the value comes from.
+2. Then, the intermediate steps, using only the names defined above, numbers, + - * / ** and parentheses, abs(), min(), max(), round() and comparisons (>, <, >=, <=, ==, !=).
+3. Finally, one line per question, in the order of the questions: answer_1 = ..., answer_2 = ..., ...
+   - A percentage change or a ratio is a decimal: (new - old) / old, NOT multiplied by 100.
+   - A value given as a percentage in the context (e.g. 10.5%) must be divided by 100 when the question asks for that percentage.
+   - For a yes/no question, assign a comparison (e.g. answer_2 = revenue_2009 > revenue_2008) or the string "yes" or "no".
+
+Example:
+Questions:
+1. what was the net income in 2009?
+2. what was the percentage change in net income from 2008 to 2009?
+3. did the net income increase?
+
+```python
+net_income_2009 = 103102  # table: net income, 2009
+net_income_2008 = 104222  # table: net income, 2008
+answer_1 = net_income_2009
+answer_2 = (net_income_2009 - net_income_2008) / net_income_2008
+answer_3 = net_income_2009 > net_income_2008
+```
+
+Output ONLY the code block, no explanation.
+
+{input}
+"""
+
+
+# Default tool-description mode of the prompt styles that render the tools as text:
+# "verbose" (the full descriptions) or "compact" (see `compact_tools`). "tools-agent" binds
+# JSON schemas and "program" has no tools.
+TOOL_DESCRIPTIONS = {
+    "react": "verbose",
+    "json-chat": "verbose",
+    "structured-chat-agent": "verbose",
+    "few-shot-CoT": "verbose",
+}
+
+
 def prompt_selector(prompt_style):
     """
     Selects and constructs a LangChain-compatible prompt and corresponding agent creation function
@@ -192,7 +350,9 @@ def prompt_selector(prompt_style):
 
     Parameters:
         prompt_style (str): The identifier for the desired prompt style.
-        Must be one of: "react", "json-chat", "structured-chat-agent", "tools-agent".
+        Must be one of: "react", "json-chat", "structured-chat-agent", "few-shot-CoT",
+        "tools-agent", "program". "tools-agent" uses the provider's native tool calling
+        (see `tool_calling_tools`) instead of a text format parsed from the output.
 
     Returns:
         tuple: (prompt, agent_func)
@@ -228,6 +388,20 @@ def prompt_selector(prompt_style):
     # )
     few_shot_CoT_prompt = ChatPromptTemplate.from_template(few_shot_CoT)
 
+    program_prompt = ChatPromptTemplate.from_template(program_of_thought)
+
+    # Same layout as the hub "hwchase17/openai-tools-agent" prompt, built locally so that
+    # the agent can be built offline: system message, optional chat history, {input} and
+    # the scratchpad of tool-call and tool messages. No format instructions are needed.
+    tools_agent_prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", "You are a helpful assistant"),
+            MessagesPlaceholder("chat_history", optional=True),
+            ("human", "{input}"),
+            MessagesPlaceholder("agent_scratchpad"),
+        ]
+    )
+
     # Mapping configurations for prompt styles.
     prompt_config = {
         "react": {
@@ -247,6 +421,14 @@ def prompt_selector(prompt_style):
             "few_shot_CoT_prompt": few_shot_CoT_prompt,
             "agent_func": create_react_agent,
         },
+        "tools-agent": {
+            "tools_agent_prompt": tools_agent_prompt,
+            "agent_func": create_tool_calling_agent,
+        },
+        "program": {
+            "program_prompt": program_prompt,
+            "agent_func": create_program_chain,
+        },
     }
 
     config = prompt_config.get(prompt_style)
@@ -260,6 +442,10 @@ def prompt_selector(prompt_style):
         prompt = config["react_prompt"]
     elif "few_shot_CoT_prompt" in config:
         prompt = config["few_shot_CoT_prompt"]
+    elif "program_prompt" in config:
+        prompt = config["program_prompt"]
+    elif "tools_agent_prompt" in config:
+        prompt = config["tools_agent_prompt"]
     else:
         prompt = hub.pull(config["hub_id"])
 
@@ -0,0 +1,139 @@
+import re
+
+from src.utils import strip_group_label, thread_questions
+
+# Question words of multi-step computations (a change, a ratio, an aggregate, ...).
+COMPLEX_KEYWORDS = (
+    "percent",
+    "change",
+    "growth",
+    "ratio",
+    "average",
+    "mean",
+    "difference",
+    "increase",
+    "decrease",
+    "decline",
+    "portion",
+    "proportion",
+    "cagr",
+    "compound",
+    "sum",
+    "combined",
+    "between",
+)
+# Questions whose answer is a decimal ratio, not a percentage multiplied by 100.
+RATIO_KEYWORDS = ("percent", "change", "growth", "ratio", "portion", "proportion")
+YES_NO_PREFIXES = (
+    "did ",
+    "does ",
+    "do ",
+    "is ",
+    "was ",
+    "were ",
+    "are ",
+    "has ",
+    "have ",
+)
+_YEAR = re.compile(r"\b(?:19|20)\d{2}\b")
+
+ROUTES = ("cheap", "expensive", "cascade")
+
+
+def question_features(sample):
+    """
+    Computes the routing features of a thread.
+
+    Parameters:
+        sample (dict): The thread (raw or processed layout, without the exact answers).
+
+    Returns:
+        dict: "qa_count" (number of questions), "table_references" (table rows named in the
+              questions), "year_references" (distinct years named in the questions),
+              "complex_keywords" (COMPLEX_KEYWORDS found in the questions) and "table_rows".
+    """
+    questions = [
+        strip_group_label(question).lower() for question in thread_questions(sample)
+    ]
+    text = " ".join(questions)
+    table = sample.get("table") or sample.get("table_ori") or []
+    row_labels = {
+        " ".join(str(row[0]).lower().split())
+        for row in table[1:]
+        if row and str(row[0]).strip()
+    }
+    return {
+        "qa_count": len(questions),
+        "table_references": sum(1 for label in row_labels if label in text),
+        "year_references": len(set(_YEAR.findall(text))),
+        "complex_keywords": sum(1 for keyword in COMPLEX_KEYWORDS if keyword in text),
+        "table_rows": len(table),
+    }
+
+
+def route_question(sample, max_questions=1, max_table_references=1, max_years=1):
+    """
+    Routes a thread to the "cheap" or the "expensive" model.
+
+    A thread is cheap when it is a single lookup: at most `max_questions` questions, no
+    computation keyword, and at most `max_table_references` table rows and `max_years` years
+    named in the questions. Everything else goes to the expensive model.
+
+    Parameters:
+        sample (dict): The thread.
+        max_questions (int): Maximum number of questions of a cheap thread.
+        max_table_references (int): Maximum number of table rows named by a cheap thread.
+        max_years (int): Maximum number of distinct years named by a cheap thread.
+
+    Returns:
+        tuple: (route, features) where route is "cheap" or "expensive".
+    """
+    features = question_features(sample)
+    cheap = (
+        features["qa_count"] <= max_questions
+        and features["complex_keywords"] == 0
+        and features["table_references"] <= max_table_references
+        and features["year_references"] <= max_years
+    )
+    return ("cheap" if cheap else "expensive"), features
+
+
+def consistency_failures(answers, sample):
+    """
+    Checks an answer locally, without a model, before it is accepted from the cheap model.
+
+    Checks:
+        - "answer_count": one answer per question.
+        - "not_an_answer": every answer is a number or "yes"/"no".
+        - "yes_no": a yes/no question ("did ...", "is ...") is answered yes or no.
+        - "ratio_scale": a percentage/ratio question is answered as a decimal (|x| <= 10),
+          not multiplied by 100.
+
+    Parameters:
+        answers (list): The parsed answers (see `parse_agent_output`).
+        sample (dict): The thread.
+
+    Returns:
+        list: The names of the failed checks; empty if the answer looks consistent.
+    """
+    questions = [
+        strip_group_label(question).lower() for question in thread_questions(sample)
+    ]
+    failures = []
+    if len(answers) != len(questions):
+        failures.append("answer_count")
+    if any(
+        not isinstance(answer, (int, float)) and answer not in ("yes", "no")
+        for answer in answers
+    ):
+        failures.append("not_an_answer")
+    for question, answer in zip(questions, answers):
+        if question.startswith(YES_NO_PREFIXES) and answer not in ("yes", "no"):
+            failures.append("yes_no")
+        elif (
+            any(keyword in question for keyword in RATIO_KEYWORDS)
+            and isinstance(answer, (int, float))
+            and abs(answer) > 10
+        ):
+            failures.append("ratio_scale")
+    return failures
@@ -0,0 +1,208 @@
+import ast
+import json
+import re
+
+from langchain_core.runnables import RunnablePassthrough, RunnableSequence
+from langchain_core.runnables.passthrough import RunnableAssign
+
+from src.utils.context_serializer import serialize_context
+from src.utils.tokenizers import approximate_token_count
+
+# Token budget of a past observation, and of the whole scratchpad of one iteration.
+DEFAULT_OBSERVATION_TOKENS = 300
+DEFAULT_SCRATCHPAD_TOKENS = 2000
+
+OMITTED_OBSERVATION = "[observation omitted, see the answers above]"
+
+_DIGIT = re.compile(r"\d")
+
+
+def _as_threads(observation):
+    # The threads of an `extract_financial_data` result (objects or their repr), or None.
+    value = observation
+    if isinstance(value, str):
+        try:
+            value = ast.literal_eval(value.strip())
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            try:
+                value = json.loads(value)
+            except (json.JSONDecodeError, ValueError):
+                return None
+    if isinstance(value, dict):
+        value = [value]
+    if (
+        isinstance(value, list)
+        and value
+        and all(isinstance(item, dict) for item in value)
+    ):
+        if any("table" in item or "pre_text" in item for item in value):
+            return value
+    return None
+
+
+def _truncate(text, max_tokens, count_tokens):
+    tokens = count_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    cut = max(0, int(len(text) * max_tokens / tokens))
+    return f"{text[:cut].rstrip()} [... {tokens - max_tokens} tokens omitted]"
+
+
+def summarize_observation(
+    observation,
+    max_tokens=DEFAULT_OBSERVATION_TOKENS,
+    count_tokens=approximate_token_count,
+):
+    """
+    Shortens a tool observation to about `max_tokens`, keeping the numbers.
+
+    Observations within the budget are returned unchanged. An `extract_financial_data` dump
+    keeps its table rows (pipe-separated) and then the sentences of the text that contain a
+    number; other observations keep their lines with numbers first. What does not fit is
+    dropped with a note of how many tokens were omitted.
+
+    Parameters:
+        observation: The tool observation (any object, rendered with `str`).
+        max_tokens (int): Token budget of the summary.
+        count_tokens (callable): Token counter (see `get_token_counter`).
+
+    Returns:
+        str: The observation or its summary.
+    """
+    text = str(observation)
+    original_tokens = count_tokens(text)
+    if original_tokens <= max_tokens:
+        return text
+
+    threads = _as_threads(observation)
+    if threads is not None:
+        text = serialize_context(threads, "pipe")
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    # Table rows first, then the other lines with a number, then (for other observations)
+    # the rest; the kept lines stay in their original order.
+    priority = sorted(
+        range(len(lines)),
+        key=lambda i: (" | " not in lines[i], not _DIGIT.search(lines[i]), i),
+    )
+    if threads is not None:
+        priority = [i for i in priority if " | " in lines[i] or _DIGIT.search(lines[i])]
+
+    kept = []
+    used = 0
+    for i in priority:
+        tokens = count_tokens(lines[i]) + 1
+        if used + tokens > max_tokens:
+            break
+        kept.append(i)
+        used += tokens
+    if not kept:
+        return _truncate(text, max_tokens, count_tokens)
+    omitted = max(0, original_tokens - used)
+    return (
+        "\n".join(lines[i] for i in sorted(kept)) + f"\n[... {omitted} tokens omitted]"
+    )
+
+
+def format_compact_scratchpad(
+    intermediate_steps,
+    observation_tokens=DEFAULT_OBSERVATION_TOKENS,
+    max_tokens=DEFAULT_SCRATCHPAD_TOKENS,
+    count_tokens=approximate_token_count,
+    observation_prefix="Observation: ",
+    llm_prefix="Thought: ",
+):
+    """
+    Builds the ReAct `agent_scratchpad` like `format_log_to_str`, but with a token cap.
+
+    The thoughts and actions are kept; the latest observation is kept whole if it fits.
+    Older observations are summarized to `observation_tokens` (see `summarize_observation`).
+    If the scratchpad is still above `max_tokens`, the oldest observations are shrunk
+    further and then omitted, and finally the latest one is summarized to what is left, so
+    the prompt stops growing with every iteration.
+
+    Parameters:
+        intermediate_steps (list): (AgentAction, observation) pairs of the run so far.
+        observation_tokens (int): Token budget of each past observation.
+        max_tokens (int): Token cap of the scratchpad of one iteration.
+        count_tokens (callable): Token counter (see `get_token_counter`).
+        observation_prefix (str): Prefix of the observations.
+        llm_prefix (str): Prefix of the next thought.
+
+    Returns:
+        str: The scratchpad.
+    """
+    if not intermediate_steps:
+        return ""
+    logs = [action.log for action, _ in intermediate_steps]
+    observations = [
+        summarize_observation(observation, observation_tokens, count_tokens)
+        for _, observation in intermediate_steps[:-1]
+    ] + [str(intermediate_steps[-1][1])]
+
+    def render():
+        return "".join(
+            f"{log}\n{observation_prefix}{observation}\n{llm_prefix}"
+            for log, observation in zip(logs, observations)
+        )
+
+    def total():
+        return count_tokens(render())
+
+    # Oldest observations first: shrink them to a quarter of their budget, then omit them.
+    for shrink in (
+        lambda observation: summarize_observation(
+            observation, observation_tokens // 4, count_tokens
+        ),
+        lambda observation: OMITTED_OBSERVATION,
+    ):
+        for i in range(len(observations) - 1):
+            if total() <= max_tokens:
+                return render()
+            observations[i] = shrink(observations[i])
+
+    excess = total() - max_tokens
+    if excess > 0:
+        latest = observations[-1]
+        budget = max(observation_tokens // 4, count_tokens(latest) - excess)
+        observations[-1] = summarize_observation(
+            intermediate_steps[-1][1], budget, count_tokens
+        )
+    return render()
+
+
+def with_compact_scratchpad(
+    agent,
+    observation_tokens=DEFAULT_OBSERVATION_TOKENS,
+    max_tokens=DEFAULT_SCRATCHPAD_TOKENS,
+    count_tokens=approximate_token_count,
+):
+    """
+    Replaces the `format_log_to_str` scratchpad of a ReAct agent (react, few-shot-CoT) by
+    `format_compact_scratchpad`. Other agents are returned unchanged.
+
+    Parameters:
+        agent: The agent runnable returned by `create_react_agent`.
+        observation_tokens (int): Token budget of each past observation.
+        max_tokens (int): Token cap of the scratchpad of one iteration.
+        count_tokens (callable): Token counter (see `get_token_counter`).
+
+    Returns:
+        The agent with the compact scratchpad.
+    """
+    if not isinstance(agent, RunnableSequence):
+        return agent
+    first = agent.first
+    if (
+        not isinstance(first, RunnableAssign)
+        or "agent_scratchpad" not in first.mapper.steps__
+    ):
+        return agent
+    scratchpad = RunnablePassthrough.assign(
+        agent_scratchpad=lambda x: format_compact_scratchpad(
+            x["intermediate_steps"],
+            observation_tokens=observation_tokens,
+            max_tokens=max_tokens,
+            count_tokens=count_tokens,
+        )
+    )
+    return RunnableSequence(scratchpad, *agent.steps[1:])
@@ -0,0 +1,65 @@
+import json
+import time
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from src.utils.tokenizers import approximate_token_count
+
+
+class StubChatModel(BaseChatModel):
+    """
+    Offline chat model for load tests and local development.
+
+    It waits `latency` seconds (like a provider round trip) and then answers `answer` in the
+    format the agent prompt asks for: a JSON action blob for the json-chat and structured-chat
+    prompts, the bare answer for the tool-calling agent, a "Final Answer:" line otherwise.
+    Token usage is reported with the character approximation, so the instrumentation and the
+    metrics work as with a real model.
+
+    Select it with `provider="stub"`; the latency can be set through the model name,
+    e.g. "stub-0.2" for 200 ms.
+    """
+
+    latency: float = 0.05
+    answer: str = "42"
+    tool_calling: bool = False
+
+    @property
+    def _llm_type(self):
+        return "stub"
+
+    def bind_tools(self, tools, **kwargs):
+        # The stub never calls tools: with the tool-calling agent it answers directly.
+        return self.model_copy(update={"tool_calling": True})
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+        prompt = "\n".join(str(message.content) for message in messages)
+        if self.tool_calling:
+            content = self.answer
+        elif '"action_input"' in prompt:
+            content = (
+                "```json\n"
+                + json.dumps({"action": "Final Answer", "action_input": self.answer})
+                + "\n```"
+            )
+        else:
+            content = (
+                f"Thought: I now know the final answer\nFinal Answer: {self.answer}"
+            )
+
+        input_tokens = approximate_token_count(prompt)
+        output_tokens = approximate_token_count(content)
+        message = AIMessage(
+            content=content,
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            },
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
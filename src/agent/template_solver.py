@@ -0,0 +1,238 @@
+import json
+import re
+from difflib import SequenceMatcher
+
+from src.utils import strip_group_label, thread_questions
+
+# Minimum confidence of a local answer; below it the question goes to the LLM.
+DEFAULT_MIN_CONFIDENCE = 0.8
+
+_YEAR = r"((?:19|20)\d{2})"
+
+# (name, pattern, base confidence). Patterns match the normalized question (lowercase, single
+# spaces, no trailing "?"). The groups are named "item", "total", "a" and "b" (years).
+TEMPLATES = [
+    (
+        "percentage_change",
+        re.compile(
+            r"(?:percent(?:age)?|%)\s+(?:change|increase|decrease|growth|decline)\s+(?:in|of)\s+(?:the\s+)?(?P<item>.+?)\s+(?:from|between)\s+(?P<a>(?:19|20)\d{2})\s+(?:to|and)\s+(?P<b>(?:19|20)\d{2})$"
+        ),
+        1.0,
+    ),
+    (
+        "change",
+        re.compile(
+            r"(?:net\s+)?(?:change|increase|decrease)\s+(?:in|of)\s+(?:the\s+)?(?P<item>.+?)\s+from\s+(?P<a>(?:19|20)\d{2})\s+to\s+(?P<b>(?:19|20)\d{2})$"
+        ),
+        0.9,
+    ),
+    (
+        "difference",
+        re.compile(
+            r"difference\s+(?:in|of)\s+(?:the\s+)?(?P<item>.+?)\s+between\s+(?P<a>(?:19|20)\d{2})\s+and\s+(?P<b>(?:19|20)\d{2})$"
+        ),
+        0.9,
+    ),
+    (
+        "share_of_total",
+        re.compile(
+            r"(?:the\s+)?(?P<item>.+?)\s+as\s+a\s+(?:percent(?:age)?|portion|share)\s+of\s+(?:the\s+)?(?P<total>total\s+.+?)(?:\s+in\s+(?P<a>(?:19|20)\d{2}))?$"
+        ),
+        1.0,
+    ),
+    (
+        "lookup",
+        re.compile(
+            r"^what\s+(?:was|were|is|are)\s+(?:the\s+)?(?P<item>.+?)\s+in\s+(?P<a>(?:19|20)\d{2})$"
+        ),
+        0.85,
+    ),
+]
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def parse_cell(value):
+    """
+    Parses a table cell as a number: "$ 1,234.5" -> 1234.5, "( 12 )" -> -12.0,
+    "12.5%" -> 12.5. Returns None for cells without exactly one number.
+    """
+    text = str(value).replace(",", "").replace("$", "").strip()
+    numbers = _NUMBER.findall(text)
+    if len(numbers) != 1:
+        return None
+    number = float(numbers[0])
+    if text.startswith("(") and text.endswith(")"):
+        number = -abs(number)
+    return number
+
+
+def _normalize(text):
+    text = re.sub(r"[^a-z0-9%.\s]", " ", str(text).lower())
+    text = re.sub(r"\s+", " ", text).strip().rstrip(".")
+    return re.sub(r"^the ", "", text)
+
+
+def _find_column(table, year):
+    # Column of a year in the header row; (index, confidence) or (None, 0).
+    if not table:
+        return None, 0.0
+    matches = [i for i, cell in enumerate(table[0]) if i > 0 and year in str(cell)]
+    if len(matches) == 1:
+        return matches[0], 1.0
+    return None, 0.0
+
+
+def _find_row(table, item):
+    # Best matching row label; (index, confidence) or (None, 0). An exact label is certain,
+    # a label contained in the item (or the other way round) or a close spelling is not.
+    item = _normalize(item)
+    scores = []
+    for i, row in enumerate(table[1:], start=1):
+        if not row:
+            continue
+        label = _normalize(row[0])
+        if not label:
+            continue
+        if label == item:
+            score = 1.0
+        elif label in item or item in label:
+            score = 0.85 * min(len(label), len(item)) / max(len(label), len(item))
+            score = max(score, 0.6)
+        else:
+            score = 0.8 * SequenceMatcher(None, label, item).ratio()
+        scores.append((score, i))
+    if not scores:
+        return None, 0.0
+    scores.sort(reverse=True)
+    best, index = scores[0]
+    if len(scores) > 1 and scores[1][0] == best:
+        # Two rows match equally well: the lookup is ambiguous.
+        best *= 0.5
+    return index, best
+
+
+def _value(table, item, year):
+    row, row_confidence = _find_row(table, item)
+    column, column_confidence = _find_column(table, year)
+    if row is None or column is None or column >= len(table[row]):
+        return None, 0.0
+    value = parse_cell(table[row][column])
+    if value is None:
+        return None, 0.0
+    return value, row_confidence * column_confidence
+
+
+def _default_year(table):
+    # The only year column of the table, for "share of total" questions without a year.
+    years = [
+        re.search(_YEAR, str(cell)).group(1)
+        for cell in (table[0][1:] if table else [])
+        if re.search(_YEAR, str(cell))
+    ]
+    return years[0] if len(set(years)) == 1 else None
+
+
+def solve_question(question, table):
+    """
+    Answers one templated question from the table, without a model.
+
+    Templates (see TEMPLATES): percentage change of an item between two years, absolute
+    change and difference between two years, an item as a percentage of a total, and a plain
+    lookup of an item in a year. Rows are matched on their label and columns on the year in
+    the header row.
+
+    Parameters:
+        question (str): The question.
+        table (list): The thread table (list of rows, the first one is the header).
+
+    Returns:
+        dict or None: "template", "answer" (a float; percentages as decimals, like the dataset
+                      answers) and "confidence" (0 to 1: the template confidence times the
+                      row and column match confidence); None if no template matches or the
+                      table has no matching values.
+    """
+    text = _normalize(question)
+    for name, pattern, base in TEMPLATES:
+        match = pattern.search(text)
+        if match is None:
+            continue
+        groups = match.groupdict()
+        if name == "share_of_total":
+            year = groups.get("a") or _default_year(table)
+            if year is None:
+                return None
+            part, part_confidence = _value(table, groups["item"], year)
+            total, total_confidence = _value(table, groups["total"], year)
+            if part is None or total in (None, 0):
+                return None
+            answer = part / total
+            confidence = base * part_confidence * total_confidence
+        elif name == "lookup":
+            answer, confidence = _value(table, groups["item"], groups["a"])
+            if answer is None:
+                return None
+            confidence *= base
+        else:
+            first, first_confidence = _value(table, groups["item"], groups["a"])
+            second, second_confidence = _value(table, groups["item"], groups["b"])
+            if first is None or second is None:
+                return None
+            if name == "percentage_change":
+                if first == 0:
+                    return None
+                answer = (second - first) / abs(first)
+            elif name == "change":
+                answer = second - first
+            else:
+                answer = first - second
+            confidence = base * first_confidence * second_confidence
+        return {"template": name, "answer": answer, "confidence": confidence}
+    return None
+
+
+def as_thread(model_input):
+    """
+    Returns the input as a thread dict if it is one (or JSON text of one), otherwise None.
+    """
+    value = model_input
+    if isinstance(model_input, str):
+        try:
+            value = json.loads(model_input)
+        except (json.JSONDecodeError, ValueError):
+            return None
+    if isinstance(value, dict) and "table" in value:
+        return value
+    return None
+
+
+def solve_thread(sample, min_confidence=DEFAULT_MIN_CONFIDENCE):
+    """
+    Answers every question of a thread locally, if possible with enough confidence.
+
+    The fast path is all or nothing: if any question does not match a template or is below
+    `min_confidence`, the thread goes to the LLM as usual.
+
+    Parameters:
+        sample (dict): The thread (raw or processed layout, without the exact answers).
+        min_confidence (float): Minimum confidence of every answer.
+
+    Returns:
+        dict or None: "answers" (floats in question order), "templates" and "confidence"
+                      (the lowest of the answers); None if the thread must go to the LLM.
+    """
+    table = sample.get("table") or sample.get("table_ori") or []
+    questions = [strip_group_label(question) for question in thread_questions(sample)]
+    if not questions or not table:
+        return None
+    solutions = [solve_question(question, table) for question in questions]
+    if any(
+        solution is None or solution["confidence"] < min_confidence
+        for solution in solutions
+    ):
+        return None
+    return {
+        "answers": [solution["answer"] for solution in solutions],
+        "templates": [solution["template"] for solution in solutions],
+        "confidence": min(solution["confidence"] for solution in solutions),
+    }
@@ -0,0 +1,211 @@
+import json
+import re
+from typing import Any
+
+from langchain.agents import AgentExecutor
+from langchain_core.agents import AgentAction, AgentFinish
+from langchain_core.tools import BaseTool
+
+from .agent_tools import strip_code_fence
+from .deadline import best_partial_answer
+
+# Number of times the same (tool, input) pair may be requested in a run (the first call and
+# its memoized repeats) before the run is stopped with the best partial answer.
+DEFAULT_LOOP_LIMIT = 2
+
+REPEATED_CALL_NOTE = (
+    "Note: {tool} was already called with this input and returned the result above. "
+    "Do not call it again with the same input: use this result, or give the Final Answer."
+)
+
+
+def normalize_tool_input(tool_input):
+    """
+    Normalizes a tool input so that equivalent calls share a memo key: code fences and
+    surrounding quotes are removed, JSON is re-serialized with sorted keys and whitespace
+    around operators and punctuation is dropped ("2 + 3" and "2+3" are the same call).
+
+    Parameters:
+        tool_input (str or dict): The input of an agent action.
+
+    Returns:
+        str: The normalized input.
+    """
+    if isinstance(tool_input, str):
+        text = strip_code_fence(tool_input).strip().strip("'\"")
+        try:
+            tool_input = json.loads(text)
+        except (json.JSONDecodeError, ValueError):
+            tool_input = text
+    if not isinstance(tool_input, str):
+        tool_input = json.dumps(tool_input, sort_keys=True, default=str)
+    text = re.sub(r"\s+", " ", tool_input).strip()
+    return re.sub(r"\s*([^\w\s])\s*", r"\1", text)
+
+
+def tool_call_key(action):
+    """Memo key of an agent action: (tool name, normalized input)."""
+    return action.tool, normalize_tool_input(action.tool_input)
+
+
+class _CachedTool(BaseTool):
+    # Returns a stored observation; run like a tool so that the callbacks see the step.
+    observation: Any = None
+
+    def _run(self, *args, **kwargs):
+        return self.observation
+
+
+class _MemoizedTool:
+    # Stands in for a tool in the tool map of one agent step.
+    def __init__(self, tool, memo):
+        self.tool = tool
+        self.memo = memo
+        self.return_direct = tool.return_direct
+
+    def _cached(self, tool_input):
+        key = self.tool.name, normalize_tool_input(tool_input)
+        if key not in self.memo.observations:
+            return key, None
+        observation = self.memo.observations[key]
+        note = REPEATED_CALL_NOTE.format(tool=self.tool.name)
+        return key, _CachedTool(
+            name=self.tool.name,
+            description=self.tool.description,
+            observation=f"{observation}\n{note}",
+        )
+
+    def run(self, tool_input, **kwargs):
+        key, cached = self._cached(tool_input)
+        observation = (cached or self.tool).run(tool_input, **kwargs)
+        self.memo.record(key, observation, cached is not None)
+        return observation
+
+    async def arun(self, tool_input, **kwargs):
+        key, cached = self._cached(tool_input)
+        observation = await (cached or self.tool).arun(tool_input, **kwargs)
+        self.memo.record(key, observation, cached is not None)
+        return observation
+
+
+class ToolMemo:
+    """
+    Observations and call counts of the (tool, normalized input) pairs of one agent run,
+    rebuilt from its intermediate steps at every iteration, so that nothing is shared
+    between runs or threads.
+
+    Parameters:
+        intermediate_steps (list): (AgentAction, observation) pairs of the run so far.
+    """
+
+    def __init__(self, intermediate_steps):
+        self.observations = {}
+        self.counts = {}
+        for action, observation in intermediate_steps:
+            if isinstance(action, AgentAction) and action.tool != "_Exception":
+                key = tool_call_key(action)
+                # The first observation is the real result; repeats carry the note.
+                self.observations.setdefault(key, observation)
+                self.counts[key] = self.counts.get(key, 0) + 1
+
+    def record(self, key, observation, cached):
+        if not cached:
+            self.observations[key] = observation
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+    def calls(self, action):
+        """Number of times the action was already requested in the run."""
+        return self.counts.get(tool_call_key(action), 0)
+
+    def wrap(self, name_to_tool_map):
+        """Returns the tool map of a step with memoized tools."""
+        return {
+            name: _MemoizedTool(tool, self) for name, tool in name_to_tool_map.items()
+        }
+
+
+def _loop_finish(action, intermediate_steps):
+    return AgentFinish(
+        {"output": best_partial_answer(intermediate_steps)},
+        log=f"Stopped: {action.tool} was requested again with the same input.",
+    )
+
+
+class MemoizingAgentExecutor(AgentExecutor):
+    """
+    AgentExecutor that memoizes the tool calls of a run and stops tool-call loops.
+
+    A tool requested again with the same normalized input (see `normalize_tool_input`) is
+    not run again: the agent gets the first observation with a note asking it to use the
+    result or answer (the tools are deterministic, so the result cannot change). Once the
+    same pair has been requested `loop_limit` times, the next request ends the run with the
+    best partial answer (see `best_partial_answer`) instead of spending the remaining
+    iterations.
+    """
+
+    loop_limit: int = DEFAULT_LOOP_LIMIT
+
+    def _iter_next_step(
+        self,
+        name_to_tool_map,
+        color_mapping,
+        inputs,
+        intermediate_steps,
+        run_manager=None,
+    ):
+        memo = ToolMemo(intermediate_steps)
+        steps = super()._iter_next_step(
+            memo.wrap(name_to_tool_map),
+            color_mapping,
+            inputs,
+            intermediate_steps,
+            run_manager,
+        )
+        # The actions of a turn are all yielded before any of them is performed. They are
+        # buffered until the first step, so that a looped action ends the turn with the
+        # AgentFinish alone (the executor accepts a finish only as the single output).
+        actions = []
+        for output in steps:
+            if isinstance(output, AgentAction):
+                if memo.calls(output) >= self.loop_limit:
+                    steps.close()
+                    yield _loop_finish(output, intermediate_steps)
+                    return
+                actions.append(output)
+                continue
+            yield from actions
+            actions = []
+            yield output
+        yield from actions
+
+    async def _aiter_next_step(
+        self,
+        name_to_tool_map,
+        color_mapping,
+        inputs,
+        intermediate_steps,
+        run_manager=None,
+    ):
+        memo = ToolMemo(intermediate_steps)
+        steps = super()._aiter_next_step(
+            memo.wrap(name_to_tool_map),
+            color_mapping,
+            inputs,
+            intermediate_steps,
+            run_manager,
+        )
+        actions = []
+        async for output in steps:
+            if isinstance(output, AgentAction):
+                if memo.calls(output) >= self.loop_limit:
+                    await steps.aclose()
+                    yield _loop_finish(output, intermediate_steps)
+                    return
+                actions.append(output)
+                continue
+            for action in actions:
+                yield action
+            actions = []
+            yield output
+        for action in actions:
+            yield action
@@ -0,0 +1,391 @@
+"""
+Warm resident daemon for the CLI.
+
+`python -m src.main --serve` imports langchain and the provider SDKs once, keeps agent
+executors (and their LLM clients' HTTP connection pools) and parsed datasets in memory, and
+answers requests over a Unix domain socket. `python -m src.main --mode DirectAnswer|chat`
+forwards to the daemon when it is running, so a repeated CLI call only pays the interpreter
+start-up and a local round trip.
+
+The protocol is one JSON object per line in each direction. A request has an "op"
+("ping", "DirectAnswer", "chat" or "shutdown") and the fields of that operation; the response
+has "ok" and either the result or an "error" message. Chat memory belongs to the connection.
+
+The client side of this module only uses the standard library: importing it must stay cheap.
+"""
+
+import json
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+
+DEFAULT_SOCKET_PATH = os.environ.get(
+    "AGENT_SOCKET_PATH",
+    os.path.join(tempfile.gettempdir(), "financial_assistant_agent.sock"),
+)
+
+# Request options that change how an executor is built: one pool per distinct combination.
+EXECUTOR_OPTIONS = (
+    "model",
+    "provider",
+    "prompt_style",
+    "handle_parsing_errors",
+    "verbose",
+    "timeout",
+    "request_timeout",
+    "hedge_delay",
+    "hedge_model",
+    "hedge_provider",
+)
+
+DEFAULT_OPTIONS = {
+    "model": "gpt-4o",
+    "provider": "openai",
+    "prompt_style": "react",
+    "handle_parsing_errors": True,
+    "verbose": False,
+    "timeout": None,
+    "request_timeout": None,
+    "hedge_delay": None,
+    "hedge_model": None,
+    "hedge_provider": None,
+    "context_format": "pipe",
+}
+
+
+class DaemonError(Exception):
+    """Raised by the client when the daemon answers a request with an error."""
+
+
+class DaemonClient:
+    """
+    Connection to a running daemon. Requests on one connection are answered in order.
+
+    Parameters:
+        socket_path (str): Path of the daemon socket.
+        timeout (float): Optional socket timeout in seconds. Default is to wait forever.
+    """
+
+    def __init__(self, socket_path=DEFAULT_SOCKET_PATH, timeout=None):
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.settimeout(timeout)
+        self._socket.connect(socket_path)
+        self._file = self._socket.makefile("rwb")
+
+    def request(self, op, **fields):
+        """
+        Sends one request and waits for its response.
+
+        Returns:
+            dict: The response.
+
+        Raises:
+            DaemonError: If the daemon reports an error or closes the connection.
+        """
+        self._file.write(json.dumps({"op": op, **fields}).encode() + b"\n")
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise DaemonError("The daemon closed the connection.")
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise DaemonError(response.get("error", "Unknown daemon error."))
+        return response
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def daemon_available(socket_path=DEFAULT_SOCKET_PATH, timeout=0.5):
+    """
+    Returns True if a daemon is listening on `socket_path` and answers a ping.
+    """
+    if not os.path.exists(socket_path):
+        return False
+    try:
+        with DaemonClient(socket_path, timeout=timeout) as client:
+            client.request("ping")
+        return True
+    except (OSError, ValueError, DaemonError):
+        return False
+
+
+def remote_direct_answer(input, socket_path=DEFAULT_SOCKET_PATH, **options):
+    """
+    Same as `direct_answer`, answered by the daemon.
+
+    Parameters:
+        input (str): The input question or prompt.
+        socket_path (str): Path of the daemon socket.
+        **options: Any of DEFAULT_OPTIONS.
+
+    Returns:
+        list: The comma-separated answers of the model.
+    """
+    with DaemonClient(socket_path) as client:
+        return client.request("DirectAnswer", input=input, options=options)["answers"]
+
+
+def remote_chat(initial_input, socket_path=DEFAULT_SOCKET_PATH, **options):
+    """
+    Same interactive loop as `chat`, with the session (executor and memory) kept by the daemon.
+
+    Parameters:
+        initial_input (str): The input question or prompt provided initially.
+        socket_path (str): Path of the daemon socket.
+        **options: Any of DEFAULT_OPTIONS.
+    """
+    with DaemonClient(socket_path) as client:
+        print("Hi Welcome to the chat! Type 'exit' to end the conversation.")
+
+        if initial_input and initial_input.strip():
+            response = client.request("chat", input=initial_input, options=options)
+            print("AI agent:", response["output"])
+
+        while True:
+            user_input = input("User: ")
+            if user_input.lower() == "exit":
+                print("Exiting the program.")
+                break
+
+            response = client.request("chat", input=user_input, options=options)
+            print("AI agent:", response["output"])
+
+    print("Thank you for using the chat! Goodbye!")
+
+
+def stop_daemon(socket_path=DEFAULT_SOCKET_PATH):
+    """
+    Asks the daemon listening on `socket_path` to shut down.
+    """
+    with DaemonClient(socket_path, timeout=5) as client:
+        client.request("shutdown")
+
+
+class AgentDaemon:
+    """
+    The resident state of the daemon: executor pools for direct answers and shared agents for
+    chat sessions, both keyed by the options they were built with.
+
+    Parameters:
+        pool_size (int): Maximum number of executors per configuration, i.e. how many direct
+                         answers with the same options run at the same time.
+    """
+
+    def __init__(self, pool_size=4):
+        self.pool_size = pool_size
+        self.started = time.time()
+        self.requests = 0
+        self._pools = {}
+        self._agents = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _options(options):
+        return {**DEFAULT_OPTIONS, **(options or {})}
+
+    def pool_for(self, options):
+        """
+        Returns the executor pool for the given request options, creating it on first use.
+        """
+        from src.agent import AgentPool, tools
+
+        key = tuple(options[name] for name in EXECUTOR_OPTIONS)
+        with self._lock:
+            if key not in self._pools:
+                self._pools[key] = AgentPool(
+                    size=self.pool_size,
+                    model=options["model"],
+                    provider=options["provider"],
+                    temperature=0,
+                    tools=tools,
+                    prompt_style=options["prompt_style"],
+                    handle_parsing_errors=options["handle_parsing_errors"],
+                    verbose=options["verbose"],
+                    max_execution_time=options["timeout"],
+                    request_timeout=options["request_timeout"],
+                    hedge_delay=options["hedge_delay"],
+                    hedge_model=options["hedge_model"],
+                    hedge_provider=options["hedge_provider"],
+                )
+            return self._pools[key]
+
+    def agent_for(self, options):
+        """
+        Returns the agent runnable shared by the chat sessions with the given options.
+        """
+        from src.agent import agent_builder, tools
+
+        key = (options["model"], options["provider"], options["prompt_style"])
+        with self._lock:
+            if key not in self._agents:
+                self._agents[key] = agent_builder(
+                    model=options["model"],
+                    provider=options["provider"],
+                    temperature=0,
+                    tools=tools,
+                    prompt_style=options["prompt_style"],
+                )
+            return self._agents[key]
+
+    def warm_up(self, options):
+        """
+        Builds one executor for the given direct-answer options ahead of the first request.
+        """
+        self.pool_for(self._options(options)).warm_up(1)
+
+    def handle(self, request, session):
+        """
+        Answers one request.
+
+        Parameters:
+            request (dict): The decoded request.
+            session (dict): Per-connection state; holds the chat executor and memory.
+
+        Returns:
+            dict: The response.
+        """
+        op = request.get("op")
+        if op == "ping":
+            return {
+                "ok": True,
+                "pid": os.getpid(),
+                "uptime": time.time() - self.started,
+            }
+
+        with self._lock:
+            self.requests += 1
+        options = self._options(request.get("options"))
+
+        if op == "DirectAnswer":
+            from src.agent import answer_with_executor
+            from src.utils.prompt_budget import prompt_budget
+
+            with self.pool_for(options).executor() as agent_executor:
+                answers = answer_with_executor(
+                    agent_executor,
+                    request["input"],
+                    context_format=options["context_format"],
+                    timeout=options["timeout"],
+                    max_input_tokens=prompt_budget(options["model"]),
+                    provider=options["provider"],
+                    model=options["model"],
+                )
+            return {"ok": True, "answers": answers}
+
+        if op == "chat":
+            from src.agent.chat import chat_turn, start_chat_session
+            from src.utils.prompt_budget import prompt_budget
+
+            if "chat" not in session:
+                session["chat"] = start_chat_session(
+                    model=options["model"],
+                    provider=options["provider"],
+                    temperature=0,
+                    prompt_style=options["prompt_style"],
+                    handle_parsing_errors=options["handle_parsing_errors"],
+                    verbose=options["verbose"],
+                    agent=self.agent_for(options),
+                )
+            agent_executor, memory = session["chat"]
+            return {
+                "ok": True,
+                "output": chat_turn(
+                    agent_executor,
+                    memory,
+                    request["input"],
+                    prompt_budget(options["model"]),
+                    options["provider"],
+                    options["model"],
+                ),
+            }
+
+        raise ValueError(f"Unknown operation: {op}")
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        session = {}
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                if request.get("op") == "shutdown":
+                    self._respond({"ok": True})
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                    return
+                response = self.server.daemon.handle(request, session)
+            except Exception as e:
+                response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            self._respond(response)
+
+    def _respond(self, response):
+        self.wfile.write(json.dumps(response).encode() + b"\n")
+        self.wfile.flush()
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def create_server(socket_path=DEFAULT_SOCKET_PATH, pool_size=4):
+    """
+    Binds the daemon to `socket_path` without serving yet.
+
+    A stale socket file left by a crashed daemon is replaced; a live daemon is not.
+    The socket is only accessible by the current user.
+
+    Returns:
+        socketserver.BaseServer: The server; its `daemon` attribute is the `AgentDaemon`.
+
+    Raises:
+        RuntimeError: If another daemon is already listening on `socket_path`.
+    """
+    if os.path.exists(socket_path):
+        if daemon_available(socket_path):
+            raise RuntimeError(f"A daemon is already listening on {socket_path}.")
+        os.unlink(socket_path)
+
+    previous_umask = os.umask(0o177)
+    try:
+        server = _UnixServer(socket_path, _RequestHandler)
+    finally:
+        os.umask(previous_umask)
+    server.daemon = AgentDaemon(pool_size=pool_size)
+    return server
+
+
+def serve(socket_path=DEFAULT_SOCKET_PATH, pool_size=4, warm_up_options=None):
+    """
+    Runs the daemon until it receives a "shutdown" request or is interrupted.
+
+    Parameters:
+        socket_path (str): Path of the Unix socket to listen on.
+        pool_size (int): Maximum number of executors per configuration.
+        warm_up_options (dict): Direct-answer options to build one executor for at start-up.
+    """
+    server = create_server(socket_path, pool_size=pool_size)
+    try:
+        if warm_up_options is not None:
+            try:
+                server.daemon.warm_up(warm_up_options)
+            except Exception as e:
+                # The executor is built again on the first request; report and keep serving.
+                print(f"Warm-up failed: {e}")
+        print(f"Agent daemon listening on {socket_path} (pid {os.getpid()}).")
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
@@ -1,22 +1,44 @@
 #!/usr/bin/env python3
 import argparse
-import warnings
+import json
+import sys
 
-from langsmith.utils import LangSmithMissingAPIKeyWarning
+# Only the standard library is imported here: when a daemon is running (see `--serve`), the
+# CLI is a thin client and never imports langchain or the provider SDKs.
+from src.daemon import (
+    DEFAULT_SOCKET_PATH,
+    daemon_available,
+    remote_chat,
+    remote_direct_answer,
+    serve,
+    stop_daemon,
+)
 
-from src import agent_executor_builder  # Adjust path if needed
-from src import tools  # Adjust path if needed
 
-warnings.filterwarnings("ignore", category=LangSmithMissingAPIKeyWarning)
-warnings.filterwarnings(
-    "ignore", category=RuntimeWarning, message=".*agent.agent_builder.*"
-)
-# Import the two functionalities:
-# Assuming that chat functionality and direct answer (Q&A) functionality have been implemented as specified.
-from src import chat  # This module contains the interactive chat function
-from src import direct_answer  # This module contains the direct answer (Q&A) function
+def import_agent_stack():
+    """
+    Imports the agent functionalities (and with them langchain and the provider SDKs).
+    """
+    import warnings
+
+    from langsmith.utils import LangSmithMissingAPIKeyWarning
+
+    warnings.filterwarnings("ignore", category=LangSmithMissingAPIKeyWarning)
+    warnings.filterwarnings(
+        "ignore", category=RuntimeWarning, message=".*agent.agent_builder.*"
+    )
+    # Import the two functionalities:
+    # Assuming that chat functionality and direct answer (Q&A) functionality have been implemented as specified.
+    from src import chat  # This module contains the interactive chat function
+    from src import tools  # Adjust path if needed
+    from src import (  # This module contains the direct answer (Q&A) function
+        direct_answer,
+    )
+    from src.agent import AgentPool, run_batch
 
-# from src import warnings_config  # noqa: F401
+    # from src import warnings_config  # noqa: F401
+
+    return chat, direct_answer, tools, AgentPool, run_batch
 
 
 def main():
@@ -25,9 +47,8 @@ def main():
     )
     parser.add_argument(
         "--mode",
-        choices=["chat", "DirectAnswer"],
-        required=True,
-        help="Mode to run: 'chat' for interactive chat or 'DirectAnswer' for Q&A.",
+        choices=["chat", "DirectAnswer", "batch"],
+        help="Mode to run: 'chat' for interactive chat, 'DirectAnswer' for Q&A or 'batch' for Q&A over a JSONL file.",
     )
     parser.add_argument(
         "--input",
@@ -64,19 +85,189 @@ def main():
         action="store_true",
         help="Handle parsing errors (only for DirectAnswer mode)",
     )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=None,
+        help="Wall-clock deadline in seconds for the answer; on expiry the best partial answer is returned (only for DirectAnswer mode)",
+    )
+    parser.add_argument(
+        "--request_timeout",
+        type=float,
+        default=None,
+        help="Timeout in seconds for each single LLM call (only for DirectAnswer mode)",
+    )
+    parser.add_argument(
+        "--hedge_delay",
+        type=float,
+        default=None,
+        help="Duplicate an LLM call that has not answered after this many seconds (or failed) and keep the first answer (DirectAnswer and batch modes)",
+    )
+    parser.add_argument(
+        "--hedge_model",
+        type=str,
+        default=None,
+        help="Model of the hedge requests (default: --model)",
+    )
+    parser.add_argument(
+        "--hedge_provider",
+        type=str,
+        default=None,
+        help="Provider of the hedge requests (default: --provider)",
+    )
+    parser.add_argument(
+        "--fast_path",
+        action="store_true",
+        help="Answer templated questions of a thread from its table without the LLM (only for local DirectAnswer mode)",
+    )
+    parser.add_argument(
+        "--context_format",
+        choices=["pipe", "csv", "json", "repr"],
+        default="pipe",
+        help="How a thread passed as input is rendered in the prompt (only for DirectAnswer mode)",
+    )
     parser.add_argument(
         "--verbose",
         action="store_true",
         help="Enable verbose output (only for DirectAnswer mode)",
     )
 
+    # Additional parameters for batch mode:
+    parser.add_argument(
+        "--batch_input",
+        type=str,
+        default="-",
+        help="JSONL file with one question per line, or '-' for stdin (only for batch mode)",
+    )
+    parser.add_argument(
+        "--batch_output",
+        type=str,
+        default="-",
+        help="JSONL file the answers are written to, or '-' for stdout (only for batch mode)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Number of questions answered at the same time (only for batch mode)",
+    )
+    parser.add_argument(
+        "--unordered",
+        action="store_true",
+        help="Write answers as soon as they complete instead of in input order (only for batch mode)",
+    )
+    parser.add_argument(
+        "--group_contexts",
+        action="store_true",
+        help="Answer the threads about the same document in one agent call (only for batch mode)",
+    )
+
+    # Parameters of the resident daemon:
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run the warm agent daemon: later chat/DirectAnswer calls are forwarded to it",
+    )
+    parser.add_argument(
+        "--stop",
+        action="store_true",
+        help="Stop the running agent daemon",
+    )
+    parser.add_argument(
+        "--socket",
+        type=str,
+        default=DEFAULT_SOCKET_PATH,
+        help=f"Unix socket of the agent daemon (default: {DEFAULT_SOCKET_PATH})",
+    )
+    parser.add_argument(
+        "--pool_size",
+        type=int,
+        default=4,
+        help="Executors kept per configuration by the daemon (default: 4)",
+    )
+    parser.add_argument(
+        "--no_daemon",
+        action="store_true",
+        help="Run in this process even if a daemon is running",
+    )
+
     args = parser.parse_args()
 
+    if args.stop:
+        stop_daemon(args.socket)
+        return
+
+    if args.serve:
+        serve(
+            socket_path=args.socket,
+            pool_size=args.pool_size,
+            warm_up_options={
+                "model": args.model,
+                "provider": args.provider,
+                "prompt_style": args.prompt_style,
+                "handle_parsing_errors": True,
+                "verbose": args.verbose,
+                "timeout": args.timeout,
+                "request_timeout": args.request_timeout,
+                "hedge_delay": args.hedge_delay,
+                "hedge_model": args.hedge_model,
+                "hedge_provider": args.hedge_provider,
+            },
+        )
+        return
+
+    if args.mode is None:
+        parser.error("--mode is required unless --serve or --stop is used.")
+
     # If --input wasn't provided, prompt the user interactively
-    if not args.input:
+    if not args.input and args.mode != "batch":
         args.input = input("Please enter your input: ")
 
-    if args.mode == "chat":
+    # The daemon keeps memory-less executors and does not run the fast path, so DirectAnswer
+    # runs with these options stay local to behave the same with or without a daemon.
+    local_only = args.mode == "DirectAnswer" and (args.memory_flag or args.fast_path)
+    use_daemon = (
+        args.mode in ("chat", "DirectAnswer")
+        and not args.no_daemon
+        and not local_only
+        and daemon_available(args.socket)
+    )
+    if not use_daemon:
+        chat, direct_answer, tools, AgentPool, run_batch = import_agent_stack()
+
+    if args.mode == "chat" and use_daemon:
+        # Same fixed parameters as the local chat below, the session lives in the daemon.
+        remote_chat(
+            initial_input=args.input,
+            socket_path=args.socket,
+            model=args.model,
+            provider=args.provider,
+            prompt_style="structured-chat-agent",
+            handle_parsing_errors=True,
+            verbose=False,
+        )
+
+    elif args.mode == "DirectAnswer" and use_daemon:
+        answers = remote_direct_answer(
+            input=args.input,
+            socket_path=args.socket,
+            model=args.model,
+            provider=args.provider,
+            prompt_style=args.prompt_style,
+            handle_parsing_errors=args.handle_parsing_errors,
+            verbose=args.verbose,
+            timeout=args.timeout,
+            request_timeout=args.request_timeout,
+            hedge_delay=args.hedge_delay,
+            hedge_model=args.hedge_model,
+            hedge_provider=args.hedge_provider,
+            context_format=args.context_format,
+        )
+        print("Answers:")
+        for answer in answers:
+            print(answer.strip())
+
+    elif args.mode == "chat":
         # For chat mode, the following parameters remain fixed:\
         temperature = 0
         fixed_prompt_style = "structured-chat-agent"
@@ -109,6 +300,7 @@ def main():
         print(f"Prompt style: {args.prompt_style}")
         print(f"Memory enabled: {args.memory_flag}")
         print(f"Handle parsing errors: {args.handle_parsing_errors}")
+        print(f"Timeout: {args.timeout}")
         print(f"Verbose output: {args.verbose}\n")
 
         # Call the direct_answer function with user-specified parameters.
@@ -122,12 +314,65 @@ def main():
             memory_flag=args.memory_flag,
             handle_parsing_errors=args.handle_parsing_errors,
             verbose=args.verbose,
+            timeout=args.timeout,
+            request_timeout=args.request_timeout,
+            context_format=args.context_format,
+            hedge_delay=args.hedge_delay,
+            hedge_model=args.hedge_model,
+            hedge_provider=args.hedge_provider,
+            fast_path=args.fast_path,
         )
         # Print answers (assuming answers is a list of strings)
         print("Answers:")
         for answer in answers:
             print(answer.strip())
 
+    elif args.mode == "batch":
+        # Executors are built once and reused across all the questions of the batch.
+        pool = AgentPool(
+            size=args.concurrency,
+            model=args.model,
+            provider=args.provider,
+            temperature=0,
+            tools=tools,
+            prompt_style=args.prompt_style,
+            handle_parsing_errors=True,
+            verbose=args.verbose,
+            max_execution_time=args.timeout,
+            request_timeout=args.request_timeout,
+            hedge_delay=args.hedge_delay,
+            hedge_model=args.hedge_model,
+            hedge_provider=args.hedge_provider,
+        )
+        input_stream = (
+            sys.stdin if args.batch_input == "-" else open(args.batch_input, "r")
+        )
+        output_stream = (
+            sys.stdout if args.batch_output == "-" else open(args.batch_output, "w")
+        )
+        from src.utils.prompt_budget import prompt_budget
+
+        try:
+            summary = run_batch(
+                input_stream,
+                output_stream,
+                pool,
+                concurrency=args.concurrency,
+                ordered=not args.unordered,
+                context_format=args.context_format,
+                timeout=args.timeout,
+                group_contexts=args.group_contexts,
+                max_input_tokens=prompt_budget(args.model),
+                provider=args.provider,
+                model=args.model,
+            )
+        finally:
+            if input_stream is not sys.stdin:
+                input_stream.close()
+            if output_stream is not sys.stdout:
+                output_stream.close()
+        print(json.dumps(summary), file=sys.stderr)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,237 @@
+import numpy as np
+
+from src.metrics.compute_metrics import answer_arrays, score_answer_arrays
+
+
+class RunningMean:
+    """
+    Count, mean and variance of a stream of values in constant memory (Welford's algorithm).
+
+    Two instances built on different parts of a stream merge into the statistics of the whole
+    stream (Chan et al.), whatever the split and the order of the parts.
+    """
+
+    def __init__(self, count=0, mean=0.0, m2=0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def merge(self, other):
+        if other.count == 0:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta**2 * self.count * other.count / count
+        self.count = count
+        return self
+
+    @property
+    def variance(self):
+        """Sample variance (None with fewer than two values)."""
+        return self.m2 / (self.count - 1) if self.count > 1 else None
+
+    @property
+    def mean_square(self):
+        """Mean of the squared values: population variance plus squared mean."""
+        return self.m2 / self.count + self.mean**2 if self.count else None
+
+    def to_dict(self):
+        return {"count": self.count, "mean": self.mean, "m2": self.m2}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["count"], data["mean"], data["m2"])
+
+
+class MetricsAccumulator:
+    """
+    Constant-memory, mergeable aggregate of the metrics of an evaluation run.
+
+    Each sample is scored as it arrives (with the vectorized scorer) and only counts and
+    running moments are kept: accuracy and per-position accuracy counts, Welford mean and
+    variance of the absolute and relative numeric errors (MAE, MSE and standard deviation
+    follow from them) and the mean judge score. Accumulators of different shards (workers,
+    processes, partial runs) merge into the accumulator of the whole run, and `to_dict` /
+    `from_dict` carry them between processes as JSON.
+
+    Parameters:
+        tolerance (float): Tolerance for numeric comparisons.
+    """
+
+    def __init__(self, tolerance=0.005):
+        self.tolerance = tolerance
+        self.samples = 0
+        self.answers = 0
+        self.correct = 0
+        self.position_counts = []
+        self.position_correct = []
+        self.errors = RunningMean()
+        self.relative_errors = RunningMean()
+        self.llm_scores = RunningMean()
+
+    def update(self, expected_answers, actual_answers):
+        """
+        Scores one sample and adds it to the aggregate.
+
+        Parameters:
+            expected_answers (list): The expected answers of the sample.
+            actual_answers (list): The predicted answers of the sample.
+
+        Returns:
+            dict: The scores of the sample: "accuracy_measurements", "mean_accuracy", "mae",
+                  "mse", "numeric_errors" (see `compute_single_sample_accuracy`) and
+                  "relative_errors".
+        """
+        scores = self.score(expected_answers, actual_answers)
+        self.add(scores)
+        return scores
+
+    def score(self, expected_answers, actual_answers):
+        """
+        Scores one sample without adding it, so that samples can be scored concurrently and
+        added in order with `add`.
+
+        Returns:
+            dict: The same scores as `update`.
+        """
+        arrays = answer_arrays([expected_answers], [actual_answers])
+        scores = score_answer_arrays(arrays, self.tolerance)
+        expected = np.abs(arrays["expected"][arrays["numeric"]])
+        return {
+            "accuracy_measurements": scores["accuracy_measurements"],
+            "mean_accuracy": scores["mean_accuracy"],
+            "mae": scores["mae"],
+            "mse": scores["mse"],
+            "numeric_errors": scores["numeric_errors"],
+            "relative_errors": [
+                error / value
+                for error, value in zip(scores["numeric_errors"], expected.tolist())
+                if value != 0
+            ],
+        }
+
+    def add(self, scores):
+        """Adds the scores of a sample (see `score`) to the aggregate."""
+        self.samples += 1
+        measurements = scores["accuracy_measurements"]
+        self.answers += len(measurements)
+        self.correct += sum(measurements)
+        self._grow(len(measurements))
+        for position, score in enumerate(measurements):
+            self.position_counts[position] += 1
+            self.position_correct[position] += score
+        for error in scores["numeric_errors"]:
+            self.errors.add(error)
+        for error in scores["relative_errors"]:
+            self.relative_errors.add(error)
+
+    def add_llm_scores(self, llm_scores):
+        """Adds the judge scores of a sample."""
+        for score in llm_scores:
+            self.llm_scores.add(score)
+
+    def _grow(self, positions):
+        missing = positions - len(self.position_counts)
+        if missing > 0:
+            self.position_counts.extend([0] * missing)
+            self.position_correct.extend([0] * missing)
+
+    def merge(self, other):
+        """
+        Adds the aggregate of another accumulator (e.g. of another shard) to this one.
+
+        Returns:
+            MetricsAccumulator: self.
+        """
+        self.samples += other.samples
+        self.answers += other.answers
+        self.correct += other.correct
+        self._grow(len(other.position_counts))
+        for position, count in enumerate(other.position_counts):
+            self.position_counts[position] += count
+            self.position_correct[position] += other.position_correct[position]
+        self.errors.merge(other.errors)
+        self.relative_errors.merge(other.relative_errors)
+        self.llm_scores.merge(other.llm_scores)
+        return self
+
+    def summary(self):
+        """
+        Returns the metrics of everything accumulated so far; can be called mid-run.
+
+        Returns:
+            dict: "samples", "answers", "mean_accuracy" (0 without answers), "mae", "mse",
+                  "error_std" (sample standard deviation of the numeric errors),
+                  "relative_error" (mean |error| / |expected|), "llm_average_score" (0 without
+                  judge scores) and "position_accuracy". Error metrics are None without
+                  numeric answers.
+        """
+        variance = self.errors.variance
+        return {
+            "samples": self.samples,
+            "answers": self.answers,
+            "mean_accuracy": self.correct / self.answers if self.answers else 0,
+            "mae": self.errors.mean if self.errors.count else None,
+            "mse": self.errors.mean_square,
+            "error_std": variance**0.5 if variance is not None else None,
+            "relative_error": (
+                self.relative_errors.mean if self.relative_errors.count else None
+            ),
+            "llm_average_score": (self.llm_scores.mean if self.llm_scores.count else 0),
+            "position_accuracy": [
+                correct / count if count else 0.0
+                for correct, count in zip(self.position_correct, self.position_counts)
+            ],
+        }
+
+    def to_dict(self):
+        """Returns the state of the accumulator as a JSON-serializable dict."""
+        return {
+            "tolerance": self.tolerance,
+            "samples": self.samples,
+            "answers": self.answers,
+            "correct": self.correct,
+            "position_counts": list(self.position_counts),
+            "position_correct": list(self.position_correct),
+            "errors": self.errors.to_dict(),
+            "relative_errors": self.relative_errors.to_dict(),
+            "llm_scores": self.llm_scores.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuilds an accumulator from `to_dict` output."""
+        accumulator = cls(tolerance=data["tolerance"])
+        accumulator.samples = data["samples"]
+        accumulator.answers = data["answers"]
+        accumulator.correct = data["correct"]
+        accumulator.position_counts = list(data["position_counts"])
+        accumulator.position_correct = list(data["position_correct"])
+        accumulator.errors = RunningMean.from_dict(data["errors"])
+        accumulator.relative_errors = RunningMean.from_dict(data["relative_errors"])
+        accumulator.llm_scores = RunningMean.from_dict(data["llm_scores"])
+        return accumulator
+
+
+def merge_accumulators(states):
+    """
+    Merges the accumulator states of several shards (`MetricsAccumulator.to_dict` outputs,
+    e.g. the "accumulator" of each `measure_accuracy` result) into the metrics of the whole run.
+
+    Parameters:
+        states (list): The accumulator states.
+
+    Returns:
+        dict: The `summary` of the merged accumulator.
+    """
+    merged = MetricsAccumulator(tolerance=states[0]["tolerance"] if states else 0.005)
+    for state in states:
+        merged.merge(MetricsAccumulator.from_dict(state))
+    return merged.summary()
@@ -1,16 +1,81 @@
 import random
-import re
+import time
 
+import numpy as np
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage  # noqa: F401
 
-from src.agent import agent_executor_builder, system_prompt, tools
-from src.metrics.compute_metrics import compute_single_sample_accuracy
+from src.agent import (
+    AgentMetricsCallbackHandler,
+    agent_executor_builder,
+    answer_decomposed,
+    build_task_input,
+    consistency_failures,
+    invoke_with_deadline,
+    route_question,
+    solve_thread,
+    split_questions,
+    system_prompt,
+    tools,
+)
+from src.agent.program_solver import format_answer
+from src.agent.template_solver import DEFAULT_MIN_CONFIDENCE
+from src.metrics.accumulators import MetricsAccumulator
+from src.metrics.bootstrap import compare_results
+from src.metrics.compute_metrics import (
+    parse_agent_output,
+    split_agent_output,
+)
 from src.metrics.llm_as_a_judge import evaluate_answer
+from src.metrics.pipeline import run_pipeline
+from src.metrics.predictions import save_predictions, serialize_steps
+from src.metrics.sequential import stopping_reason, wilson_interval
 from src.utils import (
-    extract_selected_threads_processed,
+    extract_thread_details,
     get_exact_answers,
+    group_threads_by_context,
     open_json_file,
+    serialize_context,
+    split_group_answers,
 )
+from src.utils.prompt_budget import prompt_budget, trim_to_budget
+
+# Worker threads of each evaluation stage (see `measure_accuracy`).
+DEFAULT_STAGE_CONCURRENCY = {"prep": 1, "agent": 1, "score": 1, "judge": 1}
+
+
+def summarize_route(records):
+    """
+    Aggregates the (accuracy measurements, latency, cost) records of the samples of a route.
+    """
+    measurements = [score for scores, _, _ in records for score in scores]
+    latencies = [latency for _, latency, _ in records]
+    costs = [cost for _, _, cost in records]
+    cost = None if None in costs else sum(costs)
+    return {
+        "samples": len(records),
+        "mean_accuracy": (
+            sum(measurements) / len(measurements) if measurements else None
+        ),
+        "latency_p50": float(np.percentile(latencies, 50)),
+        "latency_p95": float(np.percentile(latencies, 95)),
+        "cost_usd": cost,
+        "cost_per_sample": cost / len(records) if cost is not None else None,
+    }
+
+
+def summarize_fast_path(records, samples):
+    """
+    Aggregates the accuracy measurements of the samples answered by the template solver.
+    """
+    measurements = [score for scores in records for score in scores]
+    return {
+        "samples": samples,
+        "answered": len(records),
+        "coverage": len(records) / samples if samples else None,
+        "mean_accuracy": (
+            sum(measurements) / len(measurements) if measurements else None
+        ),
+    }
 
 
 def measure_accuracy(
@@ -25,6 +90,26 @@ def measure_accuracy(
     memory_flag=False,
     verbose=True,
     seed=42,
+    timeout=None,
+    request_timeout=None,
+    step_metrics_path=None,
+    context_format="pipe",
+    cheap_model=None,
+    cheap_provider=None,
+    cascade=False,
+    group_contexts=False,
+    decompose=False,
+    fast_path=False,
+    fast_path_confidence=DEFAULT_MIN_CONFIDENCE,
+    predictions_path=None,
+    progress_callback=None,
+    target_width=None,
+    decision_threshold=None,
+    confidence=0.95,
+    min_samples=10,
+    stage_concurrency=None,
+    queue_size=2,
+    tool_descriptions=None,
 ):
     """
     Measure accuracy by comparing the predicted answers with the exact answers over a number of random samples.
@@ -44,6 +129,56 @@ def measure_accuracy(
         temperature (float): Temperature for the model.
         memory_flag (bool): Whether memory is enabled.
         verbose (bool): Whether to print detailed output.
+        timeout (float): Optional wall-clock deadline in seconds for each sample. On expiry the
+                         best partial answer is scored instead of hanging the run.
+        request_timeout (float): Optional timeout in seconds for each single LLM call.
+        step_metrics_path (str): Optional path of a JSON lines file where the per-step latency and
+                                 token records of the agent runs are appended.
+        context_format (str): How the sample is rendered in the prompt (see `serialize_context`):
+                              "pipe" (default), "csv", "json" or the legacy "repr".
+        cheap_model (str): Optional cheap model. If set, each sample is routed before dispatch
+                           (see `route_question`): simple lookups go to `cheap_model`, the
+                           others to `model`.
+        cheap_provider (str): Provider of the cheap model. Default is `provider`.
+        cascade (bool): If True, a cheap answer that fails the local consistency checks
+                        (see `consistency_failures`) is answered again by `model`.
+        group_contexts (bool): If True, samples about the same document (see
+                               `group_threads_by_context`) are answered in one agent call and
+                               the predictions are mapped back to each sample.
+        decompose (bool): If True, a sample with several questions is answered by one
+                          sub-agent per question, run concurrently (see `answer_decomposed`),
+                          and the answers are assembled in QA-field order. The agent step
+                          metrics then count each sub-agent run as a sample.
+        fast_path (bool): If True, samples whose questions all match a template are answered
+                          from the table by `solve_thread` before any agent is built; only the
+                          others (or low-confidence ones) go to the LLM.
+        fast_path_confidence (float): Minimum confidence of a fast-path answer.
+        predictions_path (str): Optional path of a prediction file (see `save_predictions`)
+                                where the raw output, raw and parsed answers, intermediate
+                                steps and judge scores of each sample are stored, so that the
+                                run can be rescored offline (`python -m src.metrics.predictions`).
+        progress_callback (callable): Optional function called after each sample with the
+                                      metrics so far (see `MetricsAccumulator.summary`).
+        target_width (float): Adaptive mode: after each sample a Wilson interval on the mean
+                              accuracy is updated and the run stops once it is at most this
+                              wide; `number_samples` is then the maximum.
+        decision_threshold (float): Adaptive mode: stop once the interval is entirely above or
+                                    below this accuracy.
+        confidence (float): Confidence level of the adaptive interval.
+        min_samples (int): Number of samples evaluated before an adaptive run may stop.
+        stage_concurrency (dict): Worker threads per evaluation stage, e.g. {"agent": 4,
+                                  "judge": 2}. The samples go through bounded queues from
+                                  "prep" (fast path and routing) to "agent" (inference),
+                                  "score" (parsing and scoring) and "judge" (LLM judge), so
+                                  the judge calls of a sample overlap the agent run of the
+                                  next one. Missing stages use DEFAULT_STAGE_CONCURRENCY.
+                                  The results are aggregated in sample order whatever the
+                                  concurrency; an adaptive run that stops drops the samples
+                                  still in flight.
+        queue_size (int): Capacity of the queue in front of each stage.
+        tool_descriptions (str): "verbose" or "compact" tool descriptions in the agent
+                                 prompt (see `agent_builder`). Default is the mode of the
+                                 prompt style. `compare_tool_descriptions` measures both.
 
     Returns:
         dict: A dictionary containing:
@@ -51,7 +186,29 @@ def measure_accuracy(
               - "mean_accuracy": overall average accuracy score.
               - "mae": overall mean absolute error for numeric answers (None if no numeric answers).
               - "mse": overall mean squared error (None if no numeric answers).
+              - "error_std": standard deviation of the numeric errors (None with fewer than two).
+              - "relative_error": mean |error| / |expected| of the numeric answers (None if none).
+              - "position_accuracy": accuracy of the first, second, ... answer of the samples.
               - "llm_average_score": overall average score from the LLM judge.
+              - "sample_scores": per sample, its dataset "index", "accuracy_measurements",
+                "numeric_errors" and "llm_scores" (for bootstrap intervals and paired tests,
+                see `src.metrics.bootstrap`).
+              - "accumulator": the state of the run aggregate (see `MetricsAccumulator`); the
+                states of runs over different shards merge with `merge_accumulators`.
+              - "stopping": in adaptive mode, "reason" (see `stopping_reason`; None if the
+                samples ran out), "samples" and "trace" (the interval after each sample);
+                None otherwise.
+              - "latency_p50", "latency_p95": percentiles of the agent wall time per sample (s).
+              - "tokens_per_sample": mean prompt + completion tokens per sample.
+              - "cost_usd": estimated cost of the agent calls (None if the model price is unknown);
+                with routing, each call is priced with the model it was sent to.
+              - "agent_step_metrics": the full aggregate of the per-step instrumentation.
+              - "routes": with routing, for each route ("cheap", "expensive", "cascade"):
+                "samples", "mean_accuracy", "latency_p50", "latency_p95", "cost_usd" (None
+                if a model price is unknown) and "cost_per_sample"; None without routing.
+              - "fast_path": with the fast path, "samples" (samples tried), "answered" (samples
+                answered locally), "coverage" (answered / samples) and "mean_accuracy" (of the
+                local answers, None if none); None without the fast path.
     """
     # Open and load the JSON data.
     data = open_json_file(data_path)
@@ -62,138 +219,429 @@ def measure_accuracy(
     # Select random indices for sample evaluation.
     random_indices = random.sample(range(len(data)), number_samples)
 
-    # Lists to accumulate metrics from each sample.
-    all_accuracy_measurements = []
-    all_numeric_errors = []
-    all_llm_scores = []
+    # Constant-memory aggregate of the sample scores and judge scores. The few scores of each
+    # sample are still listed, for the "accuracy_measurements" and "sample_scores" of the
+    # results.
+    accumulator = MetricsAccumulator(tolerance=tolerance)
+    accuracy_measurements = []
+    sample_scores = []
+    route_records = {}
+    fast_path_records = []
+    predictions = []
+    adaptive = target_width is not None or decision_threshold is not None
+    stopping_trace = []
+    stop_reason = None
     sample = 0
 
+    # Records per-step latency and token usage of every agent run.
+    step_metrics = AgentMetricsCallbackHandler(model=model)
+
+    # Extract and process the selected samples.
+    selected = []
     for index in random_indices:
-        print(
-            f"Initializing agent executor for sample index:{index} of trials {sample} out of {number_samples}"
+        exact_answers, single_sample = get_exact_answers(
+            extract_thread_details(data[index])
         )
+        selected.append((index, exact_answers, single_sample))
 
-        # Extract and process the sample.
-        data_processed = extract_selected_threads_processed(data)
-        exact_answers, single_sample = get_exact_answers(data_processed[index])
+    # Samples about the same document are answered together in one agent call.
+    if group_contexts:
+        groups = group_threads_by_context([sample for _, _, sample in selected])
+    else:
+        groups = [
+            {"indices": [position], "sample": sample, "question_map": [None]}
+            for position, (_, _, sample) in enumerate(selected)
+        ]
 
-        # Build the agent executor.
+    def run_single(run_sample, run_model, run_provider, label):
+        # One agent run; the per-run handler prices the tokens of the model used.
+        run_metrics = AgentMetricsCallbackHandler(model=run_model)
         agent_executor, memory = agent_executor_builder(
-            model=model,
-            provider=provider,
+            model=run_model,
+            provider=run_provider,
             temperature=temperature,
             tools=tools,
             prompt_style=prompt_style,
             memory_flag=memory_flag,
             verbose=verbose,
+            max_execution_time=timeout,
+            request_timeout=request_timeout,
+            callbacks=[step_metrics, run_metrics],
+            tool_descriptions=tool_descriptions,
+        )
+        # The rendered context is trimmed to the run model's budget, as in `answer_with_executor`.
+        model_input, _ = trim_to_budget(
+            serialize_context(run_sample, context_format),
+            prompt_budget(run_model),
+            run_provider,
+            run_model,
+        )
+        response = invoke_with_deadline(
+            agent_executor,
+            {"input": build_task_input(model_input)},
+            timeout=timeout,
+        )
+        if response.get("timed_out"):
+            print(f"Sample {label} timed out: {response['timeout_reason']}")
+        # The raw answers are kept (and stored) so that they can be normalized again later.
+        return (
+            split_agent_output(response["output"]),
+            run_metrics.summary()["cost_usd"],
+            {
+                "output": response["output"],
+                "intermediate_steps": serialize_steps(
+                    response.get("intermediate_steps")
+                ),
+            },
         )
 
-        # Process the model's response.
-        processed_answers = []
-        response = agent_executor.invoke(
+    def run_agent(run_sample, run_model, run_provider, label):
+        if not decompose:
+            return run_single(run_sample, run_model, run_provider, label)
+        # One sub-agent per question, run concurrently; the cost is the total of the runs.
+        # The runs are stored by question position, not in completion order.
+        sub_samples = split_questions(run_sample)
+        runs = [None] * len(sub_samples)
+
+        def answer_question(sub_sample):
+            position = 0
+            if len(sub_samples) > 1:
+                # The sub-threads are numbered by their QA field (qa_0, qa_1, ...).
+                position = int(sub_sample["qa"][0]["qa_field"].rsplit("_", 1)[1])
+            raw_answers, cost, run = run_single(
+                sub_sample, run_model, run_provider, label
+            )
+            runs[position] = (cost, run)
+            return raw_answers
+
+        raw_answers = answer_decomposed(run_sample, answer_question)
+        costs = [cost for cost, _ in runs]
+        return (
+            raw_answers,
+            None if None in costs else sum(costs),
             {
-                "input": f"""{system_prompt}. Pay attention to the format. Task: Given the following input extract the questions in the qa, qa_0, qa_1 fields and usign the provided context answer the questions. 
-            Do not output any explanantion in the output only the answer {single_sample}"""
-            }
+                "output": [run["output"] for _, run in runs],
+                "intermediate_steps": [
+                    step for _, run in runs for step in run["intermediate_steps"]
+                ],
+            },
         )
-        # Process the model's response with original method
-        processed_answers = []
-        if isinstance(response["output"], str):
-            for raw_answer in response["output"].split(","):
-                # Normalize the answer: strip, lower, and remove spaces.
-                answer = raw_answer.strip().lower().replace(" ", "")
-                # Remove any surrounding parentheses, brackets, or braces using regex.
-                answer = re.sub(r"^[\(\[\{](.*?)[\)\]\}]$", r"\1", answer).strip()
-                try:
-                    processed_answers.append(round(float(answer), 4))
-                except ValueError:
-                    processed_answers.append(answer)
-        elif isinstance(response["output"], list):
-            for raw_answer in response["output"]:
-                if isinstance(raw_answer, dict):
-                    answer = raw_answer.get("text", "")
-                else:
-                    answer = raw_answer
-                # Normalize the answer: strip, lower, and remove spaces.
-                answer = answer.strip().lower().replace(" ", "")
-                # Remove any surrounding parentheses, brackets, or braces using regex.
-                answer = re.sub(r"^[\(\[\{](.*?)[\)\]\}]$", r"\1", answer).strip()
-                try:
-                    processed_answers.append(round(float(answer), 4))
-                except ValueError:
-                    processed_answers.append(answer)
-
-        # Use the compute_single_sample_accuracy function.
-        sample_metrics = compute_single_sample_accuracy(
-            expected_answers=exact_answers,
-            actual_answers=processed_answers,
-            tolerance=tolerance,
+
+    def prepare(item):
+        # Sample prep: try the template solver and route the sample before dispatch.
+        position, group = item
+        members = [selected[member] for member in group["indices"]]
+        label = ", ".join(str(index) for index, _, _ in members)
+        print(
+            f"Initializing agent executor for sample index:{label} of trials {position} out of {len(groups)}"
+        )
+        solution = (
+            solve_thread(group["sample"], fast_path_confidence) if fast_path else None
+        )
+        route = route_question(group["sample"])[0] if cheap_model else None
+        if solution is not None:
+            print(f"Sample {label} answered by the fast path: {solution['templates']}")
+            route = None
+        return {
+            "group": group,
+            "members": members,
+            "label": label,
+            "solution": solution,
+            "route": route,
+        }
+
+    def answer(job):
+        # Agent inference (or the fast-path answers).
+        group_sample, label, route = job["group"]["sample"], job["label"], job["route"]
+        started = time.perf_counter()
+        if job["solution"] is not None:
+            raw_answers = [
+                format_answer(answer) for answer in job["solution"]["answers"]
+            ]
+            cost = 0.0
+            run = {"output": ", ".join(raw_answers), "intermediate_steps": []}
+        elif route == "cheap":
+            raw_answers, cost, run = run_agent(
+                group_sample, cheap_model, cheap_provider or provider, label
+            )
+            failures = consistency_failures(
+                parse_agent_output(raw_answers), group_sample
+            )
+            if cascade and failures:
+                print(f"Sample {label} escalated to {model}: {failures}")
+                route = "cascade"
+                raw_answers, expensive_cost, run = run_agent(
+                    group_sample, model, provider, label
+                )
+                cost = (
+                    None
+                    if cost is None or expensive_cost is None
+                    else cost + expensive_cost
+                )
+        else:
+            raw_answers, cost, run = run_agent(group_sample, model, provider, label)
+        job.update(
+            raw_answers=raw_answers,
+            cost=cost,
+            run=run,
+            route=route,
+            latency=time.perf_counter() - started,
         )
+        return job
 
-        # Aggregate the per-sample accuracy measurements and numeric errors.
-        all_accuracy_measurements.extend(sample_metrics["accuracy_measurements"])
-        all_numeric_errors.extend(sample_metrics["numeric_errors"])
+    def score(job):
+        # Parse the answers of each sample of the group and score them.
+        job["results"] = []
+        for (index, exact_answers, single_sample), member_raw_answers in zip(
+            job["members"], split_group_answers(job["group"], job["raw_answers"])
+        ):
+            processed_answers = parse_agent_output(member_raw_answers)
+            job["results"].append(
+                {
+                    "index": index,
+                    "exact_answers": exact_answers,
+                    "single_sample": single_sample,
+                    "raw_answers": member_raw_answers,
+                    "answers": processed_answers,
+                    "scores": accumulator.score(exact_answers, processed_answers),
+                }
+            )
+        return job
 
+    def judge(job):
         # --- LLM Judge Evaluation ---
         # For each (expected, candidate) answer pair, evaluate using the LLM judge.
-        sample_llm_scores = []
-        for expected, candidate in zip(exact_answers, processed_answers):
-            # Convert expected and candidate to string if needed
-            eval_result = evaluate_answer(
-                question=single_sample,
-                expected_answer=str(expected),
-                candidate_answer=str(candidate),
+        for result in job["results"]:
+            result["llm_scores"] = []
+            result["explanation"] = "No explanation provided"
+            for expected, candidate in zip(result["exact_answers"], result["answers"]):
+                # Convert expected and candidate to string if needed
+                eval_result = evaluate_answer(
+                    question=result["single_sample"],
+                    expected_answer=str(expected),
+                    candidate_answer=str(candidate),
+                )
+                result["llm_scores"].append(eval_result.get("score", 0))
+                result["explanation"] = eval_result.get(
+                    "explanation", "No explanation provided"
+                )
+        return job
+
+    # The stages run concurrently on consecutive groups (the judge of a sample overlaps the
+    # agent of the next one); the results are aggregated here in sample order.
+    workers = {**DEFAULT_STAGE_CONCURRENCY, **(stage_concurrency or {})}
+    stages = [
+        ("prep", prepare, workers["prep"]),
+        ("agent", answer, workers["agent"]),
+        ("score", score, workers["score"]),
+        ("judge", judge, workers["judge"]),
+    ]
+    for job in run_pipeline(enumerate(groups), stages, queue_size=queue_size):
+        for result in job["results"]:
+            sample_metrics = result["scores"]
+            # Add the sample and its judge scores to the run aggregate.
+            accumulator.add(sample_metrics)
+            accumulator.add_llm_scores(result["llm_scores"])
+            if job["route"] is not None:
+                # A grouped call is shared: each sample waited for it and pays its share.
+                route_records.setdefault(job["route"], []).append(
+                    (
+                        sample_metrics["accuracy_measurements"],
+                        job["latency"],
+                        (
+                            job["cost"] / len(job["members"])
+                            if job["cost"] is not None
+                            else None
+                        ),
+                    )
+                )
+            if job["solution"] is not None:
+                fast_path_records.append(sample_metrics["accuracy_measurements"])
+            accuracy_measurements.extend(sample_metrics["accuracy_measurements"])
+            sample_scores.append(
+                {
+                    "index": result["index"],
+                    "accuracy_measurements": sample_metrics["accuracy_measurements"],
+                    "numeric_errors": sample_metrics["numeric_errors"],
+                    "llm_scores": result["llm_scores"],
+                }
+            )
+            if progress_callback is not None:
+                progress_callback(accumulator.summary())
+            if predictions_path:
+                predictions.append(
+                    {
+                        "index": result["index"],
+                        "expected": result["exact_answers"],
+                        "output": job["run"]["output"],
+                        "raw_answers": result["raw_answers"],
+                        "answers": result["answers"],
+                        "intermediate_steps": job["run"]["intermediate_steps"],
+                        "llm_scores": result["llm_scores"],
+                    }
+                )
+
+            # Final message for the sample.
+            print(
+                f"Analysis completed for sample {result['index']} of {number_samples}...\n"
+                f"Exact answers: {result['exact_answers']}\n"
+                f"Predicted answers: {result['answers']}\n"
+                f"Sample Mean Accuracy: {sample_metrics['mean_accuracy']}, "
+                f"Sample MAE: {sample_metrics['mae']}, Sample MSE: {sample_metrics['mse']}\n"
+                f"LLM Scores: {result['llm_scores']}\n"
+                f"LLM Explanations: {result['explanation']}\n"
             )
-            score = eval_result.get("score", 0)
-            explanation = eval_result.get("explanation", "No explanation provided")
-            sample_llm_scores.append(score)
-            # print(
-            #     f"LLM Evaluation for sample {index + 1}: "
-            #     f"(Expected: {expected}, Candidate: {candidate}) => "
-            #     f"Score: {score}, Explanation: {explanation}"
-            # )
-        # Append current sample's LLM scores to the overall list.
-        all_llm_scores.extend(sample_llm_scores)
-
-        # Final message for the sample.
-        print(
-            f"Analysis completed for sample {index} of {number_samples}...\n"
-            f"Exact answers: {exact_answers}\n"
-            f"Predicted answers: {processed_answers}\n"
-            f"Sample Mean Accuracy: {sample_metrics['mean_accuracy']}, "
-            f"Sample MAE: {sample_metrics['mae']}, Sample MSE: {sample_metrics['mse']}\n"
-            f"LLM Scores: {sample_llm_scores}\n"
-            f"LLM Explanations: {explanation}\n"
-        )
 
-        sample += 1
+            sample += 1
 
-    # Compute overall mean accuracy from all sample measurements.
-    overall_mean_accuracy = (
-        (sum(all_accuracy_measurements) / len(all_accuracy_measurements))
-        if all_accuracy_measurements
-        else 0
+        # Adaptive mode: update the interval on the mean accuracy and stop once it is decided.
+        if adaptive:
+            low, high = wilson_interval(
+                accumulator.correct, accumulator.answers, confidence
+            )
+            stopping_trace.append(
+                {
+                    "samples": accumulator.samples,
+                    "mean_accuracy": accumulator.summary()["mean_accuracy"],
+                    "low": low,
+                    "high": high,
+                }
+            )
+            if accumulator.samples >= min_samples:
+                stop_reason = stopping_reason(
+                    (low, high), target_width, decision_threshold
+                )
+                if stop_reason is not None:
+                    print(
+                        f"Stopping after {accumulator.samples} samples ({stop_reason}): "
+                        f"accuracy interval [{low:.3f}, {high:.3f}]"
+                    )
+                    break
+
+    run_summary = accumulator.summary()
+    stopping = (
+        {
+            "reason": stop_reason,
+            "samples": accumulator.samples,
+            "trace": stopping_trace,
+        }
+        if adaptive
+        else None
     )
 
-    # Calculate the overall MAE and MSE for numeric answers across all samples.
-    if all_numeric_errors:
-        overall_mae = sum(all_numeric_errors) / len(all_numeric_errors)
-        overall_mse = sum(error**2 for error in all_numeric_errors) / len(
-            all_numeric_errors
+    if predictions_path:
+        save_predictions(
+            predictions_path,
+            predictions,
+            metadata={
+                "data_path": data_path,
+                "model": model,
+                "provider": provider,
+                "prompt_style": prompt_style,
+                "tolerance": tolerance,
+                "seed": seed,
+                "context_format": context_format,
+                "stopping": stopping,
+            },
         )
-    else:
-        overall_mae = None
-        overall_mse = None
 
-    # Compute overall LLM average score.
-    overall_llm_average_score = (
-        sum(all_llm_scores) / len(all_llm_scores) if all_llm_scores else 0
-    )
+    # Aggregate the agent instrumentation.
+    step_metrics_summary = step_metrics.summary()
+    if step_metrics_path:
+        step_metrics.to_jsonl(step_metrics_path)
 
     return {
-        "accuracy_measurements": all_accuracy_measurements,
-        "mean_accuracy": overall_mean_accuracy,
-        "mae": overall_mae,
-        "mse": overall_mse,
-        "llm_average_score": overall_llm_average_score,
+        "accuracy_measurements": accuracy_measurements,
+        "mean_accuracy": run_summary["mean_accuracy"],
+        "mae": run_summary["mae"],
+        "mse": run_summary["mse"],
+        "error_std": run_summary["error_std"],
+        "relative_error": run_summary["relative_error"],
+        "position_accuracy": run_summary["position_accuracy"],
+        "llm_average_score": run_summary["llm_average_score"],
+        "sample_scores": sample_scores,
+        "accumulator": accumulator.to_dict(),
+        "stopping": stopping,
+        "latency_p50": step_metrics_summary["latency_p50"],
+        "latency_p95": step_metrics_summary["latency_p95"],
+        "tokens_per_sample": step_metrics_summary["tokens_per_sample"],
+        "cost_usd": (
+            summarize_route(sum(route_records.values(), []))["cost_usd"]
+            if route_records
+            else step_metrics_summary["cost_usd"]
+        ),
+        "agent_step_metrics": step_metrics_summary,
+        "routes": (
+            {
+                route: summarize_route(records)
+                for route, records in route_records.items()
+            }
+            if cheap_model
+            else None
+        ),
+        "fast_path": (
+            summarize_fast_path(fast_path_records, sample) if fast_path else None
+        ),
     }
+
+
+def compare_tool_descriptions(
+    data_path,
+    model,
+    provider,
+    prompt_style,
+    modes=("verbose", "compact"),
+    **kwargs,
+):
+    """
+    A/B measurement of the tool-description modes: runs `measure_accuracy` on the same
+    samples (same seed) with each mode and compares prompt tokens, latency and accuracy.
+
+    Parameters:
+        data_path (str): Path to the JSON data file.
+        model (str): The model to use.
+        provider (str): The LLM provider.
+        prompt_style (str): A prompt style that renders the tools as text (see
+                            TOOL_DESCRIPTIONS).
+        modes (tuple): The two modes to compare; the first one is the baseline.
+        **kwargs: Other `measure_accuracy` arguments (number_samples, seed, ...).
+
+    Returns:
+        dict: For each mode, "mean_accuracy", "prompt_tokens_per_sample", "latency_p50",
+              "latency_p95", "iterations_per_sample" and "cost_usd"; "prompt_token_reduction"
+              (relative reduction of the second mode against the first, None without
+              tokens) and "accuracy_difference" (second minus first, paired by sample, see
+              `compare_results`; None if the samples cannot be paired).
+    """
+    runs = {
+        mode: measure_accuracy(
+            data_path,
+            model,
+            provider,
+            prompt_style,
+            tool_descriptions=mode,
+            **kwargs,
+        )
+        for mode in modes
+    }
+    results = {}
+    for mode, run in runs.items():
+        step_metrics = run["agent_step_metrics"]
+        results[mode] = {
+            "mean_accuracy": run["mean_accuracy"],
+            "prompt_tokens_per_sample": (
+                step_metrics["prompt_tokens"] / step_metrics["samples"]
+                if step_metrics["samples"]
+                else None
+            ),
+            "latency_p50": run["latency_p50"],
+            "latency_p95": run["latency_p95"],
+            "iterations_per_sample": step_metrics["iterations_per_sample"],
+            "cost_usd": run["cost_usd"],
+        }
+    baseline, candidate = (results[mode]["prompt_tokens_per_sample"] for mode in modes)
+    results["prompt_token_reduction"] = (
+        1 - candidate / baseline if baseline and candidate is not None else None
+    )
+    results["accuracy_difference"] = compare_results(runs[modes[1]], runs[modes[0]])
+    return results
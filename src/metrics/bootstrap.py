@@ -0,0 +1,314 @@
+import argparse
+import itertools
+import json
+import os
+import re
+
+import numpy as np
+
+DEFAULT_RESAMPLES = 10000
+
+
+def _scores_from_results(results):
+    # Per-sample (numerator, denominator) arrays of accuracy, absolute error and judge score.
+    samples = results.get("sample_scores")
+    if samples:
+        return {
+            "indices": [sample["index"] for sample in samples],
+            "accuracy": (
+                np.array([sum(s["accuracy_measurements"]) for s in samples], float),
+                np.array([len(s["accuracy_measurements"]) for s in samples], float),
+            ),
+            "mae": (
+                np.array([sum(s["numeric_errors"]) for s in samples], float),
+                np.array([len(s["numeric_errors"]) for s in samples], float),
+            ),
+            "llm_score": (
+                np.array([sum(s["llm_scores"]) for s in samples], float),
+                np.array([len(s["llm_scores"]) for s in samples], float),
+            ),
+        }
+    # Older results only list the 0/1 score of each answer: each answer is a unit and the
+    # error and judge metrics are point estimates.
+    measurements = np.array(results.get("accuracy_measurements", []), float)
+    return {
+        "indices": None,
+        "accuracy": (measurements, np.ones_like(measurements)),
+        "mae": None,
+        "llm_score": None,
+    }
+
+
+def load_results(paths):
+    """
+    Loads `measure_accuracy` results (e.g. the `results/metrics_*.json` files) as per-sample
+    score arrays.
+
+    Parameters:
+        paths (list or str): Result files, or a directory whose `metrics_*.json` files are read.
+
+    Returns:
+        dict: For each configuration (file name without "metrics_" and the run timestamp;
+              later runs of the same configuration keep their timestamp):
+              "indices" (dataset index of each sample, None for older results) and, for
+              "accuracy", "mae" and "llm_score", the per-sample (sum, count) arrays of the
+              measurements (None when the file has no per-sample values).
+    """
+    if isinstance(paths, str):
+        paths = sorted(
+            os.path.join(paths, name)
+            for name in os.listdir(paths)
+            if name.startswith("metrics_") and name.endswith(".json")
+        )
+    configurations = {}
+    for path in paths:
+        file_name = re.sub(
+            r"^metrics_", "", os.path.splitext(os.path.basename(path))[0]
+        )
+        name = re.sub(r"_\d{8}_\d{6}$", "", file_name)
+        if name in configurations:
+            # Another run of the same configuration: keep both, under their timestamps.
+            name = file_name if file_name not in configurations else path
+        with open(path) as file:
+            configurations[name] = _scores_from_results(json.load(file))
+    return configurations
+
+
+def _resample_indices(count, resamples, rng):
+    return rng.integers(0, count, size=(resamples, count))
+
+
+def bootstrap_ci(
+    numerators,
+    denominators=None,
+    resamples=DEFAULT_RESAMPLES,
+    confidence=0.95,
+    seed=0,
+):
+    """
+    Percentile bootstrap interval of a mean, or of a ratio of sums, computed for all the
+    resamples at once.
+
+    With denominators, the statistic is sum(numerators) / sum(denominators) over the resampled
+    units, e.g. correct answers over answers when whole samples are resampled.
+
+    Parameters:
+        numerators (array): One value per unit.
+        denominators (array): Optional weight of each unit.
+        resamples (int): Number of bootstrap resamples.
+        confidence (float): Confidence level of the interval.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        dict: "estimate", "low", "high" (None if there are no values) and "units".
+    """
+    numerators = np.asarray(numerators, float)
+    denominators = (
+        np.ones_like(numerators)
+        if denominators is None
+        else np.asarray(denominators, float)
+    )
+    if not denominators.sum():
+        return {"estimate": None, "low": None, "high": None, "units": len(numerators)}
+    rng = np.random.default_rng(seed)
+    indices = _resample_indices(len(numerators), resamples, rng)
+    totals = denominators[indices].sum(axis=1)
+    statistics = np.divide(
+        numerators[indices].sum(axis=1),
+        totals,
+        out=np.full(resamples, np.nan),
+        where=totals > 0,
+    )
+    alpha = (1 - confidence) / 2 * 100
+    low, high = np.nanpercentile(statistics, [alpha, 100 - alpha])
+    return {
+        "estimate": float(numerators.sum() / denominators.sum()),
+        "low": float(low),
+        "high": float(high),
+        "units": len(numerators),
+    }
+
+
+def paired_bootstrap(a, b, resamples=DEFAULT_RESAMPLES, confidence=0.95, seed=0):
+    """
+    Paired bootstrap of the mean difference a - b between two configurations scored on the
+    same samples.
+
+    Parameters:
+        a (array): Per-sample scores of the first configuration.
+        b (array): Per-sample scores of the second configuration, in the same sample order.
+        resamples (int): Number of bootstrap resamples.
+        confidence (float): Confidence level of the interval.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        dict: "difference", "low", "high" and "p_value" (two-sided: twice the share of
+              resampled differences on the other side of 0, at most 1).
+    """
+    differences = np.asarray(a, float) - np.asarray(b, float)
+    rng = np.random.default_rng(seed)
+    means = differences[_resample_indices(len(differences), resamples, rng)].mean(
+        axis=1
+    )
+    alpha = (1 - confidence) / 2 * 100
+    low, high = np.percentile(means, [alpha, 100 - alpha])
+    p_value = 2 * min((means <= 0).mean(), (means >= 0).mean())
+    return {
+        "difference": float(differences.mean()),
+        "low": float(low),
+        "high": float(high),
+        "p_value": float(min(1.0, p_value)),
+    }
+
+
+def permutation_test(a, b, resamples=DEFAULT_RESAMPLES, seed=0):
+    """
+    Paired permutation (sign-flip) test of the mean difference a - b: under the null
+    hypothesis the two configurations are exchangeable on every sample.
+
+    Returns:
+        float: The two-sided p-value.
+    """
+    differences = np.asarray(a, float) - np.asarray(b, float)
+    rng = np.random.default_rng(seed)
+    signs = rng.choice([-1.0, 1.0], size=(resamples, len(differences)))
+    statistics = (signs * differences).mean(axis=1)
+    observed = abs(differences.mean())
+    return float(((np.abs(statistics) >= observed - 1e-12).sum() + 1) / (resamples + 1))
+
+
+def _paired_accuracies(first, second):
+    # Per-sample accuracies of two configurations on their common samples, or None if the
+    # samples cannot be paired.
+    def accuracies(scores, keep=None):
+        sums, counts = scores["accuracy"]
+        values = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+        return values if keep is None else values[keep]
+
+    if first["indices"] is not None and second["indices"] is not None:
+        second_positions = {
+            index: position for position, index in enumerate(second["indices"])
+        }
+        common = [
+            (position, second_positions[index])
+            for position, index in enumerate(first["indices"])
+            if index in second_positions
+        ]
+        if not common:
+            return None
+        keep_first = [position for position, _ in common]
+        keep_second = [position for _, position in common]
+        return accuracies(first, keep_first), accuracies(second, keep_second)
+    # Older results: answers are paired by position, only if both runs have as many.
+    if len(first["accuracy"][0]) != len(second["accuracy"][0]):
+        return None
+    return accuracies(first), accuracies(second)
+
+
+def analyze_results(
+    configurations,
+    pairs=None,
+    resamples=DEFAULT_RESAMPLES,
+    confidence=0.95,
+    seed=0,
+):
+    """
+    Bootstrap intervals of each configuration and paired tests between configurations.
+
+    Parameters:
+        configurations (dict): As returned by `load_results`.
+        pairs (list): (name, name) pairs to compare. Default is every pair.
+        resamples (int): Number of resamples of the bootstrap and permutation tests.
+        confidence (float): Confidence level of the intervals.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        dict: "configurations" ({name: {"accuracy", "mae", "llm_score"}: `bootstrap_ci`
+              output, or None without per-sample values}) and "comparisons" (one dict per
+              pair with "a", "b", "samples", the `paired_bootstrap` fields and
+              "permutation_p_value", or "error" if the runs cannot be paired).
+    """
+    summary = {}
+    for name, scores in configurations.items():
+        summary[name] = {
+            metric: (
+                bootstrap_ci(*scores[metric], resamples, confidence, seed)
+                if scores[metric] is not None
+                else None
+            )
+            for metric in ("accuracy", "mae", "llm_score")
+        }
+
+    comparisons = []
+    for a, b in pairs or itertools.combinations(configurations, 2):
+        comparison = _compare(
+            configurations[a], configurations[b], resamples, confidence, seed
+        )
+        comparisons.append(
+            {"a": a, "b": b, **comparison}
+            if comparison is not None
+            else {"a": a, "b": b, "error": "The runs do not share paired samples."}
+        )
+    return {"configurations": summary, "comparisons": comparisons}
+
+
+def _compare(first, second, resamples, confidence, seed):
+    paired = _paired_accuracies(first, second)
+    if paired is None:
+        return None
+    return {
+        "samples": len(paired[0]),
+        **paired_bootstrap(*paired, resamples, confidence, seed),
+        "permutation_p_value": permutation_test(*paired, resamples, seed),
+    }
+
+
+def compare_results(
+    results_a,
+    results_b,
+    resamples=DEFAULT_RESAMPLES,
+    confidence=0.95,
+    seed=0,
+):
+    """
+    Paired comparison of the sample accuracy of two `measure_accuracy` results (a - b).
+
+    Returns:
+        dict or None: "samples", the `paired_bootstrap` fields and "permutation_p_value";
+                      None if the runs do not share paired samples.
+    """
+    return _compare(
+        _scores_from_results(results_a),
+        _scores_from_results(results_b),
+        resamples,
+        confidence,
+        seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Bootstrap confidence intervals and paired tests over evaluation results."
+    )
+    parser.add_argument("--results", type=str, nargs="+", default=["results"])
+    parser.add_argument("--compare", type=str, nargs=2, action="append", default=None)
+    parser.add_argument("--resamples", type=int, default=DEFAULT_RESAMPLES)
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    paths = args.results[0] if len(args.results) == 1 else args.results
+    if isinstance(paths, str) and not os.path.isdir(paths):
+        paths = [paths]
+    results = analyze_results(
+        load_results(paths),
+        pairs=args.compare,
+        resamples=args.resamples,
+        confidence=args.confidence,
+        seed=args.seed,
+    )
+    print(json.dumps(results, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,233 @@
+import re
+
+import numpy as np
+
+
+def split_agent_output(output):
+    """
+    Splits the final answer of an agent into its raw answers, before normalization.
+
+    Parameters:
+        output (str or list): The "output" of the agent response. Anthropic models may return
+                              a list of content blocks.
+
+    Returns:
+        list: The raw answer strings.
+    """
+    if isinstance(output, str):
+        return output.split(",")
+    if isinstance(output, list):
+        return [
+            raw_answer.get("text", "") if isinstance(raw_answer, dict) else raw_answer
+            for raw_answer in output
+        ]
+    return []
+
+
+def normalize_answer(raw_answer):
+    """
+    Normalizes one raw answer: numbers are rounded to 4 decimals, other answers are lowercased
+    strings without spaces or surrounding brackets. A missing answer (None) stays None.
+    """
+    if raw_answer is None:
+        return None
+    # Normalize the answer: strip, lower, and remove spaces.
+    answer = str(raw_answer).strip().lower().replace(" ", "")
+    # Remove any surrounding parentheses, brackets, or braces using regex.
+    answer = re.sub(r"^[\(\[\{](.*?)[\)\]\}]$", r"\1", answer).strip()
+    try:
+        return round(float(answer), 4)
+    except ValueError:
+        return answer
+
+
+def parse_agent_output(output):
+    """
+    Splits the final answer of an agent into normalized answers: numbers are rounded to
+    4 decimals, other answers are lowercased strings without spaces or surrounding brackets.
+
+    Parameters:
+        output (str or list): The "output" of the agent response. Anthropic models may return
+                              a list of content blocks.
+
+    Returns:
+        list: The answers, comparable with the output of `get_exact_answers`.
+    """
+    return [normalize_answer(raw_answer) for raw_answer in split_agent_output(output)]
+
+
+def _as_number(answer):
+    try:
+        return float(answer)
+    except (ValueError, TypeError):
+        return None
+
+
+def answer_arrays(expected_answers, actual_answers):
+    """
+    Packs the answers of a whole run into padded arrays for `score_answer_arrays`.
+
+    Each row is a sample and each column an answer position; rows shorter than the longest
+    sample are padded. Answers are converted once: a pair is numeric when both answers can be
+    read as floats (as in `compute_single_sample_accuracy`), otherwise it is compared as
+    strings.
+
+    Parameters:
+        expected_answers (list of list): The expected answers of each sample.
+        actual_answers (list of list): The predicted answers of each sample.
+
+    Returns:
+        dict: "expected" and "actual" (float arrays, NaN where not numeric), "expected_text"
+              and "actual_text" (object arrays of str), "scored" (positions inside the longer
+              of the two answer lists of the sample), "paired" (positions with both answers)
+              and "numeric" (paired positions where both answers are numbers).
+    """
+    rows = len(expected_answers)
+    columns = max(
+        [max(len(e), len(a)) for e, a in zip(expected_answers, actual_answers)] or [0]
+    )
+    arrays = {
+        "expected": np.full((rows, columns), np.nan),
+        "actual": np.full((rows, columns), np.nan),
+        "expected_text": np.full((rows, columns), "", dtype=object),
+        "actual_text": np.full((rows, columns), "", dtype=object),
+        "scored": np.zeros((rows, columns), dtype=bool),
+        "paired": np.zeros((rows, columns), dtype=bool),
+        "numeric": np.zeros((rows, columns), dtype=bool),
+    }
+    for row, (expected, actual) in enumerate(zip(expected_answers, actual_answers)):
+        arrays["scored"][row, : max(len(expected), len(actual))] = True
+        for column, (exp, act) in enumerate(zip(expected, actual)):
+            arrays["paired"][row, column] = True
+            exp_num, act_num = _as_number(exp), _as_number(act)
+            if exp_num is not None and act_num is not None:
+                arrays["numeric"][row, column] = True
+                arrays["expected"][row, column] = exp_num
+                arrays["actual"][row, column] = act_num
+            else:
+                arrays["expected_text"][row, column] = str(exp)
+                arrays["actual_text"][row, column] = str(act)
+    return arrays
+
+
+def score_answer_arrays(arrays, tolerance=0.005):
+    """
+    Scores the answers of a whole run in one pass (see `answer_arrays`).
+
+    Parameters:
+        arrays (dict): The padded arrays returned by `answer_arrays`.
+        tolerance (float): The allowed tolerance for numeric comparisons.
+
+    Returns:
+        dict: A dictionary containing:
+          - "accuracy_measurements": list of 0/1 scores of every scored answer, sample by sample.
+          - "sample_accuracy": mean accuracy of each sample (0 for a sample without answers).
+          - "mean_accuracy": average accuracy over all comparisons (0 if none).
+          - "mae", "mse": mean absolute and squared error of the numeric answers (None if none).
+          - "numeric_errors": absolute errors of the numeric answers, sample by sample.
+          - "relative_error": mean of |error| / |expected| over the numeric answers with a
+            non-zero expected value (None if none).
+          - "position_accuracy": mean accuracy at each answer position (first answer, second
+            answer, ...) over the samples that have it.
+    """
+    scored, numeric = arrays["scored"], arrays["numeric"]
+    errors = np.where(numeric, np.abs(arrays["expected"] - arrays["actual"]), 0.0)
+    text_match = (
+        arrays["paired"] & ~numeric & (arrays["expected_text"] == arrays["actual_text"])
+    )
+    correct = (numeric & (errors <= tolerance)) | text_match
+
+    scores = np.where(scored, correct.astype(int), 0)
+    counts = scored.sum(axis=1)
+    numeric_errors = errors[numeric]
+    expected = np.abs(arrays["expected"][numeric])
+    nonzero = expected != 0
+    position_counts = scored.sum(axis=0)
+    return {
+        "accuracy_measurements": scores[scored].tolist(),
+        "sample_accuracy": np.divide(
+            scores.sum(axis=1), counts, out=np.zeros(len(counts)), where=counts > 0
+        ).tolist(),
+        "mean_accuracy": scores[scored].mean().item() if scored.any() else 0,
+        "mae": numeric_errors.mean().item() if numeric_errors.size else None,
+        "mse": (numeric_errors**2).mean().item() if numeric_errors.size else None,
+        "numeric_errors": numeric_errors.tolist(),
+        "relative_error": (
+            (numeric_errors[nonzero] / expected[nonzero]).mean().item()
+            if nonzero.any()
+            else None
+        ),
+        "position_accuracy": (
+            scores.sum(axis=0) / np.maximum(position_counts, 1)
+        ).tolist(),
+    }
+
+
+def tolerance_sweep(arrays, tolerances, mode="absolute"):
+    """
+    Recomputes the accuracy of a run for many tolerances at once (see `answer_arrays`).
+
+    Parameters:
+        arrays (dict): The padded arrays returned by `answer_arrays`.
+        tolerances (list of float): The tolerances to evaluate.
+        mode (str): "absolute" compares |expected - predicted| with the tolerance, "relative"
+                    compares |expected - predicted| / |expected| (an exact answer to an
+                    expected 0 is correct, any other is not).
+
+    Returns:
+        list: One dict per tolerance with "tolerance", "mode" and "mean_accuracy".
+
+    Raises:
+        ValueError: If the mode is unknown.
+    """
+    scored, numeric = arrays["scored"], arrays["numeric"]
+    errors = np.where(numeric, np.abs(arrays["expected"] - arrays["actual"]), 0.0)
+    if mode == "relative":
+        expected = np.abs(np.where(numeric, arrays["expected"], 1.0))
+        errors = np.divide(
+            errors,
+            expected,
+            out=np.where(errors == 0, 0.0, np.inf),
+            where=expected != 0,
+        )
+    elif mode != "absolute":
+        raise ValueError(f"Unknown tolerance mode: {mode}")
+    text_match = (
+        arrays["paired"] & ~numeric & (arrays["expected_text"] == arrays["actual_text"])
+    )
+
+    tolerances = np.asarray(tolerances, dtype=float)
+    # (tolerances, samples, positions): every tolerance is scored in the same operation.
+    correct = (numeric & (errors <= tolerances[:, None, None])) | text_match
+    total = scored.sum()
+    accuracies = (
+        (correct & scored).sum(axis=(1, 2)) / total
+        if total
+        else np.zeros(len(tolerances))
+    )
+    return [
+        {"tolerance": tolerance, "mode": mode, "mean_accuracy": accuracy}
+        for tolerance, accuracy in zip(tolerances.tolist(), accuracies.tolist())
+    ]
+
+
+def score_answers(expected_answers, actual_answers, tolerance=0.005):
+    """
+    Scores the answers of a whole run: `answer_arrays` followed by `score_answer_arrays`.
+
+    Parameters:
+        expected_answers (list of list): The expected answers of each sample.
+        actual_answers (list of list): The predicted answers of each sample.
+        tolerance (float): The allowed tolerance for numeric comparisons.
+
+    Returns:
+        dict: See `score_answer_arrays`.
+    """
+    return score_answer_arrays(
+        answer_arrays(expected_answers, actual_answers), tolerance
+    )
+
+
 def compute_single_sample_accuracy(expected_answers, actual_answers, tolerance=0.005):
     """
     Compare the expected and actual answers for a single sample and compute accuracy metrics.
@@ -23,46 +253,14 @@ def compute_single_sample_accuracy(expected_answers, actual_answers, tolerance=0
           - "mse": mean squared error for numeric answers (None if no numeric comparisons).
           - "numeric_errors": list of numeric errors for the numeric comparisons (empty if none).
     """
-
-    accuracy_measurements = []
-    numeric_errors = []
-
-    max_len = max(len(expected_answers), len(actual_answers))
-    for i in range(max_len):
-        if i >= len(expected_answers) or i >= len(actual_answers):
-            accuracy_measurements.append(0)
-        else:
-            exp = expected_answers[i]
-            act = actual_answers[i]
-
-            # Attempt numeric comparison.
-            try:
-                exp_num = float(exp)
-                act_num = float(act)
-                error = abs(exp_num - act_num)
-                numeric_errors.append(error)
-                accuracy_measurements.append(1 if error <= tolerance else 0)
-            except (ValueError, TypeError):
-                # Fall back to string comparison if numeric conversion fails.
-                accuracy_measurements.append(1 if str(exp) == str(act) else 0)
-
-    mean_accuracy = (
-        sum(accuracy_measurements) / len(accuracy_measurements)
-        if accuracy_measurements
-        else 0
-    )
-
-    if numeric_errors:
-        mae = sum(numeric_errors) / len(numeric_errors)
-        mse = sum(error**2 for error in numeric_errors) / len(numeric_errors)
-    else:
-        mae = None
-        mse = None
-
+    scores = score_answers([expected_answers], [actual_answers], tolerance)
     return {
-        "accuracy_measurements": accuracy_measurements,
-        "mean_accuracy": mean_accuracy,
-        "mae": mae,
-        "mse": mse,
-        "numeric_errors": numeric_errors,
+        key: scores[key]
+        for key in (
+            "accuracy_measurements",
+            "mean_accuracy",
+            "mae",
+            "mse",
+            "numeric_errors",
+        )
     }
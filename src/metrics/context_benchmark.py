@@ -0,0 +1,93 @@
+import argparse
+import json
+import random
+import time
+
+from src.utils import (
+    extract_selected_threads_processed,
+    get_exact_answers,
+    open_json_file,
+)
+from src.utils.context_serializer import CONTEXT_FORMATS, serialize_context
+from src.utils.tokenizers import get_token_counter
+
+DEFAULT_TOKENIZERS = [
+    ("openai", "gpt-4o"),
+    ("anthropic", "claude-3-5-sonnet-20241022"),
+    ("google", "gemini-2.0-flash"),
+]
+
+
+def benchmark_context_formats(
+    samples,
+    formats=CONTEXT_FORMATS,
+    tokenizers=DEFAULT_TOKENIZERS,
+):
+    """
+    Measures the prompt size of each context format with the provider tokenizers.
+
+    Parameters:
+        samples (list): Processed samples (as returned by `get_exact_answers`).
+        formats (tuple): The context formats to compare. "repr" is the baseline.
+        tokenizers (list): (provider, model) pairs used to count tokens.
+
+    Returns:
+        dict: For each "provider/model", a dictionary mapping each format to:
+              - "mean_tokens": mean number of tokens per sample.
+              - "reduction": relative token reduction against the "repr" format.
+              - "exact": whether a real tokenizer (not an approximation) was used.
+              - "serialize_ms": mean time to serialize one sample, in milliseconds.
+    """
+    rendered = {}
+    serialize_ms = {}
+    for context_format in formats:
+        start = time.perf_counter()
+        rendered[context_format] = [
+            serialize_context(sample, context_format) for sample in samples
+        ]
+        serialize_ms[context_format] = (
+            (time.perf_counter() - start) * 1000 / max(len(samples), 1)
+        )
+
+    results = {}
+    for provider, model in tokenizers:
+        count_tokens = get_token_counter(provider, model)
+        mean_tokens = {
+            context_format: sum(count_tokens(text) for text in texts)
+            / max(len(texts), 1)
+            for context_format, texts in rendered.items()
+        }
+        baseline = mean_tokens.get("repr")
+        results[f"{provider}/{model}"] = {
+            context_format: {
+                "mean_tokens": tokens,
+                "reduction": (1 - tokens / baseline) if baseline else None,
+                "exact": count_tokens.exact,
+                "serialize_ms": serialize_ms[context_format],
+            }
+            for context_format, tokens in mean_tokens.items()
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the token size of the prompt context formats."
+    )
+    parser.add_argument("--data_path", type=str, required=True)
+    parser.add_argument("--number_samples", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    data = open_json_file(args.data_path)
+    random.seed(args.seed)
+    indices = random.sample(range(len(data)), min(args.number_samples, len(data)))
+    data_processed = extract_selected_threads_processed(data, indices)
+    samples = [get_exact_answers(sample)[1] for sample in data_processed]
+
+    results = benchmark_context_formats(samples)
+    print(json.dumps(results, indent=4))
+
+
+if __name__ == "__main__":
+    main()
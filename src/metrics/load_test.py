@@ -0,0 +1,115 @@
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+
+import numpy as np
+
+
+async def post_json(host, port, path, payload):
+    """
+    Sends one POST request with a JSON body on a new connection.
+
+    Returns:
+        tuple: (status, decoded JSON body)
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    body = json.dumps(payload).encode()
+    writer.write(
+        (
+            f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+        ).encode()
+        + body
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, response_body = response.partition(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    return status, json.loads(response_body or b"null")
+
+
+async def run_load_test(
+    host="127.0.0.1",
+    port=8000,
+    requests=200,
+    concurrency=16,
+    path="/answer",
+    payload=None,
+):
+    """
+    Sends `requests` POST requests to the agent HTTP server, `concurrency` at a time.
+
+    Parameters:
+        host (str): Server host.
+        port (int): Server port.
+        requests (int): Total number of requests.
+        concurrency (int): Number of requests in flight at the same time.
+        path (str): Endpoint to call. Default is "/answer".
+        payload (dict): JSON body of each request.
+
+    Returns:
+        dict: "requests", "elapsed_seconds", "requests_per_second", "status_counts" and
+              latency percentiles ("latency_p50", "latency_p95", "latency_p99") of the
+              successful requests.
+    """
+    payload = payload or {"input": "What is 2 + 2?"}
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    statuses = Counter()
+
+    async def one_request():
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                status, _ = await post_json(host, port, path, payload)
+            except (OSError, ValueError):
+                status = "connection_error"
+            statuses[status] += 1
+            if status == 200:
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_request() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    percentiles = {
+        f"latency_p{q}": (float(np.percentile(latencies, q)) if latencies else None)
+        for q in (50, 95, 99)
+    }
+    return {
+        "requests": requests,
+        "elapsed_seconds": elapsed,
+        "requests_per_second": requests / elapsed if elapsed > 0 else 0.0,
+        "status_counts": {str(status): count for status, count in statuses.items()},
+        **percentiles,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load test the agent HTTP server (start it with `python -m src.server --stub`)."
+    )
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--input", type=str, default="What is 2 + 2?")
+    args = parser.parse_args()
+
+    results = asyncio.run(
+        run_load_test(
+            host=args.host,
+            port=args.port,
+            requests=args.requests,
+            concurrency=args.concurrency,
+            payload={"input": args.input},
+        )
+    )
+    print(json.dumps(results, indent=4))
+
+
+if __name__ == "__main__":
+    main()
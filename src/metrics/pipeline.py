@@ -0,0 +1,131 @@
+import heapq
+import queue
+import threading
+
+# Marks the end of the input of a stage.
+_DONE = object()
+
+
+class _Failure:
+    # An exception raised by a stage, passed on to the consumer.
+    def __init__(self, error):
+        self.error = error
+
+
+def run_pipeline(items, stages, queue_size=2, max_in_flight=None):
+    """
+    Runs items through producer/consumer stages connected by bounded queues.
+
+    Each stage has its own worker threads, so different items are in different stages at the
+    same time: while the agent of an evaluation answers item N + 1, the judge scores item N.
+    The results are yielded in input order.
+
+    Stopping the iteration early (e.g. `break`) stops feeding new items; the items already in
+    flight are finished and dropped before the generator returns.
+
+    Parameters:
+        items (iterable): The input items, read lazily by a feeder thread.
+        stages (list): (name, function, workers) tuples, in order. Each function takes the
+                       output of the previous stage (or an input item) and returns its own
+                       output; it is called by `workers` threads at the same time.
+        queue_size (int): Capacity of the queue in front of each stage.
+        max_in_flight (int): Maximum number of items between the feeder and the consumer,
+                             which bounds the memory of out-of-order results. Default is the
+                             number of workers plus the queue capacities.
+
+    Yields:
+        The output of the last stage for each item, in input order.
+
+    Raises:
+        Exception: The first exception raised by the item iterator or a stage.
+    """
+    if max_in_flight is None:
+        max_in_flight = sum(workers for _, _, workers in stages) + queue_size * (
+            len(stages) + 1
+        )
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+    output = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    slots = threading.Semaphore(max_in_flight)
+
+    def feed():
+        try:
+            for position, item in enumerate(items):
+                while not slots.acquire(timeout=0.1):
+                    if stop.is_set():
+                        break
+                if stop.is_set():
+                    break
+                queues[0].put((position, item))
+        except Exception as error:
+            output.put(_Failure(error))
+        for _ in range(stages[0][2]):
+            queues[0].put(_DONE)
+
+    def work(stage, function, state):
+        source = queues[stage]
+        target = queues[stage + 1] if stage + 1 < len(stages) else output
+        while True:
+            entry = source.get()
+            if entry is _DONE:
+                break
+            position, value = entry
+            if stop.is_set():
+                # Drop the item but keep its slot accounting with the consumer.
+                target.put((position, None))
+                continue
+            try:
+                target.put((position, function(value)))
+            except Exception as error:
+                stop.set()
+                output.put(_Failure(error))
+                target.put((position, None))
+        # The last worker of a stage closes the input of the next one.
+        with state["lock"]:
+            state["running"] -= 1
+            last = state["running"] == 0
+        if last:
+            for _ in range(stages[stage + 1][2] if stage + 1 < len(stages) else 1):
+                target.put(_DONE)
+
+    threads = [threading.Thread(target=feed, daemon=True, name="pipeline-feed")]
+    for stage, (name, function, workers) in enumerate(stages):
+        state = {"lock": threading.Lock(), "running": workers}
+        threads.extend(
+            threading.Thread(
+                target=work,
+                args=(stage, function, state),
+                daemon=True,
+                name=f"pipeline-{name}-{worker}",
+            )
+            for worker in range(workers)
+        )
+    for thread in threads:
+        thread.start()
+
+    ready = []  # min-heap of (position, result) waiting for their turn
+    next_position = 0
+    entry = None
+    try:
+        while True:
+            entry = output.get()
+            if entry is _DONE:
+                break
+            if isinstance(entry, _Failure):
+                raise entry.error
+            heapq.heappush(ready, entry)
+            while ready and ready[0][0] == next_position:
+                _, result = heapq.heappop(ready)
+                slots.release()
+                next_position += 1
+                if not stop.is_set():
+                    yield result
+    finally:
+        stop.set()
+        # Drain the last queue so that the workers blocked on it can finish.
+        while entry is not _DONE:
+            entry = output.get()
+            if entry is not _DONE and not isinstance(entry, _Failure):
+                slots.release()
+        for thread in threads:
+            thread.join()
@@ -0,0 +1,190 @@
+import argparse
+import gzip
+import json
+
+from src.metrics.compute_metrics import (
+    answer_arrays,
+    parse_agent_output,
+    score_answer_arrays,
+    tolerance_sweep,
+)
+
+# Columns of a prediction file, one value per evaluated sample.
+PREDICTION_COLUMNS = (
+    "index",
+    "expected",
+    "output",
+    "raw_answers",
+    "answers",
+    "intermediate_steps",
+    "llm_scores",
+)
+PREDICTION_FORMAT_VERSION = 1
+
+
+def serialize_steps(intermediate_steps):
+    """
+    Converts the (AgentAction, observation) pairs of an agent response to JSON-safe dicts.
+    """
+    steps = []
+    for step in intermediate_steps or []:
+        action, observation = step if isinstance(step, (list, tuple)) else (step, None)
+        steps.append(
+            {
+                "tool": getattr(action, "tool", None),
+                "tool_input": getattr(action, "tool_input", None),
+                "log": getattr(action, "log", None),
+                "observation": None if observation is None else str(observation),
+            }
+        )
+    return steps
+
+
+def save_predictions(path, records, metadata=None):
+    """
+    Writes the predictions of an evaluation run as a gzip-compressed columnar JSON file.
+
+    The file holds one list per column (see PREDICTION_COLUMNS) instead of one object per
+    sample, so the keys are stored once and the columns compress well.
+
+    Parameters:
+        path (str): The output file, e.g. "results/predictions_gpt-4o.json.gz".
+        records (list): One dict per sample with the PREDICTION_COLUMNS keys (missing keys are
+                        stored as None).
+        metadata (dict): Run parameters stored with the predictions (model, prompt style,
+                         tolerance, ...).
+    """
+    payload = {
+        "version": PREDICTION_FORMAT_VERSION,
+        "metadata": metadata or {},
+        "columns": {
+            column: [record.get(column) for record in records]
+            for column in PREDICTION_COLUMNS
+        },
+    }
+    with gzip.open(path, "wt", encoding="utf-8") as file:
+        json.dump(payload, file, default=str)
+
+
+def load_predictions(path):
+    """
+    Reads a prediction file written by `save_predictions`.
+
+    Parameters:
+        path (str): The prediction file.
+
+    Returns:
+        tuple: (records, metadata) where records is one dict per sample.
+
+    Raises:
+        ValueError: If the file has an unsupported format version.
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        payload = json.load(file)
+    if payload.get("version") != PREDICTION_FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported prediction file version: {payload.get('version')}"
+        )
+    columns = payload["columns"]
+    count = len(columns["index"])
+    records = [
+        {
+            column: columns.get(column, [None] * count)[i]
+            for column in PREDICTION_COLUMNS
+        }
+        for i in range(count)
+    ]
+    return records, payload.get("metadata", {})
+
+
+def rescore(
+    path,
+    tolerance=None,
+    tolerances=None,
+    modes=("absolute",),
+    reparse=True,
+):
+    """
+    Recomputes the metrics of an evaluation run from its stored predictions, without calling
+    any model.
+
+    Parameters:
+        path (str): The prediction file written by `measure_accuracy(..., predictions_path=...)`.
+        tolerance (float): Tolerance of the main metrics. Default is the tolerance of the run.
+        tolerances (list of float): Optional tolerances to sweep.
+        modes (tuple): Tolerance modes of the sweep: "absolute" and/or "relative".
+        reparse (bool): If True (default), the stored raw answers are normalized again with the
+                        current `parse_agent_output`, so that normalization changes apply;
+                        otherwise the stored parsed answers are scored.
+
+    Returns:
+        dict: "samples", "tolerance", "mean_accuracy", "mae", "mse", "relative_error",
+              "position_accuracy", "llm_average_score" (of the stored judge scores, None if
+              none) and "sweep" ({mode: [{"tolerance", "mode", "mean_accuracy"}, ...]}, empty
+              without `tolerances`).
+    """
+    records, metadata = load_predictions(path)
+    if tolerance is None:
+        tolerance = metadata.get("tolerance", 0.005)
+    predicted = [
+        (
+            parse_agent_output(record["raw_answers"] or [])
+            if reparse
+            else record["answers"] or []
+        )
+        for record in records
+    ]
+    arrays = answer_arrays([record["expected"] or [] for record in records], predicted)
+    scores = score_answer_arrays(arrays, tolerance)
+    llm_scores = [score for record in records for score in record["llm_scores"] or []]
+    return {
+        "samples": len(records),
+        "tolerance": tolerance,
+        "mean_accuracy": scores["mean_accuracy"],
+        "mae": scores["mae"],
+        "mse": scores["mse"],
+        "relative_error": scores["relative_error"],
+        "position_accuracy": scores["position_accuracy"],
+        "llm_average_score": (
+            sum(llm_scores) / len(llm_scores) if llm_scores else None
+        ),
+        "sweep": (
+            {mode: tolerance_sweep(arrays, tolerances, mode) for mode in modes}
+            if tolerances
+            else {}
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Recompute the metrics of an evaluation run from its stored predictions."
+    )
+    parser.add_argument("--predictions", type=str, required=True)
+    parser.add_argument("--tolerance", type=float, default=None)
+    parser.add_argument("--tolerances", type=float, nargs="+", default=None)
+    parser.add_argument(
+        "--modes",
+        choices=["absolute", "relative"],
+        nargs="+",
+        default=["absolute"],
+    )
+    parser.add_argument(
+        "--no_reparse",
+        action="store_true",
+        help="Score the stored parsed answers instead of normalizing the raw answers again",
+    )
+    args = parser.parse_args()
+
+    results = rescore(
+        args.predictions,
+        tolerance=args.tolerance,
+        tolerances=args.tolerances,
+        modes=args.modes,
+        reparse=not args.no_reparse,
+    )
+    print(json.dumps(results, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+import argparse
+import json
+import random
+from statistics import NormalDist
+
+from src.agent import (
+    agent_executor_builder,
+    build_task_input,
+    invoke_with_deadline,
+    tools,
+)
+from src.metrics.accumulators import RunningMean
+from src.metrics.compute_metrics import (
+    compute_single_sample_accuracy,
+    parse_agent_output,
+)
+from src.utils import (
+    extract_selected_threads_processed,
+    get_exact_answers,
+    open_json_file,
+    serialize_context,
+)
+
+
+def _z(confidence):
+    return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+
+def wilson_interval(successes, trials, confidence=0.95):
+    """
+    Wilson score interval of a proportion (e.g. the share of correct answers).
+
+    Unlike the normal approximation it stays inside [0, 1] and is usable with few trials or
+    with proportions close to 0 or 1.
+
+    Parameters:
+        successes (int): Number of successes.
+        trials (int): Number of trials.
+        confidence (float): Confidence level of the interval.
+
+    Returns:
+        tuple: (low, high); (0.0, 1.0) without trials.
+    """
+    if trials == 0:
+        return 0.0, 1.0
+    z = _z(confidence)
+    p = successes / trials
+    denominator = 1 + z**2 / trials
+    center = (p + z**2 / (2 * trials)) / denominator
+    margin = z * ((p * (1 - p) / trials + z**2 / (4 * trials**2)) ** 0.5) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+def mean_interval(running_mean, confidence=0.95):
+    """
+    Normal-approximation interval of the mean of a stream (see `RunningMean`), e.g. the mean
+    paired difference of accuracy between two configurations.
+
+    Returns:
+        tuple: (low, high); None with fewer than two values.
+    """
+    if running_mean.variance is None:
+        return None
+    margin = _z(confidence) * (running_mean.variance / running_mean.count) ** 0.5
+    return running_mean.mean - margin, running_mean.mean + margin
+
+
+def stopping_reason(interval, target_width=None, decision_threshold=None):
+    """
+    Decides whether a sequential run can stop.
+
+    Parameters:
+        interval (tuple): The current (low, high) interval, or None if not available yet.
+        target_width (float): Stop once the interval is at most this wide.
+        decision_threshold (float): Stop once the whole interval is above or below this value
+                                    (e.g. a minimum accuracy, or 0 for a paired difference).
+
+    Returns:
+        str or None: "target_width", "above_threshold", "below_threshold", or None to continue.
+    """
+    if interval is None:
+        return None
+    low, high = interval
+    if decision_threshold is not None:
+        if low > decision_threshold:
+            return "above_threshold"
+        if high < decision_threshold:
+            return "below_threshold"
+    if target_width is not None and high - low <= target_width:
+        return "target_width"
+    return None
+
+
+def sample_scorer(
+    model,
+    provider,
+    prompt_style,
+    tolerance=0.005,
+    context_format="pipe",
+    timeout=None,
+    request_timeout=None,
+):
+    """
+    Builds one agent executor for a configuration and returns a function that answers a
+    sample with it and returns the sample accuracy.
+
+    Returns:
+        callable: (exact_answers, sample) -> mean accuracy of the sample.
+    """
+    agent_executor, _ = agent_executor_builder(
+        model=model,
+        provider=provider,
+        temperature=0,
+        tools=tools,
+        prompt_style=prompt_style,
+        verbose=False,
+        max_execution_time=timeout,
+        request_timeout=request_timeout,
+    )
+
+    def score(exact_answers, sample):
+        response = invoke_with_deadline(
+            agent_executor,
+            {"input": build_task_input(serialize_context(sample, context_format))},
+            timeout=timeout,
+        )
+        return compute_single_sample_accuracy(
+            expected_answers=exact_answers,
+            actual_answers=parse_agent_output(response.get("output")),
+            tolerance=tolerance,
+        )["mean_accuracy"]
+
+    return score
+
+
+def compare_sequentially(
+    samples,
+    score_a,
+    score_b,
+    confidence=0.95,
+    target_width=None,
+    min_samples=10,
+):
+    """
+    Compares two configurations on the same samples, one sample at a time, and stops as soon
+    as the interval on the mean paired difference of accuracy (a - b) excludes 0 (one
+    configuration is better) or is narrower than `target_width` (no difference that matters).
+
+    Parameters:
+        samples (iterable): (exact_answers, sample) pairs, in evaluation order.
+        score_a (callable): Returns the accuracy of configuration a on a sample (see
+                            `sample_scorer`).
+        score_b (callable): The same for configuration b.
+        confidence (float): Confidence level of the interval.
+        target_width (float): Optional width at which the run stops without a winner.
+        min_samples (int): Number of samples evaluated before the run may stop.
+
+    Returns:
+        dict: "decision" ("a", "b", "no_difference" or None if the samples ran out),
+              "reason", "samples", "accuracy_a", "accuracy_b", "difference", "interval" and
+              "trace" (one entry per sample with "samples", "difference", "low" and "high").
+    """
+    differences = RunningMean()
+    accuracy_a = RunningMean()
+    accuracy_b = RunningMean()
+    trace = []
+    reason = None
+    for exact_answers, sample in samples:
+        a = score_a(exact_answers, sample)
+        b = score_b(exact_answers, sample)
+        accuracy_a.add(a)
+        accuracy_b.add(b)
+        differences.add(a - b)
+
+        interval = mean_interval(differences, confidence)
+        trace.append(
+            {
+                "samples": differences.count,
+                "difference": differences.mean,
+                "low": interval[0] if interval else None,
+                "high": interval[1] if interval else None,
+            }
+        )
+        if differences.count >= min_samples:
+            reason = stopping_reason(interval, target_width, decision_threshold=0.0)
+            if reason is not None:
+                break
+
+    decision = {
+        "above_threshold": "a",
+        "below_threshold": "b",
+        "target_width": "no_difference",
+    }.get(reason)
+    return {
+        "decision": decision,
+        "reason": reason,
+        "samples": differences.count,
+        "accuracy_a": accuracy_a.mean if accuracy_a.count else None,
+        "accuracy_b": accuracy_b.mean if accuracy_b.count else None,
+        "difference": differences.mean if differences.count else None,
+        "interval": mean_interval(differences, confidence),
+        "trace": trace,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare two prompt styles sample by sample and stop once they separate."
+    )
+    parser.add_argument("--data_path", type=str, required=True)
+    parser.add_argument("--model", type=str, default="gpt-4o")
+    parser.add_argument("--provider", type=str, default="openai")
+    parser.add_argument("--style_a", type=str, default="react")
+    parser.add_argument("--style_b", type=str, default="tools-agent")
+    parser.add_argument("--max_samples", type=int, default=500)
+    parser.add_argument("--min_samples", type=int, default=10)
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--target_width", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=None)
+    parser.add_argument("--output", type=str, default=None)
+    args = parser.parse_args()
+
+    data = open_json_file(args.data_path)
+    random.seed(args.seed)
+    indices = random.sample(range(len(data)), min(args.max_samples, len(data)))
+    samples = (
+        get_exact_answers(sample)
+        for sample in extract_selected_threads_processed(data, indices)
+    )
+
+    results = compare_sequentially(
+        samples,
+        sample_scorer(args.model, args.provider, args.style_a, timeout=args.timeout),
+        sample_scorer(args.model, args.provider, args.style_b, timeout=args.timeout),
+        confidence=args.confidence,
+        target_width=args.target_width,
+        min_samples=args.min_samples,
+    )
+    print(json.dumps(results, indent=4))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+
+from src.agent import (
+    AgentMetricsCallbackHandler,
+    agent_executor_builder,
+    build_task_input,
+    invoke_with_deadline,
+    tools,
+)
+from src.metrics.compute_metrics import (
+    compute_single_sample_accuracy,
+    parse_agent_output,
+)
+from src.utils import (
+    extract_selected_threads_processed,
+    get_exact_answers,
+    open_json_file,
+    serialize_context,
+)
+
+DEFAULT_STYLES = ("react", "json-chat", "few-shot-CoT", "program", "tools-agent")
+
+
+def benchmark_prompt_styles(
+    samples,
+    model,
+    provider,
+    styles=DEFAULT_STYLES,
+    tolerance=0.005,
+    context_format="pipe",
+    timeout=None,
+    request_timeout=None,
+):
+    """
+    Answers the same samples with each prompt style and compares the cost of a question.
+
+    One executor is built per style and reused for every sample, so the numbers measure the
+    agent loop and not the client set-up.
+
+    Parameters:
+        samples (list): (exact_answers, sample) pairs, as returned by `get_exact_answers`.
+        model (str): The model to use.
+        provider (str): The LLM provider.
+        styles (tuple): The prompt styles to compare.
+        tolerance (float): Tolerance for numeric comparisons.
+        context_format (str): How the samples are rendered in the prompt.
+        timeout (float): Optional wall-clock deadline in seconds for each question.
+        request_timeout (float): Optional timeout in seconds for each single LLM call.
+
+    Returns:
+        dict: For each style:
+              - "mean_accuracy": share of correct answers.
+              - "iterations_per_question": mean number of agent iterations (LLM turns).
+              - "tool_calls_per_question": mean number of tool calls.
+              - "tokens_per_question": mean prompt + completion tokens.
+              - "latency_p50" / "latency_p95": percentiles of the time per question (s).
+              - "parse_retries" / "output_repairs": totals over the samples.
+              - "cost_usd": estimated total cost (None if the model price is unknown).
+              - "error": the error message if the executor could not be built.
+    """
+    results = {}
+    for prompt_style in styles:
+        metrics = AgentMetricsCallbackHandler(model=model)
+        try:
+            agent_executor, _ = agent_executor_builder(
+                model=model,
+                provider=provider,
+                temperature=0,
+                tools=tools,
+                prompt_style=prompt_style,
+                verbose=False,
+                max_execution_time=timeout,
+                request_timeout=request_timeout,
+                callbacks=[metrics],
+            )
+        except Exception as e:
+            results[prompt_style] = {"error": f"{type(e).__name__}: {e}"}
+            continue
+
+        accuracy_measurements = []
+        latencies = []
+        tool_calls = []
+        for exact_answers, sample in samples:
+            started = time.perf_counter()
+            response = invoke_with_deadline(
+                agent_executor,
+                {"input": build_task_input(serialize_context(sample, context_format))},
+                timeout=timeout,
+            )
+            latencies.append(time.perf_counter() - started)
+            tool_calls.append(len(response.get("intermediate_steps", [])))
+            accuracy_measurements.extend(
+                compute_single_sample_accuracy(
+                    expected_answers=exact_answers,
+                    actual_answers=parse_agent_output(response.get("output")),
+                    tolerance=tolerance,
+                )["accuracy_measurements"]
+            )
+
+        summary = metrics.summary()
+        results[prompt_style] = {
+            "mean_accuracy": (
+                float(np.mean(accuracy_measurements)) if accuracy_measurements else None
+            ),
+            "iterations_per_question": summary["iterations_per_sample"],
+            "tool_calls_per_question": (
+                float(np.mean(tool_calls)) if tool_calls else None
+            ),
+            "tokens_per_question": summary["tokens_per_sample"],
+            "latency_p50": float(np.percentile(latencies, 50)) if latencies else None,
+            "latency_p95": float(np.percentile(latencies, 95)) if latencies else None,
+            "parse_retries": summary["parse_retries"],
+            "output_repairs": summary["output_repairs"],
+            "cost_usd": summary["cost_usd"],
+            "error": None,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare iterations, tokens and latency per question of the prompt styles."
+    )
+    parser.add_argument("--data_path", type=str, required=True)
+    parser.add_argument("--model", type=str, default="gpt-4o")
+    parser.add_argument("--provider", type=str, default="openai")
+    parser.add_argument("--styles", type=str, nargs="+", default=list(DEFAULT_STYLES))
+    parser.add_argument("--number_samples", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=None)
+    args = parser.parse_args()
+
+    data = open_json_file(args.data_path)
+    random.seed(args.seed)
+    indices = random.sample(range(len(data)), min(args.number_samples, len(data)))
+    data_processed = extract_selected_threads_processed(data, indices)
+    samples = [get_exact_answers(sample) for sample in data_processed]
+
+    results = benchmark_prompt_styles(
+        samples,
+        model=args.model,
+        provider=args.provider,
+        styles=args.styles,
+        timeout=args.timeout,
+    )
+    print(json.dumps(results, indent=4))
+
+
+if __name__ == "__main__":
+    main()
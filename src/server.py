@@ -0,0 +1,547 @@
+import argparse
+import asyncio
+import json
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from src.agent import (
+    AgentPool,
+    agent_builder,
+    answer_with_executor,
+    batch_answer,
+    tools,
+)
+from src.agent.chat import chat_turn, start_chat_session
+from src.utils.prompt_budget import prompt_budget
+
+MAX_BODY_BYTES = 10 * 1024 * 1024
+MAX_BATCH_SIZE = 256
+# Number of recent request latencies kept per endpoint for the /metrics quantiles.
+LATENCY_WINDOW = 2048
+
+REASONS = {
+    200: "OK",
+    201: "Created",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+    504: "Gateway Timeout",
+}
+
+
+class HTTPError(Exception):
+    """An error answered to the client with the given status code."""
+
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class AgentServer:
+    """
+    asyncio HTTP API in front of the agent.
+
+    Endpoints:
+        GET    /health                   Liveness probe.
+        GET    /metrics                  Prometheus text metrics.
+        POST   /answer                   {"input": ...} -> {"answers": [...]}
+        POST   /batch                    {"records": [...]} -> {"results": [...]}, see `batch_answer`.
+        POST   /sessions                 Creates a chat session -> {"session_id": ...}
+        POST   /sessions/<id>/messages   {"input": ...} -> {"output": ...}
+        DELETE /sessions/<id>            Ends a chat session.
+
+    Direct and batch answers share one pool of warm executors. Each chat session has its own
+    executor and memory around one shared agent, and its turns run one at a time; different
+    sessions run concurrently. The agent itself is blocking, so requests run on worker threads
+    while the event loop keeps accepting connections.
+
+    Parameters:
+        executor_kwargs (dict): Arguments of `agent_executor_builder` (model, provider,
+                                prompt_style, ...) for the direct answers.
+        pool_size (int): Number of warm executors, i.e. direct answers run at the same time.
+        max_pending (int): Admitted requests (running or waiting for an executor). Beyond it,
+                           requests are rejected with 503 and a Retry-After header.
+        request_timeout (float): Deadline in seconds of a direct answer or chat turn; on
+                                 expiry the answer is the best partial one or a 504.
+        chat_prompt_style (str): Prompt style of the chat sessions.
+        max_sessions (int): Maximum number of open chat sessions.
+        session_ttl (float): Idle seconds after which a chat session is dropped.
+        context_format (str): The format threads are rendered in.
+    """
+
+    def __init__(
+        self,
+        executor_kwargs,
+        pool_size=4,
+        max_pending=32,
+        request_timeout=120,
+        chat_prompt_style="structured-chat-agent",
+        max_sessions=1000,
+        session_ttl=1800,
+        context_format="pipe",
+    ):
+        self.executor_kwargs = {
+            **executor_kwargs,
+            "max_execution_time": request_timeout,
+        }
+        self.pool = AgentPool(size=pool_size, **self.executor_kwargs)
+        self.max_pending = max_pending
+        self.request_timeout = request_timeout
+        self.chat_prompt_style = chat_prompt_style
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
+        self.context_format = context_format
+
+        self._workers = ThreadPoolExecutor(max_workers=max_pending)
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._sessions = {}
+        self._chat_agent = None
+        self._chat_agent_lock = threading.Lock()
+
+        self._requests = defaultdict(int)
+        self._latencies = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+        self._latency_sum = defaultdict(float)
+        self._rejected = 0
+        self._timeouts = 0
+
+    async def _run(self, func, *args, timeout=None):
+        work = self._workers.submit(func, *args)
+        future = asyncio.wrap_future(work)
+        if timeout is None:
+            return await future
+        try:
+            # A small grace period lets the cooperative deadline return a partial answer first.
+            return await asyncio.wait_for(future, timeout + 1.0)
+        except asyncio.TimeoutError:
+            self._timeouts += 1
+            # The worker may still hold a pool executor: it keeps an admission slot of its
+            # own until it completes, so a 504 does not let in more than max_pending.
+            with self._pending_lock:
+                self._pending += 1
+            work.add_done_callback(lambda _: self._release())
+            raise HTTPError(504, "The request timed out.")
+
+    def _release(self):
+        with self._pending_lock:
+            self._pending -= 1
+
+    def _answer(self, model_input):
+        with self.pool.executor() as agent_executor:
+            answers = answer_with_executor(
+                agent_executor,
+                model_input,
+                context_format=self.context_format,
+                timeout=self.request_timeout,
+                max_input_tokens=prompt_budget(self.executor_kwargs["model"]),
+                provider=self.executor_kwargs["provider"],
+                model=self.executor_kwargs["model"],
+            )
+        return [answer.strip() for answer in answers]
+
+    def _batch(self, records):
+        return list(
+            batch_answer(
+                enumerate(records),
+                self.pool,
+                concurrency=self.pool.size,
+                context_format=self.context_format,
+                timeout=self.request_timeout,
+                max_input_tokens=prompt_budget(self.executor_kwargs["model"]),
+                provider=self.executor_kwargs["provider"],
+                model=self.executor_kwargs["model"],
+            )
+        )
+
+    def _get_chat_agent(self):
+        with self._chat_agent_lock:
+            if self._chat_agent is None:
+                self._chat_agent = agent_builder(
+                    model=self.executor_kwargs["model"],
+                    provider=self.executor_kwargs["provider"],
+                    temperature=0,
+                    tools=self.executor_kwargs.get("tools", tools),
+                    prompt_style=self.chat_prompt_style,
+                    request_timeout=self.executor_kwargs.get("request_timeout"),
+                )
+            return self._chat_agent
+
+    def _create_session(self):
+        agent_executor, memory = start_chat_session(
+            model=self.executor_kwargs["model"],
+            provider=self.executor_kwargs["provider"],
+            temperature=0,
+            tools=self.executor_kwargs.get("tools", tools),
+            prompt_style=self.chat_prompt_style,
+            verbose=False,
+            agent=self._get_chat_agent(),
+        )
+        return {
+            "executor": agent_executor,
+            "memory": memory,
+            "lock": threading.Lock(),
+            "last_used": time.monotonic(),
+        }
+
+    def _chat_turn(self, session, user_input):
+        # Turns of a session are serialized in the worker: a turn that outlives its HTTP
+        # request still completes before the next one reads the memory.
+        with session["lock"]:
+            session["last_used"] = time.monotonic()
+            return chat_turn(
+                session["executor"],
+                session["memory"],
+                user_input,
+                prompt_budget(self.executor_kwargs["model"]),
+                self.executor_kwargs["provider"],
+                self.executor_kwargs["model"],
+            )
+
+    def _evict_idle_sessions(self):
+        now = time.monotonic()
+        for session_id, session in list(self._sessions.items()):
+            if now - session["last_used"] > self.session_ttl:
+                del self._sessions[session_id]
+
+    @staticmethod
+    def _parse_body(body):
+        try:
+            payload = json.loads(body or b"{}")
+        except json.JSONDecodeError as e:
+            raise HTTPError(400, f"Invalid JSON body: {e}")
+        if not isinstance(payload, dict):
+            raise HTTPError(400, "The body must be a JSON object.")
+        return payload
+
+    def _admit(self):
+        with self._pending_lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise HTTPError(
+                    503, "The server is at capacity.", headers={"Retry-After": "1"}
+                )
+            self._pending += 1
+
+    async def _route(self, method, path, body):
+        parts = [part for part in path.split("/") if part]
+
+        if parts == ["health"] and method == "GET":
+            return 200, {"status": "ok"}
+        if parts == ["metrics"] and method == "GET":
+            return 200, self.metrics()
+
+        if parts == ["answer"] and method == "POST":
+            payload = self._parse_body(body)
+            if "input" not in payload:
+                raise HTTPError(400, "Missing 'input'.")
+            answers = await self._run(
+                self._answer, payload["input"], timeout=self.request_timeout
+            )
+            return 200, {"answers": answers}
+
+        if parts == ["batch"] and method == "POST":
+            records = self._parse_body(body).get("records")
+            if not isinstance(records, list):
+                raise HTTPError(400, "Missing 'records' list.")
+            if len(records) > MAX_BATCH_SIZE:
+                raise HTTPError(413, f"At most {MAX_BATCH_SIZE} records per batch.")
+            # Each record has its own deadline; the batch as a whole has none.
+            return 200, {"results": await self._run(self._batch, records)}
+
+        if parts == ["sessions"] and method == "POST":
+            self._evict_idle_sessions()
+            if len(self._sessions) >= self.max_sessions:
+                raise HTTPError(503, "Too many open chat sessions.")
+            session_id = uuid.uuid4().hex
+            self._sessions[session_id] = await self._run(self._create_session)
+            return 201, {"session_id": session_id}
+
+        if len(parts) >= 2 and parts[0] == "sessions":
+            session = self._sessions.get(parts[1])
+            if session is None:
+                raise HTTPError(404, "Unknown chat session.")
+            if len(parts) == 2 and method == "DELETE":
+                del self._sessions[parts[1]]
+                return 200, {"session_id": parts[1], "deleted": True}
+            if parts[2:] == ["messages"] and method == "POST":
+                payload = self._parse_body(body)
+                if "input" not in payload:
+                    raise HTTPError(400, "Missing 'input'.")
+                output = await self._run(
+                    self._chat_turn,
+                    session,
+                    payload["input"],
+                    timeout=self.request_timeout,
+                )
+                return 200, {"session_id": parts[1], "output": output}
+
+        if parts and parts[0] in ("health", "metrics", "answer", "batch", "sessions"):
+            raise HTTPError(405, f"Method {method} not allowed on {path}.")
+        raise HTTPError(404, f"Not found: {path}")
+
+    async def handle_request(self, method, path, body=b""):
+        """
+        Answers one HTTP request.
+
+        Parameters:
+            method (str): The HTTP method.
+            path (str): The request path, without query string.
+            body (bytes): The request body.
+
+        Returns:
+            tuple: (status, payload, headers) where payload is a dict (sent as JSON) or the
+                   /metrics text.
+        """
+        started = time.perf_counter()
+        endpoint = self._endpoint(path)
+        headers = {}
+        admitted = method in ("POST", "DELETE")
+        try:
+            if admitted:
+                self._admit()
+            try:
+                status, payload = await self._route(method, path, body)
+            finally:
+                if admitted:
+                    self._release()
+        except HTTPError as e:
+            status, payload, headers = e.status, {"error": str(e)}, e.headers
+        except Exception as e:
+            status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+
+        elapsed = time.perf_counter() - started
+        self._requests[(endpoint, status)] += 1
+        self._latencies[endpoint].append(elapsed)
+        self._latency_sum[endpoint] += elapsed
+        return status, payload, headers
+
+    @staticmethod
+    def _endpoint(path):
+        # Session ids are dropped to keep the metric labels bounded.
+        parts = [part for part in path.split("/") if part]
+        if parts and parts[0] == "sessions":
+            return "/sessions" + ("/messages" if parts[2:] == ["messages"] else "")
+        return "/" + "/".join(parts[:1])
+
+    def metrics(self):
+        """
+        Returns the server metrics in the Prometheus text format.
+        """
+        lines = [
+            "# TYPE agent_http_requests_total counter",
+            *(
+                f'agent_http_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}'
+                for (endpoint, status), count in sorted(self._requests.items())
+            ),
+            "# TYPE agent_http_request_seconds summary",
+        ]
+        for endpoint, latencies in sorted(self._latencies.items()):
+            for quantile in (0.5, 0.95, 0.99):
+                value = float(np.quantile(list(latencies), quantile))
+                lines.append(
+                    f'agent_http_request_seconds{{endpoint="{endpoint}",quantile="{quantile}"}} {value:.6f}'
+                )
+            count = sum(
+                count for (name, _), count in self._requests.items() if name == endpoint
+            )
+            lines.append(
+                f'agent_http_request_seconds_sum{{endpoint="{endpoint}"}} {self._latency_sum[endpoint]:.6f}'
+            )
+            lines.append(
+                f'agent_http_request_seconds_count{{endpoint="{endpoint}"}} {count}'
+            )
+
+        pool = self.pool.stats()
+        lines += [
+            "# TYPE agent_http_rejected_total counter",
+            f"agent_http_rejected_total {self._rejected}",
+            "# TYPE agent_http_timeouts_total counter",
+            f"agent_http_timeouts_total {self._timeouts}",
+            "# TYPE agent_http_pending gauge",
+            f"agent_http_pending {self._pending}",
+            "# TYPE agent_pool_executors gauge",
+            f'agent_pool_executors{{state="idle"}} {pool["idle"]}',
+            f'agent_pool_executors{{state="busy"}} {pool["busy"]}',
+            "# TYPE agent_chat_sessions gauge",
+            f"agent_chat_sessions {len(self._sessions)}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    async def handle_connection(self, reader, writer):
+        """
+        Serves the HTTP/1.1 requests of one connection (with keep-alive).
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY_BYTES:
+                    await self._write_response(
+                        writer, 413, {"error": "Request body too large."}, {}, False
+                    )
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload, extra_headers = await self.handle_request(
+                    method.upper(), urlsplit(target).path, body
+                )
+                keep_alive = (
+                    version == "HTTP/1.1"
+                    and headers.get("connection", "").lower() != "close"
+                )
+                await self._write_response(
+                    writer, status, payload, extra_headers, keep_alive
+                )
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _write_response(writer, status, payload, headers, keep_alive):
+        if isinstance(payload, str):
+            body = payload.encode()
+            content_type = "text/plain; version=0.0.4"
+        else:
+            body = json.dumps(payload).encode()
+            content_type = "application/json"
+        head = [
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+            *(f"{name}: {value}" for name, value in headers.items()),
+        ]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    async def start(self, host="127.0.0.1", port=8000):
+        """
+        Starts listening and returns the `asyncio.Server`.
+        """
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    def close(self):
+        self._workers.shutdown(wait=False, cancel_futures=True)
+
+
+async def serve(server, host, port, warm_up=True):
+    """
+    Runs `server` until cancelled, optionally building the executors first.
+    """
+    if warm_up:
+        await asyncio.get_running_loop().run_in_executor(None, server.pool.warm_up)
+    http_server = await server.start(host, port)
+    print(f"Agent HTTP server listening on http://{host}:{port}")
+    try:
+        async with http_server:
+            await http_server.serve_forever()
+    finally:
+        server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="HTTP API for the agent: direct answers, batches and chat sessions."
+    )
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--model", type=str, default="gpt-4o")
+    parser.add_argument("--provider", type=str, default="openai")
+    parser.add_argument("--prompt_style", type=str, default="react")
+    parser.add_argument(
+        "--chat_prompt_style", type=str, default="structured-chat-agent"
+    )
+    parser.add_argument("--pool_size", type=int, default=4)
+    parser.add_argument("--max_pending", type=int, default=32)
+    parser.add_argument("--request_timeout", type=float, default=120)
+    parser.add_argument(
+        "--llm_timeout",
+        type=float,
+        default=None,
+        help="Timeout in seconds for each single LLM call",
+    )
+    parser.add_argument(
+        "--hedge_delay",
+        type=float,
+        default=None,
+        help="Duplicate an LLM call that has not answered after this many seconds (or failed)",
+    )
+    parser.add_argument("--hedge_model", type=str, default=None)
+    parser.add_argument("--hedge_provider", type=str, default=None)
+    parser.add_argument("--max_sessions", type=int, default=1000)
+    parser.add_argument("--session_ttl", type=float, default=1800)
+    parser.add_argument(
+        "--context_format", choices=["pipe", "csv", "json", "repr"], default="pipe"
+    )
+    parser.add_argument(
+        "--stub",
+        action="store_true",
+        help="Answer with the offline stub LLM (for load tests)",
+    )
+    parser.add_argument(
+        "--stub_latency",
+        type=float,
+        default=0.05,
+        help="Simulated latency in seconds of each stub LLM call",
+    )
+    args = parser.parse_args()
+
+    model, provider = args.model, args.provider
+    if args.stub:
+        model, provider = f"stub-{args.stub_latency}", "stub"
+
+    server = AgentServer(
+        executor_kwargs={
+            "model": model,
+            "provider": provider,
+            "temperature": 0,
+            "tools": tools,
+            "prompt_style": args.prompt_style,
+            "handle_parsing_errors": True,
+            "verbose": False,
+            "request_timeout": args.llm_timeout,
+            "hedge_delay": args.hedge_delay,
+            "hedge_model": args.hedge_model,
+            "hedge_provider": args.hedge_provider,
+        },
+        pool_size=args.pool_size,
+        max_pending=args.max_pending,
+        request_timeout=args.request_timeout,
+        chat_prompt_style=args.chat_prompt_style,
+        max_sessions=args.max_sessions,
+        session_ttl=args.session_ttl,
+        context_format=args.context_format,
+    )
+    try:
+        asyncio.run(serve(server, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
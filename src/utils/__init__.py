@@ -1,4 +1,12 @@
+from src.utils.context_serializer import format_model_input  # noqa: F401
+from src.utils.context_serializer import serialize_context  # noqa: F401
+from src.utils.context_serializer import thread_questions  # noqa: F401
+from src.utils.data_extractor import context_hash  # noqa: F401
 from src.utils.data_extractor import extract_selected_threads_processed  # noqa: F401
 from src.utils.data_extractor import extract_thread_details  # noqa: F401
 from src.utils.data_extractor import get_exact_answers  # noqa: F401
+from src.utils.data_extractor import group_threads_by_context  # noqa: F401
 from src.utils.data_extractor import open_json_file  # noqa: F401
+from src.utils.data_extractor import open_json_file_cached  # noqa: F401
+from src.utils.data_extractor import split_group_answers  # noqa: F401
+from src.utils.data_extractor import strip_group_label  # noqa: F401
@@ -0,0 +1,181 @@
+import csv
+import io
+import json
+
+CONTEXT_FORMATS = ("pipe", "csv", "json", "repr")
+
+
+def _normalize_sentence(sentence):
+    return " ".join(str(sentence).split())
+
+
+def _unique_sentences(*sections):
+    """
+    Returns the sentences of all sections in order, without duplicates or empty/punctuation-only entries.
+    """
+    seen = set()
+    unique = []
+    for section in sections:
+        for sentence in section or []:
+            normalized = _normalize_sentence(sentence)
+            if not normalized.strip(" ."):
+                continue
+            key = normalized.lower()
+            if key in seen:
+                continue
+            seen.add(key)
+            unique.append(normalized)
+    return unique
+
+
+def _select_table(thread):
+    # `table_ori` holds the same numbers as `table` before normalization, so keep only one.
+    table = thread.get("table") or thread.get("table_ori") or []
+    return [[_normalize_sentence(cell) for cell in row] for row in table]
+
+
+def thread_questions(thread):
+    """
+    Collects the questions of all QA fields once, in QA-field order.
+
+    Supports both the processed layout (`qa` as a list of dicts) and the raw one
+    (`qa`, `qa_0`, `qa_1`, ... as dicts).
+    """
+    questions = []
+    for key in thread:
+        if key != "qa" and not key.startswith("qa_"):
+            continue
+        qa_data = thread[key]
+        items = qa_data if isinstance(qa_data, list) else [qa_data]
+        for item in items:
+            if isinstance(item, dict) and item.get("question"):
+                question = _normalize_sentence(item["question"])
+                if question not in questions:
+                    questions.append(question)
+    return questions
+
+
+def _table_to_pipe(table):
+    return "\n".join(
+        " | ".join(cell.replace("|", "/") for cell in row) for row in table
+    )
+
+
+def _table_to_csv(table):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerows(table)
+    return buffer.getvalue().rstrip("\n")
+
+
+def _render_thread(thread, context_format):
+    pre_text = _unique_sentences(thread.get("pre_text"))
+    seen = {sentence.lower() for sentence in pre_text}
+    post_text = [
+        sentence
+        for sentence in _unique_sentences(thread.get("post_text"))
+        if sentence.lower() not in seen
+    ]
+    table = _select_table(thread)
+    questions = thread_questions(thread)
+
+    if context_format == "json":
+        compact = {
+            "pre_text": pre_text,
+            "table": table,
+            "post_text": post_text,
+            "questions": questions,
+        }
+        compact = {key: value for key, value in compact.items() if value}
+        return json.dumps(compact, ensure_ascii=False, separators=(",", ":"))
+
+    render_table = _table_to_pipe if context_format == "pipe" else _table_to_csv
+    parts = []
+    if pre_text:
+        parts.append("Text before table:\n" + "\n".join(pre_text))
+    if table:
+        parts.append("Table:\n" + render_table(table))
+    if post_text:
+        parts.append("Text after table:\n" + "\n".join(post_text))
+    if questions:
+        parts.append(
+            "Questions:\n"
+            + "\n".join(f"{i}. {question}" for i, question in enumerate(questions, 1))
+        )
+    return "\n\n".join(parts)
+
+
+def serialize_context(threads, context_format="pipe"):
+    """
+    Renders one or more threads as a token-lean prompt context.
+
+    Compared with `str(thread)`, the compact formats drop Python quoting and escaping,
+    deduplicate the sentences of `pre_text`/`post_text`, skip `table_ori` when `table` is
+    present, omit empty fields and list each question once.
+
+    Supported formats:
+        - "pipe": text sections with the table as pipe-separated rows (default).
+        - "csv": same layout with the table as CSV rows.
+        - "json": compact JSON with only the non-empty fields.
+        - "repr": the legacy `str(thread)` rendering, kept for comparisons.
+
+    Parameters:
+        threads (dict or list): A thread (raw or processed by `extract_thread_details`) or a list of threads.
+        context_format (str): One of CONTEXT_FORMATS. Default is "pipe".
+
+    Returns:
+        str: The rendered context.
+
+    Raises:
+        ValueError: If the context format is not recognized.
+    """
+    if context_format not in CONTEXT_FORMATS:
+        raise ValueError(
+            f"Invalid context format {context_format!r}, expected one of {CONTEXT_FORMATS}."
+        )
+    if context_format == "repr":
+        return str(threads)
+
+    if isinstance(threads, dict):
+        return _render_thread(threads, context_format)
+
+    rendered = [_render_thread(thread, context_format) for thread in threads]
+    if len(rendered) == 1:
+        return rendered[0]
+    return "\n\n".join(
+        f"### Document {i}\n{text}" for i, text in enumerate(rendered, 1)
+    )
+
+
+def _looks_like_thread(value):
+    return isinstance(value, dict) and any(
+        key in value for key in ("pre_text", "post_text", "table", "table_ori")
+    )
+
+
+def format_model_input(model_input, context_format="pipe"):
+    """
+    Serializes a model input if it is (or contains, as JSON text) one or more threads.
+
+    Free-text inputs, such as a question or a request to extract a file at an index, are
+    returned unchanged.
+
+    Parameters:
+        model_input (str, dict or list): The input passed to the agent.
+        context_format (str): One of CONTEXT_FORMATS. Default is "pipe".
+
+    Returns:
+        str: The input to place in the prompt.
+    """
+    value = model_input
+    if isinstance(model_input, str):
+        try:
+            value = json.loads(model_input)
+        except (json.JSONDecodeError, ValueError):
+            return model_input
+
+    if _looks_like_thread(value) or (
+        isinstance(value, list) and value and all(_looks_like_thread(v) for v in value)
+    ):
+        return serialize_context(value, context_format)
+    return model_input if isinstance(model_input, str) else str(model_input)
@@ -1,4 +1,12 @@
+import hashlib
 import json
+import os
+import re
+from functools import lru_cache
+
+# Label of the questions of a merged group sample (see `group_threads_by_context`).
+GROUP_QUESTION_LABEL = "Thread {thread}, turn {turn}: "
+_GROUP_QUESTION_LABEL = re.compile(r"^thread \d+, turn \d+: ", re.IGNORECASE)
 
 
 def open_json_file(file_path):
@@ -16,6 +24,31 @@ def open_json_file(file_path):
     return data
 
 
+@lru_cache(maxsize=16)
+def _open_json_file_version(file_path, mtime_ns, size):
+    return open_json_file(file_path)
+
+
+def open_json_file_cached(file_path):
+    """
+    Open a JSON file, reusing the parsed content while the file is unchanged on disk.
+
+    Long-running processes (batch mode, the daemon, the HTTP server) read the same dataset
+    for every question; the file is parsed again only when its modification time or size
+    changes. The returned object is shared between callers and must be treated as read-only.
+
+    Parameters:
+        file_path (str): Path to the JSON file.
+
+    Returns:
+        list: A list of dictionaries loaded from the JSON file.
+    """
+    stat = os.stat(file_path)
+    return _open_json_file_version(
+        os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size
+    )
+
+
 def extract_thread_details(thread):
     """
     Extract required fields from a single thread.
@@ -136,3 +169,145 @@ def get_exact_answers(single_sample):
                 exact_answers.append(processed)
                 del qa_data["exe_ans"]
     return exact_answers, single_sample
+
+
+def _qa_items(thread):
+    # The QA entries of a thread in `get_exact_answers` order (processed or raw layout).
+    for key in thread:
+        if key == "qa" or key.startswith("qa_"):
+            qa_data = thread[key]
+            for item in qa_data if isinstance(qa_data, list) else [qa_data]:
+                if isinstance(item, dict):
+                    yield item
+
+
+def context_hash(thread):
+    """
+    Hashes the document part of a thread (pre_text, post_text and table), ignoring its
+    questions, ids and answers. Threads asking different questions about the same document
+    page have the same hash.
+
+    Parameters:
+        thread (dict): A thread (raw or processed layout).
+
+    Returns:
+        str: The SHA-256 hex digest.
+    """
+    document = {
+        "pre_text": thread.get("pre_text") or [],
+        "post_text": thread.get("post_text") or [],
+        "table": thread.get("table") or thread.get("table_ori") or [],
+    }
+    encoded = json.dumps(document, sort_keys=True, ensure_ascii=False).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def strip_group_label(question):
+    """Removes the thread and turn label of a merged group question, if any."""
+    return _GROUP_QUESTION_LABEL.sub("", question)
+
+
+def group_threads_by_context(threads):
+    """
+    Groups threads with an identical document (see `context_hash`), so that all their
+    questions are answered in one agent call instead of sending the same context each time.
+
+    A question of a conversational thread depends on the earlier turns of that thread, so
+    each thread keeps its questions as its own ordered block, labelled with
+    GROUP_QUESTION_LABEL ("Thread 2, turn 1: ..."). A thread whose whole dialogue is the
+    start of an earlier block shares its answers instead of adding a block: answers are only
+    shared when the preceding turns are identical, not just the question text.
+
+    Parameters:
+        threads (list): Threads without their exact answers (as returned by `get_exact_answers`).
+
+    Returns:
+        list: One group per distinct document, in order of first appearance, with:
+              - "context_hash": the document hash.
+              - "indices": positions of the threads of the group in `threads`.
+              - "sample": the thread to send to the agent. For a single thread, the thread
+                itself; otherwise the shared document with the labelled question blocks, as
+                a processed "qa" list.
+              - "question_map": for each thread of the group, the positions of its questions
+                in the questions of "sample" (see `split_group_answers`).
+    """
+    groups = {}
+    for position, thread in enumerate(threads):
+        key = context_hash(thread)
+        if key not in groups:
+            groups[key] = {"context_hash": key, "indices": [], "threads": []}
+        groups[key]["indices"].append(position)
+        groups[key]["threads"].append(thread)
+
+    result = []
+    for group in groups.values():
+        members = group.pop("threads")
+        if len(members) == 1:
+            group["sample"] = members[0]
+            group["question_map"] = [None]
+            result.append(group)
+            continue
+
+        questions = []
+        blocks = []  # (dialogue, positions of its questions in `questions`)
+        question_map = []
+        for thread in members:
+            dialogue = [
+                " ".join(str(item.get("question") or "").split())
+                for item in _qa_items(thread)
+            ]
+            shared = next(
+                (
+                    positions
+                    for block, positions in blocks
+                    if block[: len(dialogue)] == dialogue
+                ),
+                None,
+            )
+            if shared is not None:
+                question_map.append(shared[: len(dialogue)])
+                continue
+            label = len(blocks) + 1
+            positions = []
+            for turn, question in enumerate(dialogue, 1):
+                positions.append(len(questions))
+                questions.append(
+                    GROUP_QUESTION_LABEL.format(thread=label, turn=turn) + question
+                )
+            blocks.append((dialogue, positions))
+            question_map.append(positions)
+
+        first = members[0]
+        group["sample"] = {
+            "pre_text": first.get("pre_text", []),
+            "post_text": first.get("post_text", []),
+            "table": first.get("table") or first.get("table_ori") or [],
+            "qa": [
+                {"qa_field": f"qa_{i}", "question": question}
+                for i, question in enumerate(questions)
+            ],
+        }
+        group["question_map"] = question_map
+        result.append(group)
+    return result
+
+
+def split_group_answers(group, answers):
+    """
+    Maps the answers to the questions of a group sample back to its threads, each in the
+    order of its `get_exact_answers`.
+
+    Parameters:
+        group (dict): A group returned by `group_threads_by_context`.
+        answers (list): The answers to the questions of `group["sample"]`, in order.
+
+    Returns:
+        list: One list of answers per thread of the group. A missing answer is None. A group
+              of a single thread gets the answers unchanged.
+    """
+    if len(group["indices"]) == 1:
+        return [list(answers)]
+    return [
+        [answers[i] if i < len(answers) else None for i in positions]
+        for positions in group["question_map"]
+    ]
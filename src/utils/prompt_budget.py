@@ -0,0 +1,91 @@
+from src.utils.context_serializer import serialize_context
+from src.utils.tokenizers import (
+    context_window,
+    preflight_token_count,
+)
+
+# Tokens of the context window kept free for the prompt template, the tool descriptions,
+# the agent scratchpad and the completion.
+DEFAULT_RESERVED_TOKENS = 16000
+
+TRIMMED_MARKER = "\n[... {tokens} tokens trimmed to fit the context window ...]\n"
+
+
+def prompt_budget(model, reserved_tokens=DEFAULT_RESERVED_TOKENS):
+    """
+    Returns the number of tokens available for the input of a model: its context window
+    (see `context_window`) minus `reserved_tokens`.
+    """
+    return max(0, context_window(model) - reserved_tokens)
+
+
+def trim_to_budget(text, budget, provider="openai", model="gpt-4o"):
+    """
+    Trims a text to a token budget before it is sent, keeping its beginning and its end.
+
+    The middle of the text is replaced by a marker: a rendered thread keeps its leading
+    text and table and its questions at the end, and a pasted document keeps its start and
+    the request that usually follows it.
+
+    Parameters:
+        text (str): The input text.
+        budget (int): The token budget (see `prompt_budget`).
+        provider (str): The LLM provider.
+        model (str): The model name.
+
+    Returns:
+        tuple: (text, trimmed) where trimmed tells whether the text was shortened.
+
+    Raises:
+        ValueError: If the budget is too small to keep any of the text.
+    """
+    tokens = preflight_token_count(text, budget, provider, model)
+    if tokens <= budget:
+        return text, False
+    ratio = len(text) / tokens
+    keep = int(budget * ratio) - len(TRIMMED_MARKER) - 16
+    # The token ratio of the kept part can differ from the whole; shrink until it fits.
+    while keep > 0:
+        head, tail = text[: keep * 2 // 3], text[len(text) - keep // 3 :]
+        trimmed = head + TRIMMED_MARKER.format(tokens=tokens - budget) + tail
+        if preflight_token_count(trimmed, budget, provider, model) <= budget:
+            return trimmed, True
+        keep = int(keep * 0.9)
+    raise ValueError(
+        f"The input ({tokens} tokens) cannot be trimmed to a budget of {budget} tokens."
+    )
+
+
+def paginate_threads(
+    threads, budget, provider="openai", model="gpt-4o", context_format="pipe"
+):
+    """
+    Splits threads into pages whose rendered context fits a token budget, in order.
+
+    A thread larger than the budget on its own gets a page of its own (trim it with
+    `trim_to_budget` when rendering).
+
+    Parameters:
+        threads (list): The threads (e.g. the result of `extract_financial_data`).
+        budget (int): The token budget of a page.
+        provider (str): The LLM provider.
+        model (str): The model name.
+        context_format (str): The format the threads are rendered in.
+
+    Returns:
+        list: The pages, as lists of positions in `threads`.
+    """
+    pages = []
+    page, page_tokens = [], 0
+    for position, thread in enumerate(threads):
+        rendered = serialize_context(thread, context_format)
+        # Threads are counted one at a time: far from the budget, in constant time.
+        tokens = preflight_token_count(rendered, budget, provider, model)
+        if page and page_tokens + tokens > budget:
+            pages.append(page)
+            page, page_tokens = [], 0
+        page.append(position)
+        page_tokens += tokens
+    if page:
+        pages.append(page)
+    return pages
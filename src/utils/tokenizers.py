@@ -0,0 +1,127 @@
+from functools import lru_cache
+
+import tiktoken
+
+# Average characters per token used when no local tokenizer is available. Anthropic and
+# Google do not ship offline tokenizers, so their counts are approximations.
+CHARS_PER_TOKEN = {
+    "openai": 4.0,
+    "anthropic": 3.5,
+    "google": 4.0,
+}
+
+
+def approximate_token_count(text, chars_per_token=4.0):
+    """
+    Approximates the number of tokens of a text from its length.
+
+    Parameters:
+        text (str): The text to measure.
+        chars_per_token (float): Average number of characters per token.
+
+    Returns:
+        int: The approximate token count.
+    """
+    return int(len(text) / chars_per_token + 0.5)
+
+
+@lru_cache(maxsize=None)
+def get_token_counter(provider="openai", model="gpt-4o"):
+    """
+    Returns a cached function that counts the tokens of a text for a provider and model.
+
+    OpenAI models use their tiktoken encoding (falling back to "o200k_base" for unknown
+    model names). If tiktoken cannot load the encoding (e.g. offline, without a cached
+    BPE file), and for the other providers, a characters-per-token approximation is used.
+
+    Parameters:
+        provider (str): The LLM provider ("openai", "anthropic", "google").
+        model (str): The model name.
+
+    Returns:
+        callable: A function mapping a text (str) to its token count (int). Its
+                  `exact` attribute tells whether a real tokenizer is used.
+    """
+    if provider == "openai":
+        try:
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                encoding = tiktoken.get_encoding("o200k_base")
+
+            def count_tokens(text):
+                return len(encoding.encode(text, disallowed_special=()))
+
+            count_tokens.exact = True
+            return count_tokens
+        except Exception:
+            # The BPE file could not be loaded; fall back to the approximation.
+            pass
+
+    chars_per_token = CHARS_PER_TOKEN.get(provider, 4.0)
+
+    def count_tokens(text):
+        return approximate_token_count(text, chars_per_token)
+
+    count_tokens.exact = False
+    return count_tokens
+
+
+# Context windows in tokens. Model names are matched by longest prefix, like the prices.
+CONTEXT_WINDOWS = {
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+    "gpt-4.1": 1047576,
+    "gpt-4.1-mini": 1047576,
+    "o1": 200000,
+    "o3-mini": 200000,
+    "claude-3-5-haiku": 200000,
+    "claude-3-5-sonnet": 200000,
+    "claude-3-7-sonnet": 200000,
+    "gemini-2.0-flash": 1048576,
+    "gemini-1.5-pro": 2097152,
+}
+DEFAULT_CONTEXT_WINDOW = 128000
+
+# Conservative characters per token of the preflight estimate. Numbers and tables tokenize
+# worse than prose, so this ratio overestimates the tokens of the dataset documents.
+PREFLIGHT_CHARS_PER_TOKEN = 3.0
+
+
+def context_window(model):
+    """
+    Returns the context window of a model in tokens (DEFAULT_CONTEXT_WINDOW if unknown).
+    """
+    matches = [name for name in CONTEXT_WINDOWS if str(model).startswith(name)]
+    if not matches:
+        return DEFAULT_CONTEXT_WINDOW
+    return CONTEXT_WINDOWS[max(matches, key=len)]
+
+
+def preflight_token_count(
+    text, budget=None, provider="openai", model="gpt-4o", margin=0.2
+):
+    """
+    Estimates the tokens of a prompt before it is sent, to catch prompts that would exceed
+    the model context without a network round trip.
+
+    The estimate is the length of the text over PREFLIGHT_CHARS_PER_TOKEN, which takes
+    constant time. Only when it is within `margin` of `budget` (or above it), and an exact
+    tokenizer is available for the model, the text is counted with the cached tokenizer (see
+    `get_token_counter`), so prompts far from the limit are never tokenized.
+
+    Parameters:
+        text (str): The prompt text.
+        budget (int): Optional token budget the prompt is compared with.
+        provider (str): The LLM provider.
+        model (str): The model name.
+        margin (float): Relative distance to the budget below which the text is tokenized.
+
+    Returns:
+        int: The estimated (upper bound) or exact token count.
+    """
+    estimate = int(len(text) / PREFLIGHT_CHARS_PER_TOKEN) + 1
+    if budget is None or estimate < budget * (1 - margin):
+        return estimate
+    count_tokens = get_token_counter(provider, model)
+    return count_tokens(text) if count_tokens.exact else estimate
@@ -0,0 +1,119 @@
+import json
+import random
+
+import numpy as np
+import pytest
+
+import src.metrics.accuracy as accuracy_module
+from src.metrics.accumulators import (
+    MetricsAccumulator,
+    RunningMean,
+    merge_accumulators,
+)
+from src.metrics.compute_metrics import score_answers
+
+
+def random_samples(count, seed=0):
+    rng = random.Random(seed)
+    samples = []
+    for _ in range(count):
+        expected = [str(rng.choice([0, 1.5, 20, -3])) for _ in range(rng.randint(1, 3))]
+        actual = [
+            rng.choice([float(value), float(value) + rng.random(), "yes"])
+            for value in expected[: rng.randint(0, len(expected))]
+        ]
+        samples.append((expected, actual, [rng.randint(0, 1)]))
+    return samples
+
+
+def test_running_mean_merge_matches_numpy():
+    values = [random.Random(1).uniform(-5, 5) for _ in range(50)]
+    left, right = RunningMean(), RunningMean()
+    for value in values[:17]:
+        left.add(value)
+    for value in values[17:]:
+        right.add(value)
+
+    merged = left.merge(right)
+
+    assert merged.count == 50
+    assert merged.mean == pytest.approx(np.mean(values))
+    assert merged.variance == pytest.approx(np.var(values, ddof=1))
+    assert merged.mean_square == pytest.approx(np.mean(np.square(values)))
+
+
+def test_accumulator_matches_the_vectorized_scorer():
+    samples = random_samples(40)
+    accumulator = MetricsAccumulator()
+    for expected, actual, llm_scores in samples:
+        accumulator.update(expected, actual)
+        accumulator.add_llm_scores(llm_scores)
+
+    summary = accumulator.summary()
+    scores = score_answers([s[0] for s in samples], [s[1] for s in samples])
+    assert summary["mean_accuracy"] == pytest.approx(scores["mean_accuracy"])
+    assert summary["mae"] == pytest.approx(scores["mae"])
+    assert summary["mse"] == pytest.approx(scores["mse"])
+    assert summary["relative_error"] == pytest.approx(scores["relative_error"])
+    assert summary["position_accuracy"] == pytest.approx(scores["position_accuracy"])
+    assert summary["llm_average_score"] == pytest.approx(
+        np.mean([s[2][0] for s in samples])
+    )
+
+
+def test_shards_merge_independently_of_split_and_order():
+    samples = random_samples(30, seed=3)
+    whole = MetricsAccumulator()
+    shards = [MetricsAccumulator() for _ in range(3)]
+    for i, (expected, actual, llm_scores) in enumerate(samples):
+        for accumulator in (whole, shards[i % 3]):
+            accumulator.update(expected, actual)
+            accumulator.add_llm_scores(llm_scores)
+
+    # The states survive a JSON round trip between processes.
+    states = [json.loads(json.dumps(shard.to_dict())) for shard in reversed(shards)]
+    merged = merge_accumulators(states)
+
+    expected = whole.summary()
+    assert merged["samples"] == expected["samples"] == 30
+    assert merged["answers"] == expected["answers"]
+    for key in ("mean_accuracy", "mae", "mse", "error_std", "llm_average_score"):
+        assert merged[key] == pytest.approx(expected[key])
+
+
+def test_measure_accuracy_reports_progress(monkeypatch, tmp_path):
+    class Executor:
+        def invoke(self, input_data):
+            return {"output": "1.0"}
+
+    monkeypatch.setattr(
+        accuracy_module,
+        "agent_executor_builder",
+        lambda *args, **kwargs: (Executor(), None),
+    )
+    monkeypatch.setattr(
+        accuracy_module,
+        "evaluate_answer",
+        lambda **kwargs: {"score": 1, "explanation": ""},
+    )
+    data = [
+        {"table": [["a", "b"]], "qa": {"question": "q?", "exe_ans": value}}
+        for value in (1.0, 2.0)
+    ]
+    data_path = tmp_path / "data.json"
+    data_path.write_text(json.dumps(data))
+    progress = []
+
+    metrics = accuracy_module.measure_accuracy(
+        data_path=str(data_path),
+        model="gpt-4o",
+        provider="openai",
+        prompt_style="react",
+        number_samples=2,
+        verbose=False,
+        progress_callback=progress.append,
+    )
+
+    assert [summary["samples"] for summary in progress] == [1, 2]
+    assert progress[-1]["mean_accuracy"] == metrics["mean_accuracy"] == 0.5
+    assert merge_accumulators([metrics["accumulator"]])["mae"] == metrics["mae"]
@@ -2,11 +2,19 @@ import json
 import os
 import tempfile
 
+import pytest
+
+from src.agent.agent_builder import agent_builder
 from src.agent.agent_tools import (
+    compact_tools,
     extract_financial_data,
+    fit_extraction_to_budget,
     perform_math_calculus,
+    render_compact_tools,
     strip_code_fence,
+    tools,
 )
+from src.utils.tokenizers import approximate_token_count
 
 
 def test_strip_code_fence_basic_json():
@@ -75,3 +83,65 @@ def test_extract_financial_data_direct_json():
     assert isinstance(result, list)
     assert len(result) == 1
     assert result[0]["qa"][0]["question"] == "What is this?"
+
+
+def test_extract_financial_data_paginates_large_selections():
+    thread = {
+        "pre_text": ["Net income grew by 12% in 2009."] * 20,
+        "post_text": ["test post"],
+        "table": [["a", "b"], [1, 2]],
+        "qa": {"question": "How much?"},
+    }
+    with tempfile.NamedTemporaryFile(
+        mode="w+", delete=False, suffix=".json"
+    ) as tmpfile:
+        json.dump([thread] * 5, tmpfile)
+        tmpfile_path = tmpfile.name
+
+    try:
+        selected = extract_financial_data(
+            json.dumps(
+                {"tool_input": {"file_path": tmpfile_path, "indexes": [4, 3, 2, 1]}}
+            )
+        )
+        result = fit_extraction_to_budget(selected, [4, 3, 2, 1], budget=600)
+        assert len(selected) == 4
+        assert 1 <= len(result) - 1 < 4
+        assert result[-1]["remaining_indexes"] == [4, 3, 2, 1][len(result) - 1 :]
+        assert fit_extraction_to_budget(selected, [4, 3, 2, 1]) == selected
+    finally:
+        os.remove(tmpfile_path)
+
+
+def test_compact_tools_keep_names_and_functions():
+    compact = compact_tools(tools)
+    assert [tool.name for tool in compact] == [tool.name for tool in tools]
+    assert compact[0].func is tools[0].func
+    rendered = render_compact_tools(compact)
+    assert "Tool examples:" in rendered
+    assert '"22.35 / 100" -> 0.2235' in rendered
+    assert perform_math_calculus("22.35 / 100") == "0.2235"
+
+
+@pytest.mark.parametrize("prompt_style", ["react", "json-chat"])
+def test_compact_tool_descriptions_shrink_the_prompt(prompt_style):
+    def prompt_tokens(mode):
+        agent = agent_builder(
+            model="stub-0",
+            provider="stub",
+            temperature=0,
+            tools=tools,
+            prompt_style=prompt_style,
+            tool_descriptions=mode,
+        )
+        prompt = agent.steps[1].invoke(
+            {
+                "input": "question",
+                "agent_scratchpad": [] if prompt_style == "json-chat" else "",
+            }
+        )
+        return approximate_token_count(prompt.to_string())
+
+    assert prompt_tokens("compact") < prompt_tokens("verbose") - 300
+    with pytest.raises(ValueError):
+        prompt_tokens("short")
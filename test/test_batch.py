@@ -0,0 +1,165 @@
+import io
+import json
+import threading
+import time
+
+import pytest
+
+import src.agent.agent_pool as agent_pool_module
+from src.agent.agent_pool import AgentPool
+from src.agent.batch import batch_answer, read_jsonl, resolve_batch_input, run_batch
+
+
+class DummyExecutor:
+    """Answers "<n>,<n*2>" for an input containing the number n, sleeping longer for smaller n."""
+
+    def __init__(self):
+        self.calls = 0
+        self.inputs = []
+
+    def invoke(self, inputs):
+        self.calls += 1
+        self.inputs.append(inputs["input"])
+        number = int(inputs["input"].rsplit(":", 1)[-1])
+        time.sleep(0.01 * (5 - number % 5))
+        return {"output": f"{number}, {number * 2}"}
+
+
+@pytest.fixture
+def built(monkeypatch):
+    executors = []
+    lock = threading.Lock()
+
+    def fake_agent_executor_builder(**kwargs):
+        assert kwargs["memory_flag"] is False
+        with lock:
+            executors.append(DummyExecutor())
+            return executors[-1], None
+
+    monkeypatch.setattr(
+        agent_pool_module, "agent_executor_builder", fake_agent_executor_builder
+    )
+    return executors
+
+
+def make_records(count):
+    return [{"id": f"q{i}", "input": f"question:{i}"} for i in range(count)]
+
+
+def test_pool_reuses_executors(built):
+    pool = AgentPool(size=2)
+    for _ in range(5):
+        with pool.executor() as agent_executor:
+            agent_executor.invoke({"input": "question:1"})
+    assert len(built) == 1
+    pool.warm_up()
+    assert len(built) == 2
+
+
+def test_batch_answer_keeps_input_order(built):
+    records = list(enumerate(make_records(12)))
+    results = list(batch_answer(records, AgentPool(size=3), concurrency=3))
+
+    assert [result["id"] for result in results] == [f"q{i}" for i in range(12)]
+    assert results[7]["answers"] == ["7", "14"]
+    assert all(result["error"] is None for result in results)
+    assert len(built) <= 3
+    assert sum(executor.calls for executor in built) == 12
+
+
+class SlowFirstExecutor:
+    def invoke(self, inputs):
+        number = int(inputs["input"].rsplit(":", 1)[-1])
+        time.sleep(0.5 if number == 0 else 0.001)
+        return {"output": str(number)}
+
+
+def test_batch_answer_bounds_the_reorder_buffer(monkeypatch):
+    monkeypatch.setattr(
+        agent_pool_module,
+        "agent_executor_builder",
+        lambda **kwargs: (SlowFirstExecutor(), None),
+    )
+    consumed = []
+
+    def records():
+        for position, record in enumerate(make_records(50)):
+            consumed.append(position)
+            yield position, record
+
+    results = batch_answer(records(), AgentPool(size=2), concurrency=2)
+    first = next(results)
+    # While the first record is slow, at most 2 * concurrency records are read.
+    assert first["id"] == "q0"
+    assert len(consumed) <= 4
+    assert [result["id"] for result in results] == [f"q{i}" for i in range(1, 50)]
+
+
+def test_batch_answer_trims_an_oversized_record(built):
+    oversized = {"id": "big", "input": "net income | 120 | 107\n" * 5000 + "question:3"}
+    records = list(enumerate([oversized] + make_records(2)))
+    results = list(
+        batch_answer(records, AgentPool(size=1), concurrency=1, max_input_tokens=500)
+    )
+
+    assert [result["error"] for result in results] == [None, None, None]
+    assert results[0]["answers"] == ["3", "6"]
+    sent = built[0].inputs[0]
+    assert "tokens trimmed" in sent
+    assert len(sent) < len(oversized["input"]) // 10
+
+
+def test_batch_answer_unordered_returns_every_record(built):
+    records = list(enumerate(make_records(10)))
+    results = list(
+        batch_answer(records, AgentPool(size=4), concurrency=4, ordered=False)
+    )
+    assert sorted(result["line"] for result in results) == list(range(10))
+
+
+def test_run_batch_writes_jsonl_and_reports_errors(built):
+    lines = [json.dumps(record) for record in make_records(3)]
+    lines.insert(1, "not json")
+    lines.insert(2, "")
+    output = io.StringIO()
+
+    summary = run_batch(
+        io.StringIO("\n".join(lines)),
+        output,
+        AgentPool(size=2),
+        concurrency=2,
+        progress=False,
+    )
+
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [result["id"] for result in results] == ["q0", None, "q1", "q2"]
+    assert "Invalid JSON" in results[1]["error"]
+    assert summary["answered"] == 4
+    assert summary["errors"] == 1
+    assert summary["questions_per_second"] > 0
+    assert summary["latency_p95"] >= summary["latency_p50"]
+
+
+def test_resolve_batch_input_removes_ground_truth(tmp_path):
+    thread = {
+        "pre_text": ["revenue grew ."],
+        "table": [["", "2009"], ["net income", "$ 103102"]],
+        "id": "JKHY/2009/page_28.pdf-3",
+        "qa": {"question": "what was the net income in 2009?", "exe_ans": 103102},
+    }
+    data_path = tmp_path / "data.json"
+    data_path.write_text(json.dumps([{"id": "other"}, thread]))
+
+    from_reference = resolve_batch_input({"file_path": str(data_path), "index": 1})
+    inline = resolve_batch_input(dict(thread))
+    assert from_reference == inline
+    assert "exe_ans" not in json.dumps(inline)
+    assert "what was the net income in 2009?" in json.dumps(inline)
+
+    with pytest.raises(ValueError):
+        resolve_batch_input({"id": "empty"})
+
+
+def test_read_jsonl_wraps_plain_values():
+    records = list(read_jsonl(io.StringIO('"a question"\n\n{"input": "b"}\n')))
+    assert records == [(0, {"input": "a question"}), (2, {"input": "b"})]
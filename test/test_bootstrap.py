@@ -0,0 +1,95 @@
+import json
+import time
+
+import numpy as np
+import pytest
+
+from src.metrics.bootstrap import (
+    analyze_results,
+    bootstrap_ci,
+    load_results,
+    paired_bootstrap,
+    permutation_test,
+)
+
+
+def write_results(path, scores):
+    path.write_text(
+        json.dumps(
+            {
+                "accuracy_measurements": [s for sample in scores for s in sample[1]],
+                "sample_scores": [
+                    {
+                        "index": index,
+                        "accuracy_measurements": measurements,
+                        "numeric_errors": [0.1] * len(measurements),
+                        "llm_scores": measurements,
+                    }
+                    for index, measurements in scores
+                ],
+            }
+        )
+    )
+
+
+def test_bootstrap_ci_of_a_ratio():
+    result = bootstrap_ci([2, 0, 1, 1], [2, 1, 1, 2], resamples=2000)
+    assert result["estimate"] == pytest.approx(4 / 6)
+    assert 0 <= result["low"] < result["estimate"] < result["high"] <= 1
+    assert bootstrap_ci([], [])["estimate"] is None
+
+
+def test_paired_tests_detect_a_difference_quickly():
+    rng = np.random.default_rng(0)
+    b = rng.integers(0, 2, 300).astype(float)
+    a = np.maximum(b, rng.integers(0, 2, 300))
+
+    started = time.perf_counter()
+    paired = paired_bootstrap(a, b, resamples=10000)
+    p_value = permutation_test(a, b, resamples=10000)
+    assert time.perf_counter() - started < 1.0
+
+    assert paired["low"] > 0 and paired["p_value"] < 0.01
+    assert p_value < 0.01
+    assert permutation_test(b, b) == 1.0
+
+
+def test_analyze_results_pairs_samples_by_index(tmp_path):
+    write_results(
+        tmp_path / "metrics_model_react_20250101_000000.json",
+        [(1, [1, 1]), (2, [1]), (3, [0])],
+    )
+    write_results(
+        tmp_path / "metrics_model_json-chat_20250101_000000.json",
+        [(3, [0]), (2, [0]), (1, [1, 0])],
+    )
+    (tmp_path / "metrics_old_20250101_000000.json").write_text(
+        json.dumps({"accuracy_measurements": [1, 0, 1, 1, 0]})
+    )
+
+    configurations = load_results(str(tmp_path))
+    results = analyze_results(configurations, resamples=1000)
+
+    assert set(configurations) == {"model_react", "model_json-chat", "old"}
+    react = results["configurations"]["model_react"]
+    assert react["accuracy"]["estimate"] == 0.75
+    assert react["mae"]["estimate"] == pytest.approx(0.1)
+    assert results["configurations"]["old"]["mae"] is None
+    comparison = next(
+        c
+        for c in results["comparisons"]
+        if {c["a"], c["b"]} == {"model_react", "model_json-chat"}
+    )
+    assert comparison["samples"] == 3
+    assert abs(comparison["difference"]) == pytest.approx((0.5 + 1) / 3)
+    assert any("error" in c for c in results["comparisons"])
+
+
+def test_load_results_keeps_repeated_runs_of_a_configuration(tmp_path):
+    write_results(tmp_path / "metrics_model_react_20250101_000000.json", [(1, [1])])
+    write_results(tmp_path / "metrics_model_react_20250102_000000.json", [(1, [0])])
+
+    configurations = load_results(str(tmp_path))
+
+    assert set(configurations) == {"model_react", "model_react_20250102_000000"}
+    assert configurations["model_react"]["accuracy"][0].tolist() == [1.0]
@@ -4,6 +4,7 @@ from unittest.mock import patch
 
 # Import the function to test.
 from src.agent import chat
+from src.agent.chat import chat_turn
 
 
 # Dummy classes and a dummy builder to replace the real agent executor and memory.
@@ -70,6 +71,28 @@ class ChatFunctionTestCase(unittest.TestCase):
         )
         self.assertIn("Thank you for using the chat! Goodbye!", combined_output)
 
+    def test_chat_turn_trims_with_the_session_model(self):
+        memory = DummyMemory()
+        calls = []
+
+        def fake_trim(text, budget, provider, model):
+            calls.append((budget, provider, model))
+            return text[:8], True
+
+        with patch("src.agent.chat.trim_to_budget", fake_trim):
+            output = chat_turn(
+                DummyAgentExecutor(),
+                memory,
+                "a pasted document " * 100,
+                max_input_tokens=50,
+                provider="anthropic",
+                model="claude-3-5-haiku-latest",
+            )
+
+        self.assertEqual(calls, [(50, "anthropic", "claude-3-5-haiku-latest")])
+        self.assertEqual(output, "Echo: a pasted")
+        self.assertEqual(memory.chat_memory.messages[0].content, "a pasted")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,70 @@
+import random
+
+import pytest
+
+from src.metrics.compute_metrics import (
+    answer_arrays,
+    compute_single_sample_accuracy,
+    score_answer_arrays,
+    score_answers,
+)
+
+
+def reference_accuracy(expected_answers, actual_answers, tolerance=0.005):
+    # The scalar loop the vectorized scorer replaces.
+    accuracy_measurements = []
+    numeric_errors = []
+    for i in range(max(len(expected_answers), len(actual_answers))):
+        if i >= len(expected_answers) or i >= len(actual_answers):
+            accuracy_measurements.append(0)
+            continue
+        exp, act = expected_answers[i], actual_answers[i]
+        try:
+            error = abs(float(exp) - float(act))
+            numeric_errors.append(error)
+            accuracy_measurements.append(1 if error <= tolerance else 0)
+        except (ValueError, TypeError):
+            accuracy_measurements.append(1 if str(exp) == str(act) else 0)
+    return accuracy_measurements, numeric_errors
+
+
+def random_answers(rng):
+    values = ["1.5", "0.25", "yes", "no", 1.5, 0.2512, None, "-3", "abc"]
+    return [rng.choice(values) for _ in range(rng.randint(0, 4))]
+
+
+def test_compute_single_sample_accuracy_matches_the_scalar_loop():
+    rng = random.Random(0)
+    for _ in range(300):
+        expected, actual = random_answers(rng), random_answers(rng)
+        measurements, errors = reference_accuracy(expected, actual)
+        result = compute_single_sample_accuracy(expected, actual)
+        assert result["accuracy_measurements"] == measurements
+        assert result["numeric_errors"] == pytest.approx(errors)
+        assert result["mean_accuracy"] == (
+            sum(measurements) / len(measurements) if measurements else 0
+        )
+        assert (result["mae"] is None) == (not errors)
+
+
+def test_score_answers_for_a_whole_run():
+    scores = score_answers(
+        [["1", "2"], ["yes"], []],
+        [[1.001, 5], ["no", "x"], []],
+    )
+
+    assert scores["accuracy_measurements"] == [1, 0, 0, 0]
+    assert scores["sample_accuracy"] == [0.5, 0.0, 0.0]
+    assert scores["mean_accuracy"] == 0.25
+    assert scores["mae"] == pytest.approx(1.5005)
+    assert scores["mse"] == pytest.approx((0.001**2 + 9) / 2)
+    assert scores["relative_error"] == pytest.approx((0.001 + 1.5) / 2)
+    assert scores["position_accuracy"] == [0.5, 0.0]
+
+
+def test_answer_arrays_masks():
+    arrays = answer_arrays([["1", "yes"]], [[2.0]])
+    assert arrays["scored"].tolist() == [[True, True]]
+    assert arrays["paired"].tolist() == [[True, False]]
+    assert arrays["numeric"].tolist() == [[True, False]]
+    assert score_answer_arrays(arrays, tolerance=1.0)["accuracy_measurements"] == [1, 0]
@@ -0,0 +1,196 @@
+import json
+import threading
+
+import src.agent.agent_pool as agent_pool_module
+import src.metrics.accuracy as accuracy_module
+from src.agent.agent_pool import AgentPool
+from src.agent.batch import batch_answer
+from src.agent.template_solver import solve_thread
+from src.utils import (
+    context_hash,
+    extract_thread_details,
+    get_exact_answers,
+    group_threads_by_context,
+    serialize_context,
+    split_group_answers,
+    strip_group_label,
+)
+
+TABLE = [["", "2009", "2008"], ["net income", "100", "80"]]
+
+
+def thread(*questions, pre_text="annual report"):
+    return {
+        "pre_text": [pre_text],
+        "post_text": [],
+        "table": TABLE,
+        **{
+            f"qa_{i}": {"question": question, "exe_ans": 1.0}
+            for i, question in enumerate(questions)
+        },
+    }
+
+
+def without_answers(sample):
+    return get_exact_answers(extract_thread_details(sample))[1]
+
+
+def test_context_hash_ignores_questions():
+    assert context_hash(thread("a?")) == context_hash(thread("b?", "c?"))
+    assert context_hash(thread("a?")) != context_hash(thread("a?", pre_text="other"))
+
+
+def test_group_threads_by_context_keeps_each_dialogue_in_its_own_block():
+    threads = [
+        without_answers(thread("income 2009?", "change?")),
+        without_answers(thread("income 2009?", pre_text="other")),
+        without_answers(thread("change?", "income  2008?")),
+        without_answers(thread("income 2009?")),
+    ]
+
+    groups = group_threads_by_context(threads)
+
+    assert [group["indices"] for group in groups] == [[0, 2, 3], [1]]
+    merged = groups[0]
+    assert [item["question"] for item in merged["sample"]["qa"]] == [
+        "Thread 1, turn 1: income 2009?",
+        "Thread 1, turn 2: change?",
+        "Thread 2, turn 1: change?",
+        "Thread 2, turn 2: income 2008?",
+    ]
+    # The last thread is the start of the first dialogue: it shares its answer.
+    assert merged["question_map"] == [[0, 1], [2, 3], [0]]
+    assert split_group_answers(merged, ["100", "0.25", "0.2", "80"]) == [
+        ["100", "0.25"],
+        ["0.2", "80"],
+        ["100"],
+    ]
+    assert split_group_answers(merged, ["100"]) == [
+        ["100", None],
+        [None, None],
+        ["100"],
+    ]
+    # A thread alone is sent as it is.
+    assert groups[1]["sample"] is threads[1]
+    assert split_group_answers(groups[1], ["1", "2"]) == [["1", "2"]]
+
+
+def test_shared_follow_up_question_is_answered_per_thread():
+    threads = [
+        without_answers(
+            thread("what was revenue in 2019?", "what is the percent change?")
+        ),
+        without_answers(
+            thread("what was cost in 2019?", "what is the percent change?")
+        ),
+    ]
+
+    merged = group_threads_by_context(threads)[0]
+
+    assert merged["question_map"] == [[0, 1], [2, 3]]
+    answers = split_group_answers(merged, ["120", "0.2", "80", "0.1"])
+    assert answers == [["120", "0.2"], ["80", "0.1"]]
+    # Each follow-up stays after the earlier turns of its own thread in the prompt.
+    rendered = serialize_context(merged["sample"], "pipe")
+    assert rendered.index("Thread 2, turn 1: what was cost in 2019?") < rendered.index(
+        "Thread 2, turn 2: what is the percent change?"
+    )
+    assert (
+        strip_group_label(merged["sample"]["qa"][3]["question"])
+        == "what is the percent change?"
+    )
+
+
+def test_fast_path_reads_labelled_group_questions():
+    threads = [
+        without_answers(thread("what was the net income in 2009?")),
+        without_answers(thread("what was the net income in 2008?")),
+    ]
+    merged = group_threads_by_context(threads)[0]
+    assert solve_thread(merged["sample"])["answers"] == [100.0, 80.0]
+
+
+class CountingExecutor:
+    def __init__(self):
+        self.inputs = []
+
+    def invoke(self, inputs):
+        self.inputs.append(inputs["input"])
+        return {"output": "100, 0.25, 0.2, 80"}
+
+
+def test_batch_answer_groups_records_with_the_same_document(monkeypatch):
+    executors = []
+    lock = threading.Lock()
+
+    def fake_agent_executor_builder(**kwargs):
+        with lock:
+            executors.append(CountingExecutor())
+            return executors[-1], None
+
+    monkeypatch.setattr(
+        agent_pool_module, "agent_executor_builder", fake_agent_executor_builder
+    )
+    records = list(
+        enumerate(
+            [
+                {"id": "a", **thread("income 2009?", "change?")},
+                {"id": "text", "input": "question"},
+                {"id": "b", **thread("change?", "income 2008?")},
+            ]
+        )
+    )
+
+    results = list(
+        batch_answer(records, AgentPool(size=1), concurrency=1, group_contexts=True)
+    )
+
+    assert [result["id"] for result in results] == ["a", "text", "b"]
+    assert results[0]["answers"] == ["100", "0.25"]
+    assert results[2]["answers"] == ["0.2", "80"]
+    assert results[0]["group_size"] == results[2]["group_size"] == 2
+    assert "group_size" not in results[1]
+    # The shared document is sent once for both threads.
+    assert sum(len(executor.inputs) for executor in executors) == 2
+
+
+class GroupExecutor:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def invoke(self, input_data):
+        self.calls.append(input_data["input"])
+        return {"output": "100, 0.25, 0.2, 80"}
+
+
+def test_measure_accuracy_groups_samples(monkeypatch, tmp_path):
+    calls = []
+    monkeypatch.setattr(
+        accuracy_module,
+        "agent_executor_builder",
+        lambda *args, **kwargs: (GroupExecutor(calls), None),
+    )
+    monkeypatch.setattr(
+        accuracy_module,
+        "evaluate_answer",
+        lambda **kwargs: {"score": 1, "explanation": ""},
+    )
+    first = thread("income 2009?", "change?")
+    second = thread("change?", "income 2008?")
+    first["qa_0"]["exe_ans"], first["qa_1"]["exe_ans"] = 100, 0.25
+    second["qa_0"]["exe_ans"], second["qa_1"]["exe_ans"] = 0.2, 80
+    data_path = tmp_path / "data.json"
+    data_path.write_text(json.dumps([first, second]))
+
+    metrics = accuracy_module.measure_accuracy(
+        data_path=str(data_path),
+        model="gpt-4o",
+        provider="openai",
+        prompt_style="react",
+        number_samples=2,
+        verbose=False,
+        group_contexts=True,
+    )
+
+    assert len(calls) == 1
+    assert metrics["mean_accuracy"] == 1.0
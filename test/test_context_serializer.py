@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+from src.metrics.context_benchmark import benchmark_context_formats
+from src.utils.context_serializer import format_model_input, serialize_context
+
+
+@pytest.fixture
+def processed_sample():
+    return {
+        "pre_text": ["revenue grew 14% .", "revenue grew 14% .", "."],
+        "post_text": ["cash increased to $ 118251 .", "revenue grew 14% ."],
+        "table_ori": [["", "2009"], ["Net income", "$103,102"]],
+        "table": [["", "2009", "2008"], ["net income", "$ 103102", "$ 104222"]],
+        "id": "JKHY/2009/page_28.pdf-3",
+        "qa": [
+            {"qa_field": "qa_0", "question": "what was the net income in 2009?"},
+            {"qa_field": "qa_1", "question": "what was the net income in 2009?"},
+            {"qa_field": "qa_2", "question": "and in 2008?"},
+        ],
+    }
+
+
+def test_pipe_format_is_compact(processed_sample):
+    text = serialize_context(processed_sample, "pipe")
+
+    assert text.count("revenue grew 14% .") == 1
+    assert "net income | $ 103102 | $ 104222" in text
+    # table_ori duplicates table and is dropped.
+    assert "$103,102" not in text
+    assert "1. what was the net income in 2009?" in text
+    assert "2. and in 2008?" in text
+    assert "3." not in text
+    assert "'" not in text and "qa_field" not in text
+    assert len(text) < len(serialize_context(processed_sample, "repr"))
+
+
+def test_csv_and_json_formats(processed_sample):
+    csv_text = serialize_context(processed_sample, "csv")
+    assert "net income,$ 103102,$ 104222" in csv_text
+
+    compact = json.loads(serialize_context(processed_sample, "json"))
+    assert compact["table"][1][0] == "net income"
+    assert compact["questions"] == [
+        "what was the net income in 2009?",
+        "and in 2008?",
+    ]
+    assert compact["post_text"] == ["cash increased to $ 118251 ."]
+
+
+def test_repr_format_keeps_legacy_rendering(processed_sample):
+    assert serialize_context(processed_sample, "repr") == str(processed_sample)
+
+
+def test_table_ori_is_used_when_table_missing():
+    text = serialize_context({"table_ori": [["a", "b"], ["1", "2"]]}, "pipe")
+    assert "1 | 2" in text
+
+
+def test_invalid_format_raises(processed_sample):
+    with pytest.raises(ValueError):
+        serialize_context(processed_sample, "xml")
+
+
+def test_format_model_input_only_serializes_threads(processed_sample):
+    question = "extract the data at index 2 of /data/train.json"
+    assert format_model_input(question) == question
+
+    rendered = format_model_input(json.dumps(processed_sample))
+    assert rendered == serialize_context(processed_sample, "pipe")
+
+
+def test_benchmark_reports_reduction_against_repr(processed_sample):
+    results = benchmark_context_formats(
+        [processed_sample], tokenizers=[("anthropic", "claude-3-5-sonnet-20241022")]
+    )
+    formats = results["anthropic/claude-3-5-sonnet-20241022"]
+    assert formats["repr"]["reduction"] == 0
+    assert formats["pipe"]["reduction"] > 0.2
+    assert formats["pipe"]["exact"] is False
@@ -0,0 +1,121 @@
+import threading
+
+import pytest
+
+import src.agent as agent_package
+import src.agent.agent_pool as agent_pool_module
+from src.agent.chat import start_chat_session
+from src.daemon import (
+    DaemonClient,
+    DaemonError,
+    create_server,
+    daemon_available,
+    remote_direct_answer,
+)
+
+
+class DummyExecutor:
+    def invoke(self, inputs):
+        return {"output": "Answer1, Answer2"}
+
+
+class DummyChatMemory:
+    def __init__(self):
+        self.messages = []
+
+    def add_message(self, message):
+        self.messages.append(message)
+
+
+class DummyMemory:
+    def __init__(self):
+        self.chat_memory = DummyChatMemory()
+
+
+class DummyChatExecutor:
+    def __init__(self, memory):
+        self.memory = memory
+
+    def invoke(self, inputs):
+        # Human messages seen so far, including the current one.
+        turns = sum(
+            message.type == "human" for message in self.memory.chat_memory.messages
+        )
+        return {"output": f"turn {turns}: {inputs['input']}"}
+
+
+@pytest.fixture
+def daemon(monkeypatch, tmp_path):
+    built = {"executors": 0, "agents": 0}
+
+    def fake_agent_executor_builder(**kwargs):
+        built["executors"] += 1
+        return DummyExecutor(), None
+
+    def fake_chat_executor_builder(**kwargs):
+        assert kwargs["agent"] == "shared-agent"
+        memory = DummyMemory()
+        return DummyChatExecutor(memory), memory
+
+    def fake_agent_builder(**kwargs):
+        built["agents"] += 1
+        return "shared-agent"
+
+    monkeypatch.setattr(
+        agent_pool_module, "agent_executor_builder", fake_agent_executor_builder
+    )
+    monkeypatch.setitem(
+        start_chat_session.__globals__,
+        "agent_executor_builder",
+        fake_chat_executor_builder,
+    )
+    monkeypatch.setattr(agent_package, "agent_builder", fake_agent_builder)
+
+    socket_path = str(tmp_path / "agent.sock")
+    server = create_server(socket_path, pool_size=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield socket_path, built
+    server.shutdown()
+    server.server_close()
+
+
+def test_daemon_answers_and_reuses_executors(daemon):
+    socket_path, built = daemon
+    assert daemon_available(socket_path)
+
+    for _ in range(3):
+        answers = remote_direct_answer("What is the answer?", socket_path=socket_path)
+        assert answers == ["Answer1", " Answer2"]
+    assert built["executors"] == 1
+
+    remote_direct_answer("Again", socket_path=socket_path, model="gpt-4o-mini")
+    assert built["executors"] == 2
+
+
+def test_chat_memory_is_kept_per_connection(daemon):
+    socket_path, built = daemon
+    with DaemonClient(socket_path) as first, DaemonClient(socket_path) as second:
+        assert first.request("chat", input="hi")["output"] == "turn 1: hi"
+        assert first.request("chat", input="again")["output"] == "turn 2: again"
+        assert second.request("chat", input="hello")["output"] == "turn 1: hello"
+    assert built["agents"] == 1
+
+
+def test_errors_are_reported_to_the_client(daemon):
+    socket_path, _ = daemon
+    with DaemonClient(socket_path) as client:
+        with pytest.raises(DaemonError, match="Unknown operation"):
+            client.request("unknown")
+        # The connection stays usable after an error.
+        assert client.request("ping")["ok"]
+
+
+def test_daemon_not_available_without_server(tmp_path):
+    assert not daemon_available(str(tmp_path / "missing.sock"))
+
+
+def test_create_server_refuses_a_live_socket(daemon):
+    socket_path, _ = daemon
+    with pytest.raises(RuntimeError):
+        create_server(socket_path)
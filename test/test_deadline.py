@@ -0,0 +1,124 @@
+import asyncio
+import time
+
+from langchain.agents import AgentExecutor, create_react_agent
+from langchain_core.agents import AgentAction
+from langchain_core.language_models.fake import FakeListLLM
+from langchain_core.tools import Tool
+
+from src.agent.agent_builder import llm_builder
+from src.agent.deadline import (
+    Deadline,
+    ainvoke_with_deadline,
+    best_partial_answer,
+    invoke_with_deadline,
+)
+from src.agent.prompt_templates import prompt_selector
+
+
+def slow_calculator(expression):
+    time.sleep(0.3)
+    return "0.1414"
+
+
+def build_looping_executor(max_iterations=50, max_execution_time=None):
+    # The fake LLM keeps asking for the calculator, so only the deadline can stop the run.
+    llm = FakeListLLM(
+        responses=["Thought: compute\nAction: slow_calculator\nAction Input: 1 + 1"]
+        * 50
+    )
+    tools = [Tool(name="slow_calculator", description="slow", func=slow_calculator)]
+    prompt, agent_func = prompt_selector("react")
+    agent = agent_func(llm=llm, tools=tools, prompt=prompt)
+    return AgentExecutor(
+        agent=agent,
+        tools=tools,
+        max_iterations=max_iterations,
+        max_execution_time=max_execution_time,
+        verbose=False,
+    )
+
+
+class SleepingExecutor:
+    def invoke(self, inputs, config=None):
+        time.sleep(5)
+        return {"output": "too late"}
+
+
+def test_deadline_remaining_and_expired():
+    deadline = Deadline(0.05)
+    assert not deadline.expired()
+    assert 0 < deadline.remaining() <= 0.05
+    time.sleep(0.06)
+    assert deadline.expired()
+    assert deadline.remaining() == 0.0
+
+
+def test_best_partial_answer_prefers_last_numeric_observation():
+    steps = [
+        (AgentAction("arithmetic_calculator", "1 + 1", ""), "2.0"),
+        (AgentAction("arithmetic_calculator", "bad", ""), "Error in calculation"),
+        (AgentAction("extract_financial_informations", "{}", ""), "some text"),
+    ]
+    assert best_partial_answer(steps) == "2.0"
+    assert best_partial_answer([]) == ""
+
+
+def test_invoke_with_deadline_returns_partial_answer_from_completed_steps():
+    start = time.monotonic()
+    response = invoke_with_deadline(
+        build_looping_executor(), {"input": "question"}, timeout=1.0
+    )
+    elapsed = time.monotonic() - start
+
+    assert response["timed_out"] is True
+    assert response["output"] == "0.1414"
+    assert len(response["intermediate_steps"]) >= 1
+    assert elapsed < 1.5
+
+
+def test_invoke_with_deadline_does_not_wait_for_hung_executor():
+    start = time.monotonic()
+    response = invoke_with_deadline(SleepingExecutor(), {"input": "q"}, timeout=0.2)
+    assert time.monotonic() - start < 1.0
+    assert response["timed_out"] is True
+    assert response["output"] == ""
+
+
+def test_invoke_with_deadline_without_timeout_invokes_directly():
+    response = invoke_with_deadline(
+        build_looping_executor(max_iterations=2), {"input": "q"}
+    )
+    # Without a deadline the executor runs to its own iteration limit.
+    assert "timed_out" not in response
+
+
+def test_invoke_with_deadline_answers_when_the_executor_stops_first():
+    # The executor time limit expires before the deadline, as when both get the same timeout.
+    response = invoke_with_deadline(
+        build_looping_executor(max_execution_time=0.5), {"input": "q"}, timeout=5.0
+    )
+    assert response["timed_out"] is True
+    assert response["output"] == "0.1414"
+    assert response["output"].split(",") == ["0.1414"]
+
+
+def test_ainvoke_with_deadline_cancels_the_run():
+    response = asyncio.run(
+        ainvoke_with_deadline(build_looping_executor(), {"input": "q"}, timeout=0.5)
+    )
+    assert response["timed_out"] is True
+
+
+def test_llm_builder_forwards_request_timeout(monkeypatch):
+    captured = {}
+
+    def fake_chat_openai(**kwargs):
+        captured.update(kwargs)
+        return "llm"
+
+    monkeypatch.setitem(llm_builder.__globals__, "ChatOpenAI", fake_chat_openai)
+    llm_builder("gpt-4o", "openai", 0, request_timeout=12, max_retries=1)
+
+    assert captured["timeout"] == 12
+    assert captured["max_retries"] == 1
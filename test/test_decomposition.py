@@ -0,0 +1,96 @@
+import json
+import threading
+import time
+
+import src.metrics.accuracy as accuracy_module
+from src.agent.decomposition import answer_decomposed, split_questions
+from src.metrics.predictions import load_predictions
+
+SAMPLE = {
+    "pre_text": ["annual report"],
+    "post_text": [],
+    "table": [["", "2009", "2008"], ["net income", "100", "80"]],
+    "qa": [
+        {"qa_field": "qa_0", "question": "what was the net income in 2009?"},
+        {"qa_field": "qa_1", "question": "what was the change from 2008?"},
+    ],
+}
+
+
+def test_split_questions_shares_the_document():
+    sub_samples = split_questions(SAMPLE)
+
+    assert [sub["qa"][0]["question"] for sub in sub_samples] == [
+        "what was the net income in 2009?",
+        "what was the change from 2008?",
+    ]
+    assert all(sub["table"] is SAMPLE["table"] for sub in sub_samples)
+    single = {**SAMPLE, "qa": SAMPLE["qa"][:1]}
+    assert split_questions(single) == [single]
+
+
+def test_answer_decomposed_runs_concurrently_in_qa_order():
+    def answer_question(sub_sample):
+        question = sub_sample["qa"][0]["question"]
+        # The first question is the slowest: it must still come first.
+        time.sleep(0.3 if "2009" in question else 0.05)
+        return [100.0] if "2009" in question else [20.0, 1.0]
+
+    started = time.perf_counter()
+    answers = answer_decomposed(SAMPLE, answer_question)
+
+    assert answers == [100.0, 20.0]
+    assert time.perf_counter() - started < 0.34
+    assert answer_decomposed(SAMPLE, lambda sub_sample: []) == [None, None]
+
+
+class QuestionExecutor:
+    def __init__(self, threads):
+        self.threads = threads
+
+    def invoke(self, input_data):
+        self.threads.add(threading.get_ident())
+        first = "in 2009?" in input_data["input"]
+        # The first question finishes last.
+        time.sleep(0.2 if first else 0.05)
+        return {"output": "100" if first else "20"}
+
+
+def test_measure_accuracy_decomposes_samples(monkeypatch, tmp_path):
+    threads = set()
+    monkeypatch.setattr(
+        accuracy_module,
+        "agent_executor_builder",
+        lambda *args, **kwargs: (QuestionExecutor(threads), None),
+    )
+    monkeypatch.setattr(
+        accuracy_module,
+        "evaluate_answer",
+        lambda **kwargs: {"score": 1, "explanation": ""},
+    )
+    raw = {
+        "pre_text": SAMPLE["pre_text"],
+        "post_text": [],
+        "table": SAMPLE["table"],
+        "qa_0": {"question": "what was the net income in 2009?", "exe_ans": 100},
+        "qa_1": {"question": "what was the change from 2008?", "exe_ans": 20},
+    }
+    data_path = tmp_path / "data.json"
+    data_path.write_text(json.dumps([raw]))
+
+    metrics = accuracy_module.measure_accuracy(
+        data_path=str(data_path),
+        model="gpt-4o",
+        provider="openai",
+        prompt_style="react",
+        number_samples=1,
+        verbose=False,
+        decompose=True,
+        predictions_path=str(tmp_path / "predictions.json.gz"),
+    )
+
+    assert metrics["mean_accuracy"] == 1.0
+    assert len(threads) == 2
+    # The stored runs are in question order, not in completion order.
+    records, _ = load_predictions(str(tmp_path / "predictions.json.gz"))
+    assert records[0]["output"] == ["100", "20"]
@@ -0,0 +1,152 @@
+import asyncio
+import time
+
+import pytest
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from src.agent.agent_builder import agent_executor_builder, llm_builder
+from src.agent.agent_tools import tools
+from src.agent.hedging import HedgedChatModel
+from src.agent.instrumentation import AgentMetricsCallbackHandler
+
+
+class SlowChatModel(BaseChatModel):
+    answer: str
+    latency: float = 0.0
+    error: bool = False
+    cancelled: bool = False
+
+    @property
+    def _llm_type(self):
+        return "slow"
+
+    def _result(self):
+        if self.error:
+            raise ConnectionError(f"{self.answer} unavailable")
+        message = AIMessage(
+            content=self.answer,
+            usage_metadata={
+                "input_tokens": 100,
+                "output_tokens": 5,
+                "total_tokens": 105,
+            },
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        return self._result()
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        try:
+            await asyncio.sleep(self.latency)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return self._result()
+
+
+def hedged(primary, hedge, delay=0.05):
+    return HedgedChatModel(
+        primary=primary,
+        hedge=hedge,
+        hedge_delay=delay,
+        primary_model="gpt-4o",
+        hedge_model="gpt-4o-mini",
+    )
+
+
+def test_fast_primary_does_not_fire_a_hedge():
+    llm = hedged(SlowChatModel(answer="primary"), SlowChatModel(answer="hedge"))
+
+    message = llm.invoke("question")
+
+    assert message.content == "primary"
+    assert message.response_metadata["hedge"]["fired"] is False
+    assert llm.stats()["calls"] == 1
+    assert llm.stats()["hedges_fired"] == 0
+
+
+def test_slow_primary_loses_to_the_hedge():
+    llm = hedged(
+        SlowChatModel(answer="primary", latency=1.0), SlowChatModel(answer="hedge")
+    )
+
+    started = time.perf_counter()
+    message = llm.invoke("question")
+
+    assert time.perf_counter() - started < 0.5
+    assert message.content == "hedge"
+    record = message.response_metadata["hedge"]
+    assert record["reason"] == "delay" and record["winner"] == "hedge"
+    # The abandoned primary call is counted with its approximate prompt.
+    assert record["extra_prompt_tokens"] > 0
+    assert record["extra_cost_usd"] > 0
+    stats = llm.stats()
+    assert stats["hedge_wins"] == 1 and stats["hedge_win_rate"] == 1.0
+
+
+def test_failed_primary_fails_over_without_extra_cost():
+    llm = hedged(
+        SlowChatModel(answer="primary", error=True),
+        SlowChatModel(answer="hedge"),
+        delay=5,
+    )
+
+    message = llm.invoke("question")
+
+    assert message.content == "hedge"
+    record = message.response_metadata["hedge"]
+    assert record["reason"] == "error"
+    assert record["extra_prompt_tokens"] == 0
+    assert llm.stats()["failovers"] == 1
+
+
+def test_both_calls_failing_raises_the_primary_error():
+    llm = hedged(
+        SlowChatModel(answer="primary", error=True),
+        SlowChatModel(answer="hedge", error=True),
+    )
+
+    with pytest.raises(ConnectionError, match="primary"):
+        llm.invoke("question")
+
+
+def test_async_hedge_cancels_the_loser():
+    primary = SlowChatModel(answer="primary", latency=1.0)
+    llm = hedged(primary, SlowChatModel(answer="hedge", latency=0.01))
+
+    message = asyncio.run(llm.ainvoke("question"))
+
+    assert message.content == "hedge"
+    assert primary.cancelled
+
+
+def test_hedged_agent_is_recorded_by_the_instrumentation():
+    llm = llm_builder(
+        model="stub-1.0", provider="stub", temperature=0, hedge_delay=0.05
+    )
+    assert isinstance(llm, HedgedChatModel)
+
+    handler = AgentMetricsCallbackHandler()
+    executor, _ = agent_executor_builder(
+        model="stub-1.0",
+        provider="stub",
+        temperature=0,
+        tools=tools,
+        prompt_style="react",
+        verbose=False,
+        callbacks=[handler],
+        hedge_delay=0.05,
+        hedge_model="stub-0",
+    )
+    started = time.perf_counter()
+    response = executor.invoke({"input": "What is 2 + 2?"})
+
+    assert response["output"] == "42"
+    assert time.perf_counter() - started < 0.9
+    summary = handler.summary()
+    assert summary["hedges_fired"] == 1
+    assert summary["hedge_wins"] == 1
@@ -0,0 +1,108 @@
+import json
+
+from langchain.agents import AgentExecutor
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import Tool
+
+from src.agent.instrumentation import AgentMetricsCallbackHandler, estimate_cost
+from src.agent.prompt_templates import prompt_selector
+
+
+class UsageFakeChatModel(BaseChatModel):
+    # Implements only _generate, so the agent's streaming falls back to a single call
+    # and the usage metadata of each message reaches the callbacks unchanged.
+    responses: list
+
+    @property
+    def _llm_type(self):
+        return "usage-fake"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=self.responses.pop(0))])
+
+
+def ai_message(content, input_tokens=100, output_tokens=10):
+    return AIMessage(
+        content=content,
+        usage_metadata={
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        },
+    )
+
+
+def run_instrumented_agent(handler):
+    llm = UsageFakeChatModel(
+        responses=[
+            # Malformed output: triggers one parse-error retry.
+            ai_message("I think the answer is 4"),
+            ai_message(
+                "Thought: compute\nAction: arithmetic_calculator\nAction Input: 2 + 2"
+            ),
+            ai_message("Thought: done\nFinal Answer: 4.0", output_tokens=5),
+        ]
+    )
+    tools = [
+        Tool(
+            name="arithmetic_calculator",
+            description="calculator",
+            func=lambda expression: "4.0",
+        )
+    ]
+    prompt, agent_func = prompt_selector("react")
+    agent = agent_func(llm=llm, tools=tools, prompt=prompt)
+    executor = AgentExecutor(
+        agent=agent, tools=tools, handle_parsing_errors=True, verbose=False
+    ).with_config(callbacks=[handler])
+    return executor.invoke({"input": "What is 2 + 2?"})
+
+
+def test_handler_records_steps_tokens_and_parse_retries():
+    handler = AgentMetricsCallbackHandler(model="gpt-4o")
+    response = run_instrumented_agent(handler)
+
+    assert response["output"] == "4.0"
+    assert len(handler.samples) == 1
+    sample = handler.samples[0]
+    assert sample["iterations"] == 3
+    assert sample["parse_retries"] == 1
+    assert sample["prompt_tokens"] == 300
+    assert sample["completion_tokens"] == 25
+    assert "arithmetic_calculator" in sample["tool_time_by_tool"]
+    assert sample["wall_time"] >= sample["llm_time"]
+
+
+def test_summary_and_exports():
+    handler = AgentMetricsCallbackHandler(model="gpt-4o")
+    run_instrumented_agent(handler)
+    run_instrumented_agent(handler)
+
+    summary = handler.summary()
+    assert summary["samples"] == 2
+    assert summary["tokens_per_sample"] == 325
+    assert summary["latency_p50"] <= summary["latency_p95"]
+    assert summary["cost_usd"] == estimate_cost("gpt-4o", 600, 50)
+
+    lines = handler.to_jsonl().strip().split("\n")
+    assert len(lines) == 6
+    assert json.loads(lines[0])["sample"] == 0
+
+    prometheus = handler.to_prometheus()
+    assert 'agent_sample_latency_seconds{quantile="0.95"}' in prometheus
+    assert "agent_parse_retries_total 2" in prometheus
+    assert 'agent_tool_seconds_total{tool="arithmetic_calculator"}' in prometheus
+
+
+def test_summary_without_samples():
+    summary = AgentMetricsCallbackHandler().summary()
+    assert summary["samples"] == 0
+    assert summary["latency_p50"] is None
+
+
+def test_estimate_cost_matches_dated_snapshots():
+    assert estimate_cost("claude-3-5-sonnet-20241022", 1e6, 0) == 3.0
+    assert estimate_cost("gpt-4o-mini", 0, 1e6) == 0.6
+    assert estimate_cost("unknown-model", 10, 10) is None
@@ -85,3 +85,39 @@ def test_measure_accuracy_metric_calculations(monkeypatch):
     assert metrics["mean_accuracy"] == 1.0
     assert metrics["mae"] == 0.0
     assert metrics["mse"] == 0.0
+
+
+def test_compare_tool_descriptions_with_the_stub_model(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        accuracy_module,
+        "evaluate_answer",
+        lambda **kwargs: {"score": 1, "explanation": ""},
+    )
+    thread = {
+        "table": [["", "2009"], ["net income", "42"]],
+        "qa": {"question": "what was the net income in 2009?", "exe_ans": 42},
+    }
+    data_path = tmp_path / "data.json"
+    data_path.write_text(json.dumps([thread] * 3))
+
+    results = accuracy_module.compare_tool_descriptions(
+        str(data_path),
+        model="stub-0",
+        provider="stub",
+        prompt_style="react",
+        number_samples=3,
+        verbose=False,
+    )
+
+    assert (
+        results["verbose"]["mean_accuracy"]
+        == results["compact"]["mean_accuracy"]
+        == 1.0
+    )
+    assert (
+        results["compact"]["prompt_tokens_per_sample"]
+        < results["verbose"]["prompt_tokens_per_sample"]
+    )
+    assert results["prompt_token_reduction"] > 0
+    assert results["accuracy_difference"]["samples"] == 3
+    assert results["accuracy_difference"]["difference"] == 0.0
@@ -0,0 +1,164 @@
+import json
+
+import pytest
+from langchain.agents.output_parsers import ReActSingleInputOutputParser
+from langchain_core.agents import AgentAction, AgentFinish
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from src.agent.agent_builder import agent_executor_builder
+from src.agent.agent_tools import tools
+from src.agent.instrumentation import AgentMetricsCallbackHandler
+from src.agent.output_repair import (
+    RepairingOutputParser,
+    repair_json_output,
+    repair_react_output,
+    trim_final_answer,
+)
+
+TOOL_NAMES = [tool.name for tool in tools]
+
+
+class ScriptedChatModel(BaseChatModel):
+    responses: list
+    calls: int = 0
+
+    @property
+    def _llm_type(self):
+        return "scripted"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(self.responses.pop(0)))]
+        )
+
+
+def run_agent(monkeypatch, responses, prompt_style="react", repair_output=True):
+    llm = ScriptedChatModel(responses=responses)
+    monkeypatch.setitem(
+        agent_executor_builder.__globals__, "llm_builder", lambda **kwargs: llm
+    )
+    handler = AgentMetricsCallbackHandler()
+    executor, _ = agent_executor_builder(
+        model="gpt-4o",
+        provider="openai",
+        temperature=0,
+        tools=tools,
+        prompt_style=prompt_style,
+        verbose=False,
+        repair_output=repair_output,
+        callbacks=[handler],
+    )
+    response = executor.invoke({"input": "What is 2 + 2?"})
+    return response, llm, handler.summary()
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        (
+            "Thought: add\nAction: arithmetic_calculator(2 + 2)",
+            "Thought: add\nAction: arithmetic_calculator\nAction Input: 2 + 2",
+        ),
+        (
+            "Thought: use arithmetic_calculator\nAction Input: 2 + 2",
+            "Thought: use arithmetic_calculator\nAction: arithmetic_calculator\nAction Input: 2 + 2",
+        ),
+        (
+            "Thought: I now know the final answer\n(0.1234, yes)",
+            "Thought: I now know the final answer\nFinal Answer: (0.1234, yes)",
+        ),
+        (
+            "Action: arithmetic_calculator\nAction Input: 2 + 2\nFinal Answer: 4",
+            "Action: arithmetic_calculator\nAction Input: 2 + 2",
+        ),
+        ("**Final Answer:** 0.5", "Final Answer: 0.5"),
+    ],
+)
+def test_repair_react_output(text, expected):
+    assert repair_react_output(text, TOOL_NAMES) == expected
+
+
+def test_unrecoverable_react_output_is_not_repaired():
+    assert repair_react_output("I am not sure what to do.", TOOL_NAMES) is None
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        '```python\n{"action": "Final Answer", "action_input": "0.5"}\n```',
+        'Here you go: {"action": "final_answer", "action_input": "0.5",}',
+        "{'action': 'Final Answer', 'action_input': '0.5'}",
+        "0.5",
+    ],
+)
+def test_repair_json_output(text):
+    repaired = repair_json_output(text, TOOL_NAMES)
+    blob = json.loads(repaired.strip("`").removeprefix("json"))
+    assert blob == {"action": "Final Answer", "action_input": "0.5"}
+
+
+def test_plain_text_naming_a_tool_is_not_repaired():
+    assert repair_json_output("I will use arithmetic_calculator", TOOL_NAMES) is None
+
+
+@pytest.mark.parametrize(
+    "text", ["I need to look at the table first.", "I cannot answer that."]
+)
+def test_plain_text_that_is_not_an_answer_is_not_repaired(text):
+    assert repair_json_output(text, TOOL_NAMES) is None
+
+
+def test_trim_final_answer():
+    assert trim_final_answer("0.1234\n\nThe revenue grew by 12%.") == "0.1234"
+    assert trim_final_answer("It depends.\nSee above.") == "It depends.\nSee above."
+
+
+def test_react_agent_repairs_instead_of_retrying(monkeypatch):
+    responses = [
+        "Thought: add\n**Action:** arithmetic_calculator\n**Action Input:** 2 + 2",
+        "Thought: I now know the final answer\nFinal Answer: 4.0\n\nBecause 2 + 2 = 4.",
+    ]
+    response, llm, summary = run_agent(monkeypatch, list(responses))
+
+    assert response["output"] == "4.0"
+    assert llm.calls == 2
+    assert summary["output_repairs"] == 2
+    assert summary["parse_retries"] == 0
+
+    # Without the repair layer the malformed action costs an extra iteration.
+    broken = ["Thought: add\nAction: arithmetic_calculator(2 + 2)"] + responses[1:]
+    _, llm, summary = run_agent(
+        monkeypatch,
+        broken + ["Thought: I now know the final answer\nFinal Answer: 4.0"],
+        repair_output=False,
+    )
+    assert summary["parse_retries"] == 1
+    assert summary["output_repairs"] == 0
+
+
+def test_json_chat_agent_repairs_wrong_fence(monkeypatch):
+    response, llm, summary = run_agent(
+        monkeypatch,
+        [
+            '```python\n{"action": "arithmetic_calculator", "action_input": "2 + 2"}\n```',
+            '```json\n{"action": "Final Answer", "action_input": "4.0"}\n```',
+        ],
+        prompt_style="json-chat",
+    )
+    assert response["output"] == "4.0"
+    assert llm.calls == 2
+    assert summary["parse_retries"] == 0
+
+
+def test_parse_outside_a_run_still_repairs():
+    parser = RepairingOutputParser(
+        parser=ReActSingleInputOutputParser(),
+        grammar="react",
+        tool_names=TOOL_NAMES,
+    )
+    action = parser.parse("Action: arithmetic_calculator(1 + 1)")
+    assert isinstance(action, AgentAction) and action.tool_input == "1 + 1"
+    assert isinstance(parser.parse("Final Answer: 2\n\nDone."), AgentFinish)
@@ -0,0 +1,92 @@
+import json
+import random
+import threading
+import time
+
+import pytest
+
+import src.metrics.accuracy as accuracy_module
+from src.metrics.pipeline import run_pipeline
+
+
+def slow_identity(value):
+    time.sleep(0.05)
+    return value
+
+
+def test_run_pipeline_keeps_input_order():
+    stages = [("double", lambda x: 2 * x, 1), ("slow", slow_identity, 4)]
+    assert list(run_pipeline(range(10), stages)) == [2 * x for x in range(10)]
+
+
+def test_run_pipeline_stops_and_raises():
+    seen = []
+    for value in run_pipeline(range(1000), [("slow", slow_identity, 2)]):
+        seen.append(value)
+        if value == 2:
+            break
+    assert seen == [0, 1, 2]
+
+    def fail_on_three(value):
+        if value == 3:
+            raise ValueError("bad item")
+        return value
+
+    with pytest.raises(ValueError, match="bad item"):
+        list(run_pipeline(range(10), [("check", fail_on_three, 2)]))
+
+
+def test_measure_accuracy_overlaps_judge_with_agent(monkeypatch, tmp_path):
+    events = []
+    lock = threading.Lock()
+
+    def record(name):
+        with lock:
+            events.append((name, time.perf_counter()))
+
+    class SlowExecutor:
+        def invoke(self, input_data):
+            record("agent_start")
+            time.sleep(0.2)
+            record("agent_end")
+            return {"output": "100"}
+
+    def slow_judge(**kwargs):
+        record("judge_start")
+        time.sleep(0.2)
+        record("judge_end")
+        return {"score": 1, "explanation": ""}
+
+    monkeypatch.setattr(
+        accuracy_module,
+        "agent_executor_builder",
+        lambda *args, **kwargs: (SlowExecutor(), None),
+    )
+    monkeypatch.setattr(accuracy_module, "evaluate_answer", slow_judge)
+    thread = {
+        "table": [["", "2009"], ["net income", "100"]],
+        "qa": {"question": "what was the net income?", "exe_ans": 100},
+    }
+    data_path = tmp_path / "data.json"
+    data_path.write_text(json.dumps([thread] * 4))
+
+    metrics = accuracy_module.measure_accuracy(
+        data_path=str(data_path),
+        model="gpt-4o",
+        provider="openai",
+        prompt_style="react",
+        number_samples=4,
+        verbose=False,
+        stage_concurrency={"judge": 2},
+    )
+
+    assert metrics["mean_accuracy"] == 1.0
+    assert metrics["llm_average_score"] == 1
+    # The samples are aggregated in sampling order.
+    random.seed(42)
+    expected_order = random.sample(range(4), 4)
+    assert [sample["index"] for sample in metrics["sample_scores"]] == expected_order
+    # The first judge call starts before the second agent run ends.
+    first_judge = next(t for name, t in events if name == "judge_start")
+    second_agent_end = [t for name, t in events if name == "agent_end"][1]
+    assert first_judge < second_agent_end
@@ -0,0 +1,103 @@
+import json
+
+import src.metrics.accuracy as accuracy_module
+from src.metrics.predictions import load_predictions, rescore, save_predictions
+
+
+class StepsExecutor:
+    def invoke(self, input_data):
+        return {
+            "output": "100.3, Yes",
+            "intermediate_steps": [("not an action", "observation")],
+        }
+
+
+def run_with_predictions(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        accuracy_module,
+        "agent_executor_builder",
+        lambda *args, **kwargs: (StepsExecutor(), None),
+    )
+    monkeypatch.setattr(
+        accuracy_module,
+        "evaluate_answer",
+        lambda **kwargs: {"score": 1, "explanation": ""},
+    )
+    thread = {
+        "table": [["", "2009"], ["net income", "100"]],
+        "qa_0": {"question": "what was the net income?", "exe_ans": 100},
+        "qa_1": {"question": "did it grow?", "exe_ans": "yes"},
+    }
+    data_path = tmp_path / "data.json"
+    data_path.write_text(json.dumps([thread]))
+    predictions_path = str(tmp_path / "predictions.json.gz")
+    metrics = accuracy_module.measure_accuracy(
+        data_path=str(data_path),
+        model="gpt-4o",
+        provider="openai",
+        prompt_style="react",
+        number_samples=1,
+        verbose=False,
+        predictions_path=predictions_path,
+    )
+    return metrics, predictions_path
+
+
+def test_measure_accuracy_stores_predictions(monkeypatch, tmp_path):
+    metrics, predictions_path = run_with_predictions(monkeypatch, tmp_path)
+
+    records, metadata = load_predictions(predictions_path)
+    assert metadata["tolerance"] == 0.005
+    assert records[0]["expected"] == ["100", "yes"]
+    assert records[0]["raw_answers"] == ["100.3", " Yes"]
+    assert records[0]["answers"] == [100.3, "yes"]
+    assert records[0]["intermediate_steps"][0]["observation"] == "observation"
+    assert records[0]["llm_scores"] == [1, 1]
+
+    rescored = rescore(predictions_path)
+    assert rescored["mean_accuracy"] == metrics["mean_accuracy"] == 0.5
+    assert rescored["mae"] == metrics["mae"]
+    assert rescored["llm_average_score"] == 1.0
+
+
+def test_rescore_sweeps_tolerances_offline(monkeypatch, tmp_path):
+    _, predictions_path = run_with_predictions(monkeypatch, tmp_path)
+    # No model may be called from here on.
+    monkeypatch.setattr(accuracy_module, "agent_executor_builder", None)
+
+    results = rescore(
+        predictions_path,
+        tolerance=0.5,
+        tolerances=[0.001, 0.5],
+        modes=("absolute", "relative"),
+    )
+
+    assert results["mean_accuracy"] == 1.0
+    assert [r["mean_accuracy"] for r in results["sweep"]["absolute"]] == [0.5, 1.0]
+    # 0.3 off 100 is a 0.3% relative error.
+    assert [r["mean_accuracy"] for r in results["sweep"]["relative"]] == [0.5, 1.0]
+    assert (
+        rescore(predictions_path, tolerances=[0.004], modes=("relative",))["sweep"][
+            "relative"
+        ][0]["mean_accuracy"]
+        == 1.0
+    )
+
+
+def test_rescore_uses_the_current_normalization(tmp_path):
+    path = str(tmp_path / "predictions.json.gz")
+    save_predictions(
+        path,
+        [
+            {
+                "index": 0,
+                "expected": ["yes"],
+                "raw_answers": ["(Yes)"],
+                "answers": ["(yes)"],
+            }
+        ],
+        metadata={"tolerance": 0.005},
+    )
+
+    assert rescore(path)["mean_accuracy"] == 1.0
+    assert rescore(path, reparse=False)["mean_accuracy"] == 0.0
@@ -0,0 +1,133 @@
+import time
+
+import pytest
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from src.agent.agent_builder import agent_executor_builder
+from src.agent.agent_tools import safe_eval, tools
+from src.agent.instrumentation import AgentMetricsCallbackHandler
+from src.agent.program_solver import ProgramError, format_answer, run_program
+
+PROGRAM = """```python
+net_income_2009 = 103102  # table: net income, 2009
+net_income_2008 = 104222  # table: net income, 2008
+answer_2 = (net_income_2009 - net_income_2008) / net_income_2008
+answer_1 = net_income_2009
+answer_3 = net_income_2009 > net_income_2008
+```"""
+
+
+class ScriptedChatModel(BaseChatModel):
+    responses: list
+    calls: int = 0
+
+    @property
+    def _llm_type(self):
+        return "scripted"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(self.responses.pop(0)))]
+        )
+
+
+@pytest.fixture
+def scripted_llm(monkeypatch):
+    def install(responses):
+        llm = ScriptedChatModel(responses=responses)
+        monkeypatch.setitem(
+            agent_executor_builder.__globals__, "llm_builder", lambda **kwargs: llm
+        )
+        return llm
+
+    return install
+
+
+def build_program_executor(**kwargs):
+    executor, _ = agent_executor_builder(
+        model="gpt-4o",
+        provider="openai",
+        temperature=0,
+        tools=tools,
+        prompt_style="program",
+        verbose=False,
+        **kwargs,
+    )
+    return executor
+
+
+def test_safe_eval_accepts_arithmetic_only():
+    assert safe_eval("(8 - 4) / 2") == 2
+    assert safe_eval("abs(a - b) / b", {"a": 90, "b": 100}) == 0.1
+    assert safe_eval("a > b", {"a": 2, "b": 1}) is True
+    for expression in ('__import__("os")', "a.real", "[1, 2]", "2 ** 1000"):
+        with pytest.raises(ValueError):
+            safe_eval(expression, {"a": 1})
+    with pytest.raises(NameError):
+        safe_eval("missing + 1")
+
+
+def test_safe_eval_bounds_nested_powers():
+    assert safe_eval("(10 ** 100) ** 2") == 10**200
+    for expression in (
+        "((10 ** 100) ** 100) ** 100",
+        "(((10 ** 100) ** 100) ** 100) ** 100",
+        "(2 ** 100) ** 100 * 2",
+    ):
+        started = time.perf_counter()
+        with pytest.raises(ValueError):
+            safe_eval(expression)
+        assert time.perf_counter() - started < 0.1
+
+
+def test_safe_eval_rejects_arithmetic_on_strings_and_tuples():
+    for expression in ('"x" * 10 ** 9', '-"x"', "(1, 2) * 10 ** 9", 's + "y"'):
+        with pytest.raises(ValueError):
+            safe_eval(expression, {"s": "x"})
+    assert safe_eval('s == "yes"', {"s": "yes"}) is True
+
+
+def test_run_program_orders_answers():
+    answers = run_program(PROGRAM.strip("`").replace("python", "", 1))
+    assert [format_answer(answer) for answer in answers] == ["103102", "-0.0107", "no"]
+
+    with pytest.raises(ProgramError):
+        run_program("answer_1 = 1 / 0")
+    with pytest.raises(ProgramError):
+        run_program("Final Answer: 42")
+    with pytest.raises(ProgramError):
+        run_program("value = 3")
+
+
+def test_program_style_answers_in_one_llm_call(scripted_llm):
+    llm = scripted_llm([PROGRAM])
+    handler = AgentMetricsCallbackHandler()
+    executor = build_program_executor(callbacks=[handler])
+
+    response = executor.invoke({"input": "Questions:\n1. what was the net income?"})
+
+    assert response["output"] == "103102, -0.0107, no"
+    assert response["fallback_reason"] is None
+    assert llm.calls == 1
+    assert handler.summary()["samples"] == 1
+
+
+def test_program_style_falls_back_to_the_agent(scripted_llm):
+    llm = scripted_llm(
+        [
+            "I cannot write a program for this.",
+            "Thought: compute\nAction: arithmetic_calculator\nAction Input: 2 + 2",
+            "Thought: I now know the final answer\nFinal Answer: 4.0",
+        ]
+    )
+    executor = build_program_executor()
+
+    response = executor.invoke({"input": "What is 2 + 2?"})
+
+    assert response["output"] == "4.0"
+    assert "not an assignment" in response["fallback_reason"]
+    assert response["intermediate_steps"][0][1] == "4"
+    assert llm.calls == 3
@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+from src.utils.prompt_budget import (
+    DEFAULT_RESERVED_TOKENS,
+    paginate_threads,
+    prompt_budget,
+    trim_to_budget,
+)
+from src.utils.tokenizers import (
+    DEFAULT_CONTEXT_WINDOW,
+    context_window,
+    preflight_token_count,
+)
+
+THREAD = {
+    "pre_text": ["Net income grew by 12% in 2009."] * 20,
+    "post_text": ["Revenue was driven by new customers."],
+    "table": [["", "2009", "2008"], ["net income", "$ 120", "$ 107"]],
+    "qa": [{"question": "what was the change in net income?"}],
+}
+
+
+def test_context_window_matches_longest_prefix():
+    assert context_window("gpt-4o-mini-2024-07-18") == 128000
+    assert context_window("gemini-1.5-pro-002") == 2097152
+    assert context_window("unknown-model") == DEFAULT_CONTEXT_WINDOW
+    assert prompt_budget("gpt-4o") == 128000 - DEFAULT_RESERVED_TOKENS
+
+
+def test_preflight_overestimates_far_from_the_budget():
+    text = "The revenue of 2009 was $ 1,234 million. " * 100
+    estimate = preflight_token_count(text, budget=100000)
+    assert estimate >= len(text) / 4
+
+
+def test_preflight_is_microseconds_per_kilobyte():
+    text = "net income | 120 | 107\n" * 40000  # about 1 MB
+    runs = 1000
+    start = time.perf_counter()
+    for _ in range(runs):
+        preflight_token_count(text, budget=10**7)
+    seconds_per_kb = (time.perf_counter() - start) / runs / (len(text) / 1024)
+    assert seconds_per_kb < 5e-6
+
+
+def test_trim_to_budget_keeps_head_and_tail():
+    text = "Document start. " + "filler words " * 5000 + "Question: what is x?"
+    trimmed, was_trimmed = trim_to_budget(text, 500)
+    assert was_trimmed
+    assert trimmed.startswith("Document start.")
+    assert trimmed.endswith("Question: what is x?")
+    assert "tokens trimmed" in trimmed
+    assert preflight_token_count(trimmed, 500) <= 500
+
+
+def test_trim_to_budget_leaves_short_text_unchanged():
+    assert trim_to_budget("short question", 500) == ("short question", False)
+
+
+def test_trim_to_budget_raises_when_nothing_fits():
+    with pytest.raises(ValueError):
+        trim_to_budget("filler words " * 100, 5)
+
+
+def test_paginate_threads_fits_each_page():
+    pages = paginate_threads([THREAD] * 10, budget=600)
+    assert [position for page in pages for position in page] == list(range(10))
+    assert len(pages) > 1
+    # A thread larger than the budget gets a page of its own.
+    assert paginate_threads([THREAD] * 3, budget=10) == [[0], [1], [2]]
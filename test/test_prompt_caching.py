@@ -0,0 +1,84 @@
+import os
+
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from langchain_core.prompts import ChatPromptTemplate
+
+from src.agent.agent_tools import tools
+from src.agent.instrumentation import estimate_cost, extract_token_usage
+from src.agent.prompt_templates import (
+    CONTEXT_DELIMITER,
+    CachedPrefixChatPromptTemplate,
+    build_task_input,
+    enable_prompt_caching,
+    prompt_selector,
+)
+
+
+def render(prompt, context):
+    prompt = prompt.partial(
+        tools="\n".join(f"{tool.name}: {tool.description}" for tool in tools),
+        tool_names=", ".join(tool.name for tool in tools),
+    )
+    return prompt.format_messages(input=build_task_input(context), agent_scratchpad="")
+
+
+def test_static_prefix_is_byte_identical_across_samples():
+    prompt, _ = prompt_selector("react")
+    first = render(prompt, "Table:\na | 1")[0].content
+    second = render(prompt, "Table:\nb | 2")[0].content
+
+    prefix = os.path.commonprefix([first, second])
+    static_part = first[: first.index(CONTEXT_DELIMITER) + len(CONTEXT_DELIMITER)]
+    assert prefix.startswith(static_part)
+    # Tools, few-shot/format instructions and the system prompt are all in the prefix.
+    assert "arithmetic_calculator" in static_part
+    assert "FINAL ANSWER FORMAT REQUIREMENTS" in static_part
+
+
+def test_enable_prompt_caching_marks_the_static_prefix():
+    prompt, _ = prompt_selector("few-shot-CoT")
+    cached_prompt = enable_prompt_caching(prompt)
+    assert isinstance(cached_prompt, CachedPrefixChatPromptTemplate)
+
+    messages = render(cached_prompt, "Questions:\n1. what was the revenue?")
+    static_block, dynamic_block = messages[0].content
+    assert static_block["cache_control"] == {"type": "ephemeral"}
+    assert "Example of thought process 1" in static_block["text"]
+    assert "what was the revenue?" in dynamic_block["text"]
+    assert "cache_control" not in dynamic_block
+
+
+def test_enable_prompt_caching_without_delimiter_marks_system_message():
+    prompt = ChatPromptTemplate.from_messages(
+        [("system", "You are a financial assistant."), ("human", "{input}")]
+    )
+    messages = enable_prompt_caching(prompt).format_messages(input="hello")
+    assert messages[0].content[0]["cache_control"] == {"type": "ephemeral"}
+    assert messages[1].content == "hello"
+
+
+def test_enable_prompt_caching_leaves_other_prompts_unchanged():
+    assert enable_prompt_caching("dummy_prompt") == "dummy_prompt"
+
+
+def test_cached_tokens_are_reported_and_discounted():
+    message = AIMessage(
+        content="Final Answer: 1",
+        usage_metadata={
+            "input_tokens": 2000,
+            "output_tokens": 10,
+            "total_tokens": 2010,
+            "input_token_details": {"cache_read": 1500, "cache_creation": 0},
+        },
+    )
+    usage = extract_token_usage(
+        LLMResult(generations=[[ChatGeneration(message=message)]])
+    )
+    assert usage == {
+        "prompt_tokens": 2000,
+        "completion_tokens": 10,
+        "cache_read": 1500,
+        "cache_creation": 0,
+    }
+    assert estimate_cost("gpt-4o", 2000, 10, 1500) < estimate_cost("gpt-4o", 2000, 10)
@@ -26,10 +26,13 @@ def test_prompt_selector_valid_styles():
         assert prompt == mock_prompt
         assert agent_func == create_structured_chat_agent
 
-        # Test tools-agent style
+
+def test_prompt_selector_tools_agent_builds_the_prompt_locally():
+    with patch("src.agent.prompt_templates.hub.pull") as mock_hub:
         prompt, agent_func = prompt_selector("tools-agent")
-        assert prompt == mock_prompt
-        assert agent_func == create_tool_calling_agent
+    mock_hub.assert_not_called()
+    assert set(prompt.input_variables) == {"input", "agent_scratchpad"}
+    assert agent_func == create_tool_calling_agent
 
 
 def test_prompt_selector_json_chat_returns_custom_prompt():
@@ -0,0 +1,97 @@
+import json
+
+import src.metrics.accuracy as accuracy_module
+from src.agent.routing import consistency_failures, question_features, route_question
+
+TABLE = [
+    ["", "2009", "2008"],
+    ["net revenue", "1000", "900"],
+    ["net income", "100", "80"],
+]
+LOOKUP = {
+    "table": TABLE,
+    "qa": {"question": "what was the net income in 2009?", "exe_ans": 100},
+}
+CHANGE = {
+    "table": TABLE,
+    "qa_0": {"question": "what was the net income in 2009?", "exe_ans": 100},
+    "qa_1": {
+        "question": "what was the percentage change in net income from 2008 to 2009?",
+        "exe_ans": 0.25,
+    },
+}
+
+
+def test_question_features():
+    features = question_features(CHANGE)
+    assert features["qa_count"] == 2
+    assert features["table_references"] == 1
+    assert features["year_references"] == 2
+    assert features["complex_keywords"] >= 2
+
+
+def test_route_question():
+    assert route_question(LOOKUP)[0] == "cheap"
+    assert route_question(CHANGE)[0] == "expensive"
+
+
+def test_consistency_failures():
+    assert consistency_failures([100.0], LOOKUP) == []
+    assert consistency_failures([100.0, 25.0], CHANGE) == ["ratio_scale"]
+    assert consistency_failures([100.0, 0.25, 1.0], CHANGE) == ["answer_count"]
+    assert consistency_failures(["n/a"], LOOKUP) == ["not_an_answer"]
+    did = {"qa": {"question": "did the net income increase?"}}
+    assert consistency_failures([20.0], did) == ["yes_no"]
+
+
+class RoutedExecutor:
+    def __init__(self, output):
+        self.output = output
+
+    def invoke(self, input_data):
+        return {"output": self.output}
+
+
+def test_measure_accuracy_reports_routes(monkeypatch, tmp_path):
+    # The cheap model answers lookups with two values, which fails the answer count check.
+    outputs = {"cheap-model": "100, 1", "expensive-model": "100"}
+    built = []
+
+    def builder(*args, model, **kwargs):
+        built.append(model)
+        return RoutedExecutor(outputs[model]), None
+
+    monkeypatch.setattr(accuracy_module, "agent_executor_builder", builder)
+    monkeypatch.setattr(
+        accuracy_module,
+        "evaluate_answer",
+        lambda **kwargs: {"score": 1, "explanation": ""},
+    )
+    data_path = tmp_path / "data.json"
+    data_path.write_text(json.dumps([LOOKUP, LOOKUP]))
+
+    common = dict(
+        data_path=str(data_path),
+        model="expensive-model",
+        provider="openai",
+        prompt_style="react",
+        number_samples=2,
+        verbose=False,
+        cheap_model="cheap-model",
+    )
+    metrics = accuracy_module.measure_accuracy(**common)
+    assert built == ["cheap-model", "cheap-model"]
+    assert metrics["routes"]["cheap"]["samples"] == 2
+    assert metrics["routes"]["cheap"]["mean_accuracy"] == 0.5
+
+    built.clear()
+    metrics = accuracy_module.measure_accuracy(**common, cascade=True)
+    assert built == ["cheap-model", "expensive-model"] * 2
+    assert list(metrics["routes"]) == ["cascade"]
+    assert metrics["routes"]["cascade"]["mean_accuracy"] == 1.0
+    assert metrics["mean_accuracy"] == 1.0
+
+    assert (
+        accuracy_module.measure_accuracy(**{**common, "cheap_model": None})["routes"]
+        is None
+    )
@@ -0,0 +1,104 @@
+from langchain.agents import create_react_agent
+from langchain.agents.format_scratchpad import format_log_to_str
+from langchain_core.agents import AgentAction
+from langchain_core.language_models.fake import FakeListLLM
+from langchain_core.tools import Tool
+
+from src.agent.prompt_templates import prompt_selector
+from src.agent.scratchpad import (
+    OMITTED_OBSERVATION,
+    format_compact_scratchpad,
+    summarize_observation,
+    with_compact_scratchpad,
+)
+from src.utils.tokenizers import approximate_token_count
+
+THREAD = {
+    "pre_text": ["The company reported strong results."] * 5
+    + [
+        f"Filler sentence {word} about the business outlook."
+        for word in "abcdefghij" * 6
+    ]
+    + ["Net income grew by 12% in 2009."],
+    "post_text": ["Revenue was driven by new customers."],
+    "table": [
+        ["", "2009", "2008"],
+        ["net income", "$ 120", "$ 107"],
+        ["revenue", "900", "850"],
+    ],
+    "qa": [{"question": "what was the change in net income?"}],
+}
+
+
+def extraction_step(index):
+    return (
+        AgentAction(
+            "extract_financial_informations",
+            f"file {index}",
+            f"Action: extract {index}",
+        ),
+        [THREAD],
+    )
+
+
+def test_summarize_observation_keeps_table_and_numbers():
+    summary = summarize_observation([THREAD], max_tokens=60)
+    assert approximate_token_count(summary) < approximate_token_count(str([THREAD]))
+    assert "net income | $ 120 | $ 107" in summary
+    assert "Net income grew by 12% in 2009." in summary
+    assert "The company reported strong results." not in summary
+    assert "tokens omitted" in summary
+    # Small observations are not touched.
+    assert summarize_observation("0.1215", max_tokens=60) == "0.1215"
+
+
+def test_compact_scratchpad_respects_the_token_cap():
+    steps = [extraction_step(i) for i in range(6)] + [
+        (
+            AgentAction("arithmetic_calculator", "(120 - 107) / 107", "Action: calc"),
+            "0.1215",
+        )
+    ]
+    full = format_log_to_str(steps)
+    compact = format_compact_scratchpad(steps, observation_tokens=100, max_tokens=150)
+
+    assert approximate_token_count(compact) <= 150 < approximate_token_count(full)
+    assert compact.endswith("Observation: 0.1215\nThought: ")
+    assert OMITTED_OBSERVATION in compact
+    # Without large observations the scratchpad is the usual one.
+    short = steps[-1:]
+    assert format_compact_scratchpad(short) == format_log_to_str(short)
+
+
+def test_react_agent_prompt_uses_the_compact_scratchpad():
+    prompts = []
+
+    class RecordingLLM(FakeListLLM):
+        def _call(self, prompt, *args, **kwargs):
+            prompts.append(prompt)
+            return super()._call(prompt, *args, **kwargs)
+
+    llm = RecordingLLM(responses=["Thought: done\nFinal Answer: 0.1215"])
+    tools = [
+        Tool(
+            name="extract_financial_informations",
+            description="x",
+            func=lambda text: text,
+        )
+    ]
+    prompt, _ = prompt_selector("react")
+    agent = with_compact_scratchpad(
+        create_react_agent(llm=llm, tools=tools, prompt=prompt),
+        observation_tokens=50,
+        max_tokens=200,
+    )
+    agent.invoke(
+        {
+            "input": "question",
+            "intermediate_steps": [extraction_step(i) for i in range(4)],
+        }
+    )
+
+    assert (
+        approximate_token_count(prompts[0]) < approximate_token_count(str([THREAD])) * 2
+    )
@@ -0,0 +1,97 @@
+import json
+
+import pytest
+
+import src.metrics.accuracy as accuracy_module
+from src.metrics.sequential import (
+    compare_sequentially,
+    stopping_reason,
+    wilson_interval,
+)
+
+
+def test_wilson_interval():
+    low, high = wilson_interval(80, 100)
+    assert low == pytest.approx(0.7112, abs=1e-4)
+    assert high == pytest.approx(0.8666, abs=1e-4)
+    assert wilson_interval(0, 0) == (0.0, 1.0)
+    assert wilson_interval(5, 5)[1] == 1.0
+
+
+def test_stopping_reason():
+    assert stopping_reason((0.6, 0.7), target_width=0.2) == "target_width"
+    assert stopping_reason((0.6, 0.9), decision_threshold=0.5) == "above_threshold"
+    assert stopping_reason((0.1, 0.4), decision_threshold=0.5) == "below_threshold"
+    assert stopping_reason((0.4, 0.9), target_width=0.2, decision_threshold=0.5) is None
+    assert stopping_reason(None, target_width=1.0) is None
+
+
+def test_compare_sequentially_stops_once_configurations_separate():
+    samples = [([str(i)], {"index": i}) for i in range(500)]
+    scored = []
+
+    def score_a(exact_answers, sample):
+        scored.append(sample["index"])
+        return 1.0 if sample["index"] % 10 else 0.0
+
+    def score_b(exact_answers, sample):
+        return 1.0 if sample["index"] % 2 else 0.0
+
+    results = compare_sequentially(samples, score_a, score_b, min_samples=10)
+
+    assert results["decision"] == "a"
+    assert results["reason"] == "above_threshold"
+    assert results["samples"] < 100
+    assert len(scored) == results["samples"] == len(results["trace"])
+    assert results["interval"][0] > 0
+
+
+class Executor:
+    def invoke(self, input_data):
+        return {"output": "1.0"}
+
+
+def test_measure_accuracy_stops_early(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        accuracy_module,
+        "agent_executor_builder",
+        lambda *args, **kwargs: (Executor(), None),
+    )
+    monkeypatch.setattr(
+        accuracy_module,
+        "evaluate_answer",
+        lambda **kwargs: {"score": 1, "explanation": ""},
+    )
+    data = [
+        {"table": [["a", str(i)]], "qa": {"question": "q?", "exe_ans": 1.0}}
+        for i in range(100)
+    ]
+    data_path = tmp_path / "data.json"
+    data_path.write_text(json.dumps(data))
+
+    metrics = accuracy_module.measure_accuracy(
+        data_path=str(data_path),
+        model="gpt-4o",
+        provider="openai",
+        prompt_style="react",
+        number_samples=100,
+        verbose=False,
+        decision_threshold=0.6,
+        min_samples=5,
+    )
+
+    stopping = metrics["stopping"]
+    assert stopping["reason"] == "above_threshold"
+    assert stopping["samples"] == len(metrics["accuracy_measurements"]) < 100
+    assert stopping["trace"][-1]["low"] > 0.6
+    assert (
+        accuracy_module.measure_accuracy(
+            data_path=str(data_path),
+            model="gpt-4o",
+            provider="openai",
+            prompt_style="react",
+            number_samples=2,
+            verbose=False,
+        )["stopping"]
+        is None
+    )
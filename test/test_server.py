@@ -0,0 +1,174 @@
+import asyncio
+import json
+import time
+
+from src.agent import tools
+from src.metrics.load_test import run_load_test
+from src.server import AgentServer
+
+
+def make_server(latency=0.05, **kwargs):
+    # The stub provider answers offline: the whole agent stack runs without network.
+    return AgentServer(
+        executor_kwargs={
+            "model": f"stub-{latency}",
+            "provider": "stub",
+            "temperature": 0,
+            "tools": tools,
+            "prompt_style": "react",
+            "handle_parsing_errors": True,
+            "verbose": False,
+        },
+        chat_prompt_style="json-chat",
+        **kwargs,
+    )
+
+
+def post(server, path, payload=None):
+    return server.handle_request("POST", path, json.dumps(payload or {}).encode())
+
+
+def test_answer_endpoint_and_metrics():
+    server = make_server()
+
+    async def scenario():
+        status, payload, _ = await post(server, "/answer", {"input": "What is 2+2?"})
+        assert (status, payload) == (200, {"answers": ["42"]})
+
+        status, payload, _ = await post(server, "/answer", {"question": "?"})
+        assert status == 400
+
+        status, payload, _ = await server.handle_request("GET", "/answer")
+        assert status == 405
+
+        return await server.handle_request("GET", "/metrics")
+
+    status, text, _ = asyncio.run(scenario())
+    assert status == 200
+    assert 'agent_http_requests_total{endpoint="/answer",status="200"} 1' in text
+    assert 'agent_http_request_seconds{endpoint="/answer",quantile="0.95"}' in text
+    assert 'agent_pool_executors{state="idle"} 1' in text
+
+
+def test_direct_answers_run_concurrently_on_the_pool():
+    server = make_server(latency=0.3, pool_size=4)
+
+    async def scenario():
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(post(server, "/answer", {"input": f"q{i}"}) for i in range(4))
+        )
+        return time.perf_counter() - started, results
+
+    elapsed, results = asyncio.run(scenario())
+    assert all(status == 200 for status, _, _ in results)
+    assert elapsed < 4 * 0.3
+    assert server.pool.stats()["built"] == 4
+
+
+def test_backpressure_rejects_beyond_max_pending():
+    server = make_server(latency=0.3, pool_size=1, max_pending=1)
+
+    async def scenario():
+        return await asyncio.gather(
+            post(server, "/answer", {"input": "first"}),
+            post(server, "/answer", {"input": "second"}),
+        )
+
+    statuses = sorted(result[0] for result in asyncio.run(scenario()))
+    assert statuses == [200, 503]
+    assert "agent_http_rejected_total 1" in server.metrics()
+
+
+def test_batch_endpoint():
+    server = make_server()
+    records = [{"id": "a", "input": "q1"}, {"id": "b", "input": "q2"}, {"x": 1}]
+    status, payload, _ = asyncio.run(post(server, "/batch", {"records": records}))
+    assert status == 200
+    assert [result["id"] for result in payload["results"]] == ["a", "b", None]
+    assert payload["results"][0]["answers"] == ["42"]
+    assert payload["results"][2]["error"]
+
+
+def test_chat_sessions_keep_their_own_memory():
+    server = make_server()
+
+    async def scenario():
+        _, first, _ = await post(server, "/sessions")
+        _, second, _ = await post(server, "/sessions")
+        first_path = f"/sessions/{first['session_id']}/messages"
+        second_path = f"/sessions/{second['session_id']}/messages"
+
+        for message in ("hi", "and then?"):
+            status, payload, _ = await post(server, first_path, {"input": message})
+            assert (status, payload["output"]) == (200, "42")
+        await post(server, second_path, {"input": "hello"})
+
+        histories = [
+            [
+                message.content
+                for message in server._sessions[session["session_id"]][
+                    "memory"
+                ].chat_memory.messages
+                if message.type == "human"
+            ]
+            for session in (first, second)
+        ]
+
+        status, _, _ = await server.handle_request(
+            "DELETE", f"/sessions/{first['session_id']}"
+        )
+        assert status == 200
+        status, _, _ = await post(server, first_path, {"input": "still there?"})
+        assert status == 404
+        return histories
+
+    first_history, second_history = asyncio.run(scenario())
+    assert "hi" in first_history and "and then?" in first_history
+    assert "hi" not in second_history and "hello" in second_history
+
+
+def test_chat_turn_times_out():
+    server = make_server(latency=1.5, request_timeout=0.1)
+
+    async def scenario():
+        _, session, _ = await post(server, "/sessions")
+        return await post(
+            server, f"/sessions/{session['session_id']}/messages", {"input": "hi"}
+        )
+
+    status, payload, _ = asyncio.run(scenario())
+    assert status == 504
+    assert "agent_http_timeouts_total 1" in server.metrics()
+
+
+def test_timed_out_work_keeps_its_admission_slot():
+    server = make_server(latency=1.5, request_timeout=0.1, max_pending=1)
+
+    async def scenario():
+        _, session, _ = await post(server, "/sessions")
+        path = f"/sessions/{session['session_id']}/messages"
+        timed_out = await post(server, path, {"input": "hi"})
+        # The timed-out turn is still running in its worker: no slot is free yet.
+        rejected = await post(server, "/answer", {"input": "q"})
+        for _ in range(100):
+            if server._pending == 0:
+                break
+            await asyncio.sleep(0.1)
+        return timed_out[0], rejected[0], server._pending
+
+    assert asyncio.run(scenario()) == (504, 503, 0)
+
+
+def test_load_test_over_http():
+    server = make_server(latency=0.01, pool_size=4)
+
+    async def scenario():
+        http_server = await server.start("127.0.0.1", 0)
+        port = http_server.sockets[0].getsockname()[1]
+        async with http_server:
+            return await run_load_test(port=port, requests=20, concurrency=8)
+
+    results = asyncio.run(scenario())
+    assert results["status_counts"] == {"200": 20}
+    assert results["requests_per_second"] > 0
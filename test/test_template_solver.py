@@ -0,0 +1,104 @@
+import json
+
+import src.metrics.accuracy as accuracy_module
+from src.agent.instant_answer import direct_answer
+from src.agent.template_solver import parse_cell, solve_question, solve_thread
+
+TABLE = [
+    ["", "2009", "2008"],
+    ["net revenue", "$ 1,000", "$ 900"],
+    ["net income", "100", "80"],
+    ["other expenses", "( 50 )", "40"],
+    ["total revenue", "2000", "1800"],
+]
+
+
+def test_parse_cell():
+    assert parse_cell("$ 1,234.5") == 1234.5
+    assert parse_cell("( 12 )") == -12.0
+    assert parse_cell("12.5%") == 12.5
+    assert parse_cell("n/a") is None
+
+
+def test_solve_question_templates():
+    cases = {
+        "what was the percentage change in net income from 2008 to 2009?": 0.25,
+        "what was the change in net revenue from 2008 to 2009?": 100.0,
+        "what was the difference in net income between 2009 and 2008?": 20.0,
+        "net revenue as a percentage of total revenue in 2009?": 0.5,
+        "what were the other expenses in 2009?": -50.0,
+    }
+    for question, answer in cases.items():
+        solution = solve_question(question, TABLE)
+        assert solution["answer"] == answer, question
+        assert solution["confidence"] >= 0.8
+
+    assert solve_question("what about in 2008?", TABLE) is None
+    # A row that only roughly matches is answered with a low confidence.
+    assert solve_question("what was the income in 2008?", TABLE)["confidence"] < 0.8
+
+
+def test_solve_thread_is_all_or_nothing():
+    thread = {
+        "table": TABLE,
+        "qa_0": {"question": "what was the net income in 2009?"},
+        "qa_1": {"question": "what was the percentage change from 2008?"},
+    }
+    assert solve_thread(thread) is None
+    thread["qa_1"]["question"] = "what was the net income in 2008?"
+    assert solve_thread(thread)["answers"] == [100.0, 80.0]
+
+
+def test_direct_answer_fast_path_skips_the_agent(monkeypatch):
+    def fail(**kwargs):
+        raise AssertionError("the agent must not be built")
+
+    monkeypatch.setitem(direct_answer.__globals__, "agent_executor_builder", fail)
+    thread = {"table": TABLE, "qa": {"question": "what was the net income in 2008?"}}
+
+    assert direct_answer(json.dumps(thread), fast_path=True, verbose=False) == ["80.0"]
+
+
+class EchoExecutor:
+    def invoke(self, input_data):
+        return {"output": "1"}
+
+
+def test_measure_accuracy_reports_the_fast_path(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        accuracy_module,
+        "agent_executor_builder",
+        lambda *args, **kwargs: (EchoExecutor(), None),
+    )
+    monkeypatch.setattr(
+        accuracy_module,
+        "evaluate_answer",
+        lambda **kwargs: {"score": 1, "explanation": ""},
+    )
+    data = [
+        {
+            "table": TABLE,
+            "qa": {"question": "what was the net income in 2008?", "exe_ans": 80},
+        },
+        {"table": TABLE, "qa": {"question": "and what about 2009?", "exe_ans": 100}},
+    ]
+    data_path = tmp_path / "data.json"
+    data_path.write_text(json.dumps(data))
+
+    metrics = accuracy_module.measure_accuracy(
+        data_path=str(data_path),
+        model="gpt-4o",
+        provider="openai",
+        prompt_style="react",
+        number_samples=2,
+        verbose=False,
+        fast_path=True,
+    )
+
+    assert metrics["fast_path"] == {
+        "samples": 2,
+        "answered": 1,
+        "coverage": 0.5,
+        "mean_accuracy": 1.0,
+    }
+    assert metrics["mean_accuracy"] == 0.5
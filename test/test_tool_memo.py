@@ -0,0 +1,119 @@
+import asyncio
+
+from langchain.agents import create_react_agent
+from langchain.agents.agent import RunnableMultiActionAgent
+from langchain_core.agents import AgentAction, AgentFinish
+from langchain_core.language_models.fake import FakeListLLM
+from langchain_core.runnables import RunnableLambda
+from langchain_core.tools import Tool
+
+from src.agent.prompt_templates import prompt_selector
+from src.agent.tool_memo import MemoizingAgentExecutor, normalize_tool_input
+
+
+def build_executor(responses, calls, loop_limit=2):
+    def calculator(expression):
+        calls.append(expression)
+        return "0.1414"
+
+    llm = FakeListLLM(responses=responses)
+    tools = [Tool(name="calculator", description="Computes.", func=calculator)]
+    prompt, _ = prompt_selector("react")
+    agent = create_react_agent(llm=llm, tools=tools, prompt=prompt)
+    return MemoizingAgentExecutor(
+        agent=agent,
+        tools=tools,
+        max_iterations=10,
+        verbose=False,
+        return_intermediate_steps=True,
+        loop_limit=loop_limit,
+    )
+
+
+def test_normalize_tool_input():
+    assert normalize_tool_input("2 + 3") == normalize_tool_input("2+3")
+    assert normalize_tool_input("```\n(1 - 2) / 2\n```") == "(1-2)/2"
+    assert normalize_tool_input('{"b": 1, "a": 2}') == normalize_tool_input(
+        {"a": 2, "b": 1}
+    )
+    assert normalize_tool_input("1 + 1") != normalize_tool_input("1 + 2")
+
+
+def test_repeated_call_is_memoized_with_a_note():
+    calls = []
+    executor = build_executor(
+        [
+            "Thought: compute\nAction: calculator\nAction Input: 1 + 1",
+            "Thought: again\nAction: calculator\nAction Input: 1+1",
+            "Thought: done\nFinal Answer: 0.1414",
+        ],
+        calls,
+    )
+    response = executor.invoke({"input": "question"})
+
+    assert calls == ["1 + 1"]
+    assert response["output"] == "0.1414"
+    observations = [observation for _, observation in response["intermediate_steps"]]
+    assert observations[0] == "0.1414"
+    assert observations[1].startswith("0.1414\nNote: calculator was already called")
+
+
+def test_loop_stops_with_the_best_partial_answer():
+    calls = []
+    executor = build_executor(
+        ["Thought: compute\nAction: calculator\nAction Input: 1 + 1"] * 10, calls
+    )
+    response = executor.invoke({"input": "question"})
+
+    # One real call, one memoized repeat, then the run stops instead of looping 10 times.
+    assert calls == ["1 + 1"]
+    assert len(response["intermediate_steps"]) == 2
+    assert response["output"] == "0.1414"
+
+    calls.clear()
+    executor = build_executor(
+        ["Thought: compute\nAction: calculator\nAction Input: 1 + 1"] * 10, calls
+    )
+    response = asyncio.run(executor.ainvoke({"input": "question"}))
+    assert calls == ["1 + 1"]
+    assert len(response["intermediate_steps"]) == 2
+
+
+def test_loop_in_a_multi_action_turn_stops_the_run():
+    calls = []
+    turns = [
+        [AgentAction("calculator", "2+3", "calc 2+3")],
+        [AgentAction("calculator", "2 + 3", "calc 2+3 again")],
+        # A parallel turn whose second action is looped, as with native tool calling.
+        [
+            AgentAction("calculator", "new1", "calc new1"),
+            AgentAction("calculator", "2+3", "calc 2+3 once more"),
+        ],
+        AgentFinish({"output": "never reached"}, ""),
+    ]
+
+    def calculator(expression):
+        calls.append(expression)
+        return "5"
+
+    def build():
+        remaining = list(turns)
+        agent = RunnableMultiActionAgent(
+            runnable=RunnableLambda(lambda inputs: remaining.pop(0)),
+            stream_runnable=False,
+        )
+        tools = [Tool(name="calculator", description="Computes.", func=calculator)]
+        return MemoizingAgentExecutor(
+            agent=agent, tools=tools, return_intermediate_steps=True
+        )
+
+    response = build().invoke({"input": "question"})
+    # The looped turn ends the run before any of its actions is performed.
+    assert calls == ["2+3"]
+    assert len(response["intermediate_steps"]) == 2
+    assert response["output"] == "5.0"
+
+    calls.clear()
+    response = asyncio.run(build().ainvoke({"input": "question"}))
+    assert calls == ["2+3"]
+    assert response["output"] == "5.0"
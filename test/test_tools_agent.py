@@ -0,0 +1,136 @@
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from src.agent.agent_builder import agent_executor_builder
+from src.agent.agent_tools import tool_calling_tools, tools
+from src.agent.instrumentation import AgentMetricsCallbackHandler
+from src.metrics.compute_metrics import parse_agent_output
+from src.metrics.style_benchmark import benchmark_prompt_styles
+
+
+class ToolCallingChatModel(BaseChatModel):
+    responses: list
+    bound_tools: list = []
+    received: list = []
+
+    @property
+    def _llm_type(self):
+        return "tool-calling"
+
+    def bind_tools(self, tools, **kwargs):
+        self.bound_tools = [convert_to_openai_tool(tool) for tool in tools]
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.received.append(messages)
+        return ChatResult(generations=[ChatGeneration(message=self.responses.pop(0))])
+
+
+def fail_hub_pull(monkeypatch):
+    # The tools-agent prompt is built locally: pulling from the hub would need the network.
+    from src.agent import prompt_templates
+
+    def pull(hub_id):
+        raise AssertionError(f"Unexpected hub pull of {hub_id}")
+
+    monkeypatch.setattr(prompt_templates.hub, "pull", pull)
+
+
+def test_tool_calling_tools_have_json_schemas():
+    converted = tool_calling_tools(tools)
+    assert [tool.name for tool in converted] == [tool.name for tool in tools]
+
+    schemas = {
+        schema["function"]["name"]: schema["function"]["parameters"]
+        for schema in map(convert_to_openai_tool, converted)
+    }
+    assert schemas["arithmetic_calculator"]["required"] == ["expression"]
+    assert "indexes" in schemas["extract_financial_informations"]["properties"]
+    assert converted[0].invoke({"expression": "(10 / 4) + 2.5"}) == "5.0"
+    # Already converted tools are left as they are.
+    assert tool_calling_tools(converted) == converted
+
+
+def test_tools_agent_runs_parallel_tool_calls_in_one_turn(monkeypatch):
+    fail_hub_pull(monkeypatch)
+    llm = ToolCallingChatModel(
+        responses=[
+            AIMessage(
+                content="",
+                tool_calls=[
+                    {
+                        "name": "arithmetic_calculator",
+                        "args": {"expression": "2 + 2"},
+                        "id": "call_1",
+                    },
+                    {
+                        "name": "arithmetic_calculator",
+                        "args": {"expression": "10 / 4"},
+                        "id": "call_2",
+                    },
+                ],
+            ),
+            AIMessage(content="4.0, 2.5"),
+        ]
+    )
+    monkeypatch.setitem(
+        agent_executor_builder.__globals__, "llm_builder", lambda **kwargs: llm
+    )
+    handler = AgentMetricsCallbackHandler()
+    executor, _ = agent_executor_builder(
+        model="gpt-4o",
+        provider="openai",
+        temperature=0,
+        tools=tools,
+        prompt_style="tools-agent",
+        verbose=False,
+        callbacks=[handler],
+    )
+
+    response = executor.invoke({"input": "What are 2 + 2 and 10 / 4?"})
+
+    assert response["output"] == "4.0, 2.5"
+    assert [step[1] for step in response["intermediate_steps"]] == ["4", "2.5"]
+    assert {tool["function"]["name"] for tool in llm.bound_tools} == {
+        "arithmetic_calculator",
+        "extract_financial_informations",
+    }
+    # Both tool results are sent back in the second (and last) LLM turn.
+    tool_messages = [m for m in llm.received[1] if isinstance(m, ToolMessage)]
+    assert [m.tool_call_id for m in tool_messages] == ["call_1", "call_2"]
+    summary = handler.summary()
+    assert summary["iterations_per_sample"] == 2
+    assert summary["parse_retries"] == 0
+
+
+def test_parse_agent_output():
+    assert parse_agent_output("0.12345, (Yes)") == [0.1235, "yes"]
+    assert parse_agent_output([{"type": "text", "text": " 2 "}]) == [2.0]
+    assert parse_agent_output(None) == []
+
+
+def test_benchmark_prompt_styles_with_stub(monkeypatch):
+    fail_hub_pull(monkeypatch)
+    samples = [
+        (["42"], {"pre_text": "", "post_text": "", "table": [], "qa": "q?"}),
+        (["41"], {"pre_text": "", "post_text": "", "table": [], "qa": "q?"}),
+    ]
+
+    results = benchmark_prompt_styles(
+        samples,
+        model="stub-0",
+        provider="stub",
+        styles=("react", "json-chat", "tools-agent", "unknown"),
+    )
+
+    for style in ("react", "json-chat", "tools-agent"):
+        assert results[style]["error"] is None
+        assert results[style]["mean_accuracy"] == 0.5
+        assert results[style]["iterations_per_question"] == 1
+        assert results[style]["tokens_per_question"] > 0
+    assert results["tools-agent"]["tokens_per_question"] < (
+        results["react"]["tokens_per_question"]
+    )
+    assert results["unknown"]["error"].startswith("ValueError")